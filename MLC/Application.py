@@ -19,16 +19,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import multiprocessing
 import numpy as np
+import sys
 import MLC.Log.log as lg
 
 from MLC.Common.PreevaluationManager import PreevaluationManager
 from MLC.Common.Operations import Operations
+from MLC.Common.LispTreeExpr.TreeKernel import TreeKernelCache
 from MLC.db.mlc_repository import MLCRepository
 from MLC.Log.log import set_logger
 from MLC.mlc_parameters.mlc_parameters import Config
 from MLC.Population.Creation.CreationFactory import CreationFactory
+from MLC.Population.Evaluation.EvaluationCheckpoint import EvaluationCheckpoint
 from MLC.Population.Evaluation.EvaluatorFactory import EvaluatorFactory
+from MLC.Population.SteadyStateEvolution import SteadyStateEvolution
 from MLC.Simulation import Simulation
 
 
@@ -40,11 +45,15 @@ class MLC_CALLBACKS:
 
 
 class Application(object):
+    GENERATIONAL = "generational"
+    STEADY_STATE = "steady_state"
 
     def __init__(self, simulation, callbacks={}, gen_creator=None):
         self._config = Config.get_instance()
         # Reload the Operations supported
         Operations.get_instance(reload_operations=True)
+        # Kernels compiled for other experiments are no longer valid
+        TreeKernelCache.get_instance().clear()
 
         self._simulation = simulation
         self._mlc_repository = MLCRepository.get_instance()
@@ -73,8 +82,23 @@ class Application(object):
 
         self._evaluator = EvaluatorFactory.make(ev_method, self.__callbacks_manager)
 
+        # Pipelined evaluators receive the individuals while they are evolved
+        self._pipeline = None
+        if EvaluatorFactory.get_pipeline_chunksize() > 0:
+            self._pipeline = self._evaluator
+
         self._look_for_duplicates = self._config.getboolean('OPTIMIZATION', 'lookforduplicates')
 
+        # Evolution mode
+        self._mode = Application.GENERATIONAL
+        if self._config.has_option('OPTIMIZATION', 'mode'):
+            self._mode = self._config.get('OPTIMIZATION', 'mode')
+
+        if self._mode not in [Application.GENERATIONAL, Application.STEADY_STATE]:
+            lg.logger_.error("[APPLICATION] Evolution mode " + self._mode +
+                             " is not valid. Aborting program")
+            sys.exit(-1)
+
         # callbacks for the MLC application
         if MLC_CALLBACKS.ON_START in callbacks:
             self.__callbacks_manager.subscribe(MLC_CALLBACKS.ON_START,
@@ -92,6 +116,14 @@ class Application(object):
             self.__callbacks_manager.subscribe(MLC_CALLBACKS.ON_FINISH,
                                                callbacks[MLC_CALLBACKS.ON_FINISH])
 
+        # Checkpoints of the costs, saved as they are evaluated
+        checkpoint_batch = 0
+        if self._config.has_option('EVALUATOR', 'checkpoint_batch'):
+            checkpoint_batch = self._config.getint('EVALUATOR', 'checkpoint_batch')
+        self._checkpoint = EvaluationCheckpoint(checkpoint_batch)
+        if self._checkpoint.is_enabled():
+            self.__callbacks_manager.subscribe(MLC_CALLBACKS.ON_EVALUATE, self._checkpoint.on_evaluate)
+
         # add callback to show best individual
         self.__callbacks_manager.subscribe(MLC_CALLBACKS.ON_NEW_GENERATION, self.show_best)
         self.__display_best = True
@@ -139,15 +171,25 @@ class Application(object):
         if self._mlc_repository.count_population() == 0:
             lg.logger_.info("Creating and filling first generation")
 
-            last_population = Simulation.create_empty_population_for(1)
-            last_population.fill(self._gen_creator)
+            last_population = self._checkpoint.resume(1)
+            if last_population is None:
+                last_population = Simulation.create_empty_population_for(1)
+                last_population.fill(self._gen_creator)
+                self._checkpoint.start(1, last_population)
+
             self.evaluate_population(last_population, 1)
             self._mlc_repository.add_population(last_population)
+            self._checkpoint.finish()
 
             # emit new generation event
             self.__callbacks_manager.on_event(MLC_CALLBACKS.ON_NEW_GENERATION, 1)
             lg.logger_.info("Population created. Number: %s - Size: %s" % (1, last_population.get_size()))
 
+        # The steady state evolution saves pseudo-generations, so the loop
+        # below finds the generations already created
+        if self._mode == Application.STEADY_STATE:
+            self._evolve_steady_state(to_generation)
+
         while self._mlc_repository.count_population() < to_generation:
             last_generation = self._mlc_repository.count_population()
             last_population = self._mlc_repository.get_population(last_generation)
@@ -155,28 +197,58 @@ class Application(object):
             # obtain the next generation by evolving the lastone
             lg.logger_.info("Evolving to Population %s using population %s" % (last_generation + 1, last_generation))
 
-            next_population = Simulation.create_empty_population_for(last_generation + 1)
-            next_population = last_population.evolve(next_population)
+            next_population = self._checkpoint.resume(last_generation + 1)
+            if next_population is None:
+                next_population = Simulation.create_empty_population_for(last_generation + 1)
+                next_population = last_population.evolve(next_population, self._pipeline)
+
+                # continue with evolve if there are duplicated individuals
+                if self._look_for_duplicates:
+                    while next_population.remove_duplicates() > 0:
+                        next_population = last_population.evolve(next_population, self._pipeline)
 
-            # continue with evolve if there are duplicated individuals
-            if self._look_for_duplicates:
-                while next_population.remove_duplicates() > 0:
-                    next_population = last_population.evolve(next_population)
+                self._checkpoint.start(last_generation + 1, next_population)
 
-            # evaluate population
+            # evaluate population. This is the generation barrier of the
+            # pipelined evaluation, sorting and elitism need all the costs
             self.evaluate_population(next_population, last_generation)
 
             lg.logger_.info("Population created. Number: %s - Size: %s" % (last_generation + 1, next_population.get_size()))
             self._mlc_repository.add_population(next_population)
+            self._checkpoint.finish()
 
             # emit new generation event
             self.__callbacks_manager.on_event(MLC_CALLBACKS.ON_NEW_GENERATION, last_generation + 1)
 
+        # release the resources used by the evaluator (e.g. worker processes)
+        self._evaluator.close()
+
         lg.logger_.info("MLC Simulation Finished")
 
         # emit app finish event
         self.__callbacks_manager.on_event(MLC_CALLBACKS.ON_FINISH)
 
+    def _evolve_steady_state(self, to_generation):
+        last_generation = self._mlc_repository.count_population()
+        if last_generation >= to_generation:
+            return
+
+        in_flight = 0
+        if self._config.has_option('OPTIMIZATION', 'steady_state_inflight'):
+            in_flight = self._config.getint('OPTIMIZATION', 'steady_state_inflight')
+        if in_flight <= 0:
+            in_flight = multiprocessing.cpu_count()
+
+        lg.logger_.info("Steady state evolution from population %s with %s evaluations in flight"
+                        % (last_generation, in_flight))
+
+        def on_new_generation(generation):
+            self.__callbacks_manager.on_event(MLC_CALLBACKS.ON_NEW_GENERATION, generation)
+
+        evolution = SteadyStateEvolution(self._evaluator, in_flight)
+        evolution.run(self._mlc_repository.get_population(last_generation),
+                      last_generation, to_generation, on_new_generation)
+
     def get_simulation(self):
         return self._simulation
 
@@ -187,14 +259,16 @@ class Application(object):
         and updates the MLC2 object.
         The evaluation algorithm is implemented in the MLCpop class.
         """
-        # First evaluation
-        population.evaluate(self._evaluator)
+        # First evaluation. The costs checkpointed by an interrupted
+        # evaluation are reused
+        population.evaluate(self._checkpoint.evaluator(self._evaluator))
 
         # Remove bad individuals
         if self._duplicates_must_be_removed(generation_number):
             while population.remove_bad_individuals():
                 # There are bad individuals, recreate the population
                 population.fill(self._gen_creator)
+                self._checkpoint.update(population)
                 population.evaluate(self._evaluator)
 
         population.sort()
@@ -27,6 +27,7 @@ from MLC.mlc_parameters.mlc_parameters import Config
 from MLC.Common.Operations import Operations
 from MLC.Common.LispTreeExpr.TreeNodes import LeafNode, InternalNode
 from MLC.Common.LispTreeExpr.OperationNodes import OpNodeFactory
+from MLC.Common.LispTreeExpr.TreeKernel import TreeKernel
 from PyQt5.QtCore import Qt
 
 
@@ -87,22 +88,40 @@ class LispTreeExpr(object):
             self._node_id_counter += 1
             return node_id
 
+    # Parenthesis, or the operation names, sensors and constants between them
+    TOKEN_REGEX = re.compile(r"[()]|[^\s()]+")
+
     def __init__(self, expr):
         self._node_id_generator = LispTreeExpr.NodeIdGenerator()
         self._nodes = []
         self._expanded_tree = expr
+        self._set_root(self._parse(expr))
+
+    @staticmethod
+    def from_root_node(root):
+        """
+        Creates a tree from a root node built with the node operations
+        (replace_subtree, with_constants, etc), without parsing its
+        expression. The nodes can be shared with other trees, so their depth
+        and expression index are not updated. Use the internal_subtrees
+        method of the nodes to get them.
+        """
+        tree = LispTreeExpr.__new__(LispTreeExpr)
+        tree._node_id_generator = LispTreeExpr.NodeIdGenerator()
+        tree._nodes = None
+        tree._expanded_tree = None
+        tree._set_root(root)
+        return tree
 
-        # Remove the root part of the node
-        nonroot_expr = expr[expr.find('root') + 5:-1]
-        # lg.logger_.debug("[LISP_TREE_EXPR] NonRoot Expression: " + nonroot_expr)
-        self._root, _ = self._generate_node(expr, is_root_expression=True)
+    def _set_root(self, root):
+        self._root = root
 
         # Get the complexity of the tree before simplifying
         self._complexity = self._root.complexity()
         self._formal = self._root.formal()
 
         # Now, simplify the tree
-        if Config.get_instance().getboolean('OPTIMIZATION', 'simplify'):
+        if Config.get_instance().snapshot().getboolean('OPTIMIZATION', 'simplify'):
             self.simplify_tree()
 
     @staticmethod
@@ -149,55 +168,55 @@ class LispTreeExpr(object):
             raise TrailingTrashExprException(expression)
 
         # Now the expression is correct. Check the amount of arguments to be correct
-        def check_operands(expr):
-            op_string = expr[1:expr.find(' ')]
-            expr_op = None
+        tokens = LispTreeExpr.tokenize(expression)
+
+        def check_operands(pos):
+            # tokens[pos] is the bracket that opens the operation
+            expr_index, op_string = tokens[pos + 1]
             try:
                 expr_op = Operations.get_instance().get_operation_from_op_string(op_string)
             except KeyError:
-                raise OperationNotFoundException(op_string, expr)
+                raise OperationNotFoundException(op_string, expression[expr_index - 1:])
 
             # Jump directly to the first argument
-            pos = 1 + len(op_string) + 1
+            pos += 2
             arg_counter = 0
-            argument_len = None
-            while True:
+            while tokens[pos][1] != ')':
                 arg_counter += 1
-
-                if expr[pos] == '(':
+                if tokens[pos][1] == '(':
                     # The argument is another operator. Process it recursively
-                    argument_len = check_operands(expr[pos:])
-                    pos += argument_len
-                    if expr[pos] == ' ':
-                        pos += 1
+                    pos = check_operands(pos)
                 else:
                     # The argument is a number or a sensor
-                    next_space = expr[pos:].find(' ')
-                    next_close = expr[pos:].find(')')
-                    if next_space < next_close:
-                        # There are more arguments. Jump to them
-                        argument_len = next_space
-                        pos += argument_len + 1
-                    else:
-                        argument_len = next_close
-                        pos += argument_len
-
-                # Check if this is the last argument
-                if expr[pos] == ')':
-                    break
+                    pos += 1
 
             if arg_counter != expr_op["nbarg"]:
-                raise OperationArgumentsAmountException(expr)
+                raise OperationArgumentsAmountException(expression[expr_index - 1:])
 
-            # The position always finished in the last bracket.
-            # This is the same as the length of the operator
+            # Return the position of the token after the operation
             return pos + 1
 
-        # Add an empty space at the end of the check_operands algorithm, to create a
-        # single cut condition in the recursive algorithm
-        expression = expression[6:-1]
-        expression += " "
-        check_operands(expression)
+        # Check every control law of the root node
+        pos = 2
+        while tokens[pos][1] != ')':
+            if tokens[pos][1] == '(':
+                pos = check_operands(pos)
+            else:
+                pos += 1
+
+        if pos == 2:
+            raise OperationArgumentsAmountException(expression)
+
+        if pos != len(tokens) - 1:
+            raise TrailingTrashExprException(expression)
+
+    @staticmethod
+    def tokenize(expr):
+        """
+        Split the expression in a single pass. Return a list of tuples
+        (position of the token in the expression, token)
+        """
+        return [(match.start(), match.group()) for match in LispTreeExpr.TOKEN_REGEX.finditer(expr)]
 
     def simplify_tree(self):
         self._root = self._root.simplify()
@@ -206,7 +225,7 @@ class LispTreeExpr(object):
 
     def construct_graph(self):
         tree = nx.DiGraph()
-        self._root.construct_tree(tree)
+        self._root.construct_tree(tree, LispTreeExpr.NodeIdGenerator())
         return tree
 
     def calculate_expression(self, sensor_replacement_list):
@@ -233,6 +252,13 @@ class LispTreeExpr(object):
         # Transform printed warnings to real warnings
         return self._root.compute()
 
+    def compile_kernel(self):
+        """
+        Return the tree compiled as a TreeKernel, a vectorized version of
+        calculate_expression that receives a 2-D array of sensors
+        """
+        return TreeKernel(self._root)
+
     def get_root_node(self):
         return self._root
 
@@ -258,116 +284,91 @@ class LispTreeExpr(object):
         """
         return self._formal
 
-    def _number_of_subexpressions(self, expr):
-        level = 0
-        nbarg = 1
-        for i in range(len(expr)):
-            if expr[i] == '(':
-                level += 1
-            if expr[i] == ')':
-                level -= 1
-            if expr[i] == ' ' and level == 0:
-                nbarg += 1
-        return nbarg
-
-    def _get_operation(self, expr, is_root_expression=False):
-
+    def _get_operation(self, str_op, is_root_expression=False):
         if is_root_expression:
-            root_prefix_len = len("(root ")
-            return {"op": "root",
-                    "nbarg": self._number_of_subexpressions(expr[root_prefix_len:len(expr) - 1]),
-                    "complexity": 0}
-        pos = -1
-        expr_op = None
-        # Get operation string
-        str_op = expr[1:expr.find(' ')]
+            return {"op": "root", "complexity": 0}
 
         # If the operation doesn not exists, an exception is thrown. This
         # shouldn't happen if the expression is valid
         try:
-            expr_op = Operations.get_instance().get_operation_from_op_string(str_op)
+            return Operations.get_instance().get_operation_from_op_string(str_op)
         except KeyError:
-            lg.logger_.error('[LISP_TREE_EXPR] Invalid operation found. Op: ', str_op)
+            lg.logger_.error('[LISP_TREE_EXPR] Invalid operation found. Op: ' + str_op)
             raise
 
-        return expr_op
-
-    def _generate_leaf_node(self, expr, parent_depth, expr_index):
-        # We found a Leaf Node
-        param_len = 0
-
-        find_space = expr.find(' ')
-        find_close_parenthesis = expr.find(')')
-
-        # Find the first space or colon
-        if find_space != -1 and find_space < find_close_parenthesis:
-            param_len = find_space
-        elif find_close_parenthesis != -1:
-            param_len = find_close_parenthesis
-        else:
-            param_len = len(expr)
-
-        leaf = LeafNode(self._node_id_generator.next_node_id(), expr[:param_len])
-        leaf.set_depth(parent_depth)
-        leaf.set_expr_index(expr_index)
-        leaf.set_subtreedepth(0)
-        self._nodes.append(leaf)
-        return leaf, param_len + 1
-
     # As a precondition, the expression must be well-formed
-    def _generate_node(self, 
-                       expr, 
-                       is_root_expression=False, 
-                       parent_depth=0, 
-                       expr_index=0):
-        if expr[0] != '(':
-            return self._generate_leaf_node(expr, parent_depth, expr_index)
-
-        # We are in the presence of an internal node. Get the operation
-        op = self._get_operation(expr, is_root_expression)
-
-        # Generate the arguments of the internal node as Child Nodes
-        node = OpNodeFactory.make(op["op"], self._node_id_generator.next_node_id())
-        node.set_depth(parent_depth + 1)
-        node.set_expr_index(expr_index)
-        expr_offset = 0
-        offset = 0
-        child_node = None
-        child_subtreedepth = 0
-
-        for i in range(op["nbarg"]):
-            # 1 colon + op len + 1 space + (expr_offset)
-            next_arg_pos = 1 + len(op["op"]) + 1 + expr_offset
-
-            if expr[next_arg_pos] == '(':
-                child_node, offset = self._generate_node(expr[next_arg_pos:], 
-                                                         parent_depth=parent_depth + 1, 
-                                                         expr_index=expr_index + next_arg_pos)
-            else:
-                child_node, offset = self._generate_leaf_node(expr[next_arg_pos:],
-                                                              parent_depth=parent_depth + 1,
-                                                              expr_index=expr_index + next_arg_pos)
-
-            node.add_child(child_node)
-            child_subtreedepth = max(child_subtreedepth, child_node.get_subtreedepth())
-            expr_offset += offset
+    def _parse(self, expr):
+        """
+        Build the tree walking the tokens of the expression once. The node ids
+        are assigned in preorder, and the nodes get the depth and the index of
+        their position in the expression
+        """
+        # Internal nodes whose closing bracket was not found yet. The depth of
+        # the node at the top of the stack is len(open_nodes)
+        open_nodes = []
+        opening_index = None
+
+        for match in LispTreeExpr.TOKEN_REGEX.finditer(expr):
+            token = match.group()
+
+            if opening_index is not None:
+                # The token after a bracket is the operation of an internal node
+                op = self._get_operation(token, is_root_expression=not open_nodes)
+                node = OpNodeFactory.make(op["op"], self._node_id_generator.next_node_id())
+                node.set_depth(len(open_nodes) + 1)
+                node.set_expr_index(opening_index)
+                if open_nodes:
+                    open_nodes[-1].add_child(node)
+                open_nodes.append(node)
+                opening_index = None
+
+            elif token == '(':
+                opening_index = match.start()
+
+            elif token == ')':
+                node = open_nodes.pop()
+                node.set_subtreedepth(1 + max([child.get_subtreedepth() for child in node._nodes] or [0]))
+                if not open_nodes:
+                    # Anything after the root node is ignored
+                    return node
+                self._nodes.append(node)
 
-        node.set_subtreedepth(1 + child_subtreedepth)
-        if not is_root_expression:
-            self._nodes.append(node)
-        next_arg_pos = 1 + len(op["op"]) + 1 + expr_offset + 1
-        return node, next_arg_pos
+            else:
+                # We found a Leaf Node. Its depth is the one of its parent
+                leaf = LeafNode(self._node_id_generator.next_node_id(), token)
+                leaf.set_depth(len(open_nodes))
+                leaf.set_expr_index(match.start())
+                self._nodes.append(leaf)
+                if not open_nodes:
+                    return leaf
+                open_nodes[-1].add_child(leaf)
+
+    def _get_nodes(self):
+        # The trees that were not parsed collect their nodes on demand, in
+        # the same order used by the parser
+        if self._nodes is None:
+            self._nodes = []
+            self._collect_nodes(self._root)
+        return self._nodes
+
+    def _collect_nodes(self, node):
+        for child in node._nodes:
+            if child.is_leaf():
+                self._nodes.append(child)
+            else:
+                self._collect_nodes(child)
+                self._nodes.append(child)
 
     def leaf_nodes(self):
-        for leaf in filter(lambda n: n.is_leaf(), self._nodes):
+        for leaf in filter(lambda n: n.is_leaf(), self._get_nodes()):
             yield leaf
 
     def internal_nodes(self):
-        for leaf in filter(lambda n: not n.is_leaf(), self._nodes):
+        for leaf in filter(lambda n: not n.is_leaf(), self._get_nodes()):
             yield leaf
 
     def nodes(self):
-        for node in self._nodes:
+        for node in self._get_nodes():
             yield node
 
 
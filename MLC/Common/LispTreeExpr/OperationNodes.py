@@ -21,8 +21,6 @@
 
 # -*- coding: utf-8 -*-
 
-import importlib
-
 import MLC.Log.log as lg
 import numpy as np
 import sys
@@ -35,7 +33,7 @@ from MLC.Common.Operations import Operations
 
 
 def process_float(arg):
-    str_arg = ("%." + Config.get_instance().get('POPULATION', 'precision') + "f") % (arg)
+    str_arg = "%.*f" % (Config.get_instance().snapshot().getint('POPULATION', 'precision'), arg)
     return str_arg
 
 
@@ -73,6 +71,9 @@ class PlusNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "{0} + {1}"
+
     def op_compute(self, arg_list):
         try:
             return arg_list[0] + arg_list[1]
@@ -108,6 +109,9 @@ class MinusNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "{0} - {1}"
+
     def op_compute(self, arg_list):
         try:
             return arg_list[0] - arg_list[1]
@@ -144,6 +148,9 @@ class MultNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "{0} * {1}"
+
     def op_compute(self, arg_list):
         try:
             return arg_list[0] * arg_list[1]
@@ -165,16 +172,20 @@ class DivisionNode(InternalNode):
     def formal(self):
         return "(my_div(" + self._nodes[0].formal() + "," + self._nodes[1].formal() + "))"
 
-    def _process_division(self, dividend, divisor):
+    @staticmethod
+    def protected_division(dividend, divisor):
         if type(divisor) == np.ndarray:
-            new_divisor = [DivisionNode.PROTECTION if np.abs(x) < DivisionNode.PROTECTION else np.abs(x) for x in divisor]
-            return np.sign(divisor) * dividend / np.asarray(new_divisor)
+            new_divisor = np.maximum(np.abs(divisor), DivisionNode.PROTECTION)
+            return np.sign(divisor) * dividend / new_divisor
         else:
             if abs(divisor) < DivisionNode.PROTECTION:
                 return np.sign(divisor) * dividend / DivisionNode.PROTECTION
 
         return dividend / divisor
 
+    def _process_division(self, dividend, divisor):
+        return DivisionNode.protected_division(dividend, divisor)
+
     def op_simplify(self):
         # If the first argument is zero, return zero
         if self._node_arg_x_is_y(0, 0):
@@ -194,6 +205,9 @@ class DivisionNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "my_div({0}, {1})"
+
     def op_compute(self, arg_list):
         try:
             return self._process_division(arg_list[0], arg_list[1])
@@ -220,6 +234,9 @@ class SineNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "np.sin({0})"
+
     def op_compute(self, arg_list):
         try:
             return np.sin(arg_list[0])
@@ -245,6 +262,9 @@ class CosineNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "np.cos({0})"
+
     def op_compute(self, arg_list):
         try:
             return np.cos(arg_list[0])
@@ -265,15 +285,23 @@ class LogarithmNode(InternalNode):
     def formal(self):
         return "my_log(" + self._nodes[0].formal() + ")"
 
-    def _process_arg(self, arg):
+    @staticmethod
+    def protected_arg(arg):
         if type(arg) == np.ndarray:
-            return [LogarithmNode.PROTECTION if np.abs(x) < LogarithmNode.PROTECTION else np.abs(x) for x in arg]
+            return np.maximum(np.abs(arg), LogarithmNode.PROTECTION)
         else:
             if abs(arg) < LogarithmNode.PROTECTION:
                 return LogarithmNode.PROTECTION
 
         return abs(arg)
 
+    @staticmethod
+    def protected_log(arg):
+        return np.log(LogarithmNode.protected_arg(arg))
+
+    def _process_arg(self, arg):
+        return LogarithmNode.protected_arg(arg)
+
     def op_simplify(self):
         if not self._nodes[0].is_sensor():
             if float(self._nodes[0].to_string()) < LogarithmNode.SIMPLIFY_PROTECTION:
@@ -285,6 +313,9 @@ class LogarithmNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "my_log({0})"
+
     def op_compute(self, arg_list):
         try:
             return np.log(self._process_arg(arg_list[0]))
@@ -317,6 +348,9 @@ class ExponentialNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "np.exp({0})"
+
     def op_compute(self, arg_list):
         try:
             return np.exp(arg_list[0])
@@ -342,11 +376,14 @@ class TanhNode(InternalNode):
         else:
             return self
 
+    def op_kernel(self):
+        return "np.tanh({0})"
+
     def op_compute(self, arg_list):
         try:
             return np.tanh(arg_list[0])
         except FloatingPointError, err:
-            return execute_op_without_warnings(op=np.exp,
+            return execute_op_without_warnings(op=np.tanh,
                                                arg1=arg_list[0],
                                                log_prefix="[TANH_NODE] Error: ",
                                                exception_msg=err)
@@ -385,6 +422,16 @@ class RootNode(InternalNode):
         for node in self._nodes:
             node.accept(visitor)
 
+    def internal_subtrees(self, depth=1, path=()):
+        # The root node is not a subtree of the expression
+        for index, node in enumerate(self._nodes):
+            for subtree in node.internal_subtrees(depth + 1, path + (index,)):
+                yield subtree
+
+    def compile_kernel(self, kernel_builder):
+        # One output per control law
+        return [node.compile_kernel(kernel_builder) for node in self._nodes]
+
 
 class OpNodeFactory:
 
@@ -393,12 +440,5 @@ class OpNodeFactory:
         if op == 'root':
             return RootNode(node_id)
 
-        # instatiate node from string
-        operation = Operations.get_instance().get_operation_from_op_string(op)
-        node_module_name = ".".join(operation['tree_node_class'].split('.')[:-1])
-        node_class_name = ".".join(operation['tree_node_class'].split('.')[-1:])
-
-        node_module = importlib.import_module(node_module_name)
-        node_class = getattr(node_module, node_class_name)
-
-        return node_class(node_id)
+        # instatiate node from the class resolved when the operations were loaded
+        return Operations.get_instance().get_node_class_from_op_string(op)(node_id)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+import math
+import MLC.Log.log as lg
+import numpy as np
+
+from collections import OrderedDict
+from MLC.Common.LispTreeExpr.OperationNodes import DivisionNode
+from MLC.Common.LispTreeExpr.OperationNodes import LogarithmNode
+
+
+class TreeKernelBuilder(object):
+    """
+    Translates a tree into a flat list of numpy statements. Every node of the
+    tree is compiled (see TreeNode.compile_kernel) into one assignment to a
+    temporary variable, so the kernel never nests calls no matter how deep the
+    tree is. Identical subexpressions are computed only once and the ones
+    that do not depend on the sensors are folded into constants.
+    """
+
+    def __init__(self, namespace):
+        self._namespace = namespace
+        self._statements = []
+        self._expressions = {}
+        self._variables = set()
+
+    def sensor(self, sensor_number):
+        return self._assign("S[{0}]".format(sensor_number))
+
+    def constant(self, value):
+        if math.isnan(value):
+            return "np.nan"
+        if math.isinf(value):
+            return "np.inf" if value > 0 else "(-np.inf)"
+        if value < 0:
+            return "(%r)" % value
+        return "%r" % value
+
+    def emit(self, expression, *args):
+        expression = expression.format(*args)
+        if any(arg in self._variables for arg in args):
+            return self._assign(expression)
+
+        # All the arguments are literals, so the value is the same for every
+        # sample and can be computed once while compiling
+        with np.errstate(all='ignore'):
+            return self.constant(float(eval(expression, self._namespace)))
+
+    def _assign(self, expression):
+        if expression not in self._expressions:
+            var_name = "t%d" % len(self._statements)
+            self._statements.append("%s = %s" % (var_name, expression))
+            self._expressions[expression] = var_name
+            self._variables.add(var_name)
+        return self._expressions[expression]
+
+    def source(self, outputs):
+        body = self._statements + ["return (%s,)" % ", ".join(outputs)]
+        return "def kernel(S):\n    " + "\n    ".join(body) + "\n"
+
+
+class TreeKernel(object):
+    """
+    Compiled version of a LispTreeExpr. The kernel receives a 2-D array of
+    sensors (one row per sensor, one column per sample) and returns a 2-D array
+    with one row per control law, computed with numpy ufuncs over all the
+    samples at once.
+
+    The results are the same as the ones obtained with
+    LispTreeExpr.calculate_expression, protected division and logarithm
+    included.
+    """
+    _NAMESPACE = {"np": np,
+                  "my_div": DivisionNode.protected_division,
+                  "my_log": LogarithmNode.protected_log}
+
+    def __init__(self, root_node):
+        builder = TreeKernelBuilder(TreeKernel._NAMESPACE)
+        outputs = root_node.compile_kernel(builder)
+        self._source = builder.source(outputs)
+        self._controls = len(outputs)
+
+        namespace = dict(TreeKernel._NAMESPACE)
+        exec compile(self._source, "<tree_kernel>", "exec") in namespace
+        self._kernel = namespace["kernel"]
+
+    def get_source(self):
+        return self._source
+
+    def controls(self):
+        return self._controls
+
+    def __call__(self, sensors):
+        sensors = np.atleast_2d(np.asarray(sensors, dtype=float))
+        result = np.empty((self._controls, sensors.shape[1]))
+
+        # Out of range values are propagated as inf/nan, in the same way as
+        # LispTreeExpr.calculate_expression does after logging the warning
+        with np.errstate(all='ignore'):
+            self.fill(sensors, result)
+        return result
+
+    def fill(self, sensors, result):
+        """
+        Writes the control laws into the rows of result. Unlike __call__, the
+        sensors must already be a 2-D float array and the numpy error state
+        is left to the caller, which allows evaluating many kernels in a row
+        without paying those costs for each one of them.
+        """
+        for i, control in enumerate(self._kernel(sensors)):
+            # Control laws without sensors are computed as scalars
+            result[i] = control
+
+
+class TreeKernelCache(object):
+    """
+    Singleton class that keeps the kernels already compiled, indexed by the
+    hash of the individual they belong to
+    """
+    _instance = None
+    MAX_KERNELS = 10000
+
+    def __init__(self):
+        self._kernels = OrderedDict()
+
+    def get_kernel(self, individual_hash, tree_expression):
+        try:
+            kernel = self._kernels.pop(individual_hash)
+        except KeyError:
+            lg.logger_.debug("[TREE_KERNEL_CACHE] Compiling kernel for {0}".format(individual_hash))
+            kernel = tree_expression.compile_kernel()
+
+            if len(self._kernels) >= TreeKernelCache.MAX_KERNELS:
+                self._kernels.popitem(last=False)
+
+        # Keep the most recently used kernels at the end of the dictionary
+        self._kernels[individual_hash] = kernel
+        return kernel
+
+    def clear(self):
+        self._kernels.clear()
+
+    def size(self):
+        return len(self._kernels)
+
+    @staticmethod
+    def get_instance():
+        if TreeKernelCache._instance is None:
+            TreeKernelCache._instance = TreeKernelCache()
+
+        return TreeKernelCache._instance
@@ -19,6 +19,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import copy
+
+
 class TreeNode(object):
     def __init__(self, node_id):
         self._node_id = node_id
@@ -65,8 +68,8 @@ class TreeNode(object):
     # def value(self):
     #     raise NotImplementedError('TreeNode', 'value is an abstract method')
 
-    def construct_tree(self, nx_tree):
-        raise NotImplementedError('TreeNode', 'complexity is an abstract method')        
+    def construct_tree(self, nx_tree, node_id_generator):
+        raise NotImplementedError('TreeNode', 'construct_tree is an abstract method')
 
     def formal(self):
         raise NotImplementedError('TreeNode', 'formal is an abstract method')
@@ -74,13 +77,26 @@ class TreeNode(object):
     def compute(self):
         raise NotImplementedError('TreeNode', 'compute is an abstract method')
 
+    def compile_kernel(self, kernel_builder):
+        raise NotImplementedError('TreeNode', 'compile_kernel is an abstract method')
+
     def accept(self, visitor):
         raise NotImplementedError('TreeNode', 'accept is an abstract method')
 
+    def internal_subtrees(self, depth=1, path=()):
+        raise NotImplementedError('TreeNode', 'internal_subtrees is an abstract method')
+
+    def replace_subtree(self, path, new_node):
+        raise NotImplementedError('TreeNode', 'replace_subtree is an abstract method')
+
+    def with_constants(self, constant_generator):
+        raise NotImplementedError('TreeNode', 'with_constants is an abstract method')
+
 class LeafNode(TreeNode):
 
     def __init__(self, node_id, arg):
         TreeNode.__init__(self, node_id)
+        self._subtreedepth = 0
         # String value of the node
         self._arg = arg
         # Numerical value of the node
@@ -98,8 +114,10 @@ class LeafNode(TreeNode):
     def complexity(self):
         return 1
 
-    def construct_tree(self, nx_tree):
-        nx_tree.add_node(self._node_id, value=str(self._arg))
+    def construct_tree(self, nx_tree, node_id_generator):
+        node_id = node_id_generator.next_node_id()
+        nx_tree.add_node(node_id, value=str(self._arg))
+        return node_id
 
     def is_sensor(self):
         try:
@@ -121,9 +139,28 @@ class LeafNode(TreeNode):
     def compute(self):
         return self._value
 
+    def compile_kernel(self, kernel_builder):
+        if self.is_sensor():
+            return kernel_builder.sensor(int(self._arg[1:]))
+        return kernel_builder.constant(float(self._arg))
+
     def accept(self, visitor):
         visitor.visit_leaf_node(self)
 
+    def internal_subtrees(self, depth=1, path=()):
+        return iter(())
+
+    def replace_subtree(self, path, new_node):
+        if path:
+            raise IndexError("A leaf node has no subtrees")
+        return new_node
+
+    def with_constants(self, constant_generator):
+        if self.is_sensor():
+            return self
+
+        return LeafNode(self._node_id, constant_generator())
+
 class InternalNode(TreeNode):
 
     def __init__(self, node_id, op, complexity):
@@ -163,21 +200,28 @@ class InternalNode(TreeNode):
             simplified_node = node.simplify()
             self._nodes[i] = simplified_node
 
+        # The children could have been replaced by leaves
+        self._subtreedepth = 1 + max([node.get_subtreedepth() for node in self._nodes])
+
         for node in self._nodes:
             if not node.is_leaf():
                 return self
 
         return self.op_simplify()
 
-    def construct_tree(self, nx_tree):
+    def construct_tree(self, nx_tree, node_id_generator):
+        # Nodes can be shared between trees (see replace_subtree), so the
+        # ids of the graph are generated again instead of using the node ids
         node_op = self._op
         if not self._op:
             node_op = 'root'
-        nx_tree.add_node(self._node_id, value=node_op)
+        node_id = node_id_generator.next_node_id()
+        nx_tree.add_node(node_id, value=node_op)
 
         for node in self._nodes:
-            node.construct_tree(nx_tree)
-            nx_tree.add_edge(self._node_id, node.get_node_id())
+            child_id = node.construct_tree(nx_tree, node_id_generator)
+            nx_tree.add_edge(node_id, child_id)
+        return node_id
 
     def is_leaf(self):
         # Check if the list is empty
@@ -206,7 +250,62 @@ class InternalNode(TreeNode):
 
         return self.op_compute(arg_list)
 
+    def op_kernel(self):
+        raise NotImplementedError('InternalNode', "op_kernel shouldn't be called")
+
+    def compile_kernel(self, kernel_builder):
+        arg_list = [node.compile_kernel(kernel_builder) for node in self._nodes]
+        return kernel_builder.emit(self.op_kernel(), *arg_list)
+
     def accept(self, visitor):
         for node in self._nodes:
             node.accept(visitor)
-        visitor.visit_internal_node(self)
\ No newline at end of file
+        visitor.visit_internal_node(self)
+
+    def copy_with_children(self, children):
+        """
+        Returns a node with the same operation as this one and the children
+        received. The children are not copied, so they are shared with the
+        trees they come from.
+        """
+        node = copy.copy(self)
+        node._nodes = list(children)
+        node.set_subtreedepth(1 + max([child.get_subtreedepth() for child in children] or [0]))
+        return node
+
+    def internal_subtrees(self, depth=1, path=()):
+        """
+        Yields (node, depth, path) for every internal node of the subtree, in
+        the same order they appear in the expression of the tree. The depth is
+        computed from the depth received instead of using the depth saved in the
+        nodes, because nodes can be shared by trees. The path is the list of
+        child indexes needed to reach the node (see replace_subtree).
+        """
+        yield self, depth, path
+        for index, node in enumerate(self._nodes):
+            for subtree in node.internal_subtrees(depth + 1, path + (index,)):
+                yield subtree
+
+    def replace_subtree(self, path, new_node):
+        """
+        Returns a new tree where the node reached following the child indexes
+        of path is replaced by new_node. Only the nodes in the path are copied,
+        the rest of the subtrees are shared with this tree.
+        """
+        if not path:
+            return new_node
+
+        children = list(self._nodes)
+        children[path[0]] = children[path[0]].replace_subtree(path[1:], new_node)
+        return self.copy_with_children(children)
+
+    def with_constants(self, constant_generator):
+        """
+        Returns a new tree with the constants replaced by the values returned
+        by constant_generator, called in the order the constants appear in
+        the expression. Subtrees without constants are shared.
+        """
+        children = [node.with_constants(constant_generator) for node in self._nodes]
+        if all([new is old for new, old in zip(children, self._nodes)]):
+            return self
+        return self.copy_with_children(children)
\ No newline at end of file
@@ -19,6 +19,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import importlib
 import yaml
 from MLC.mlc_parameters.mlc_parameters import Config
 from MLC import config as mlc_paths
@@ -42,19 +43,44 @@ class Operations(object):
         for operation_id in opsetrange:
             self._ops[operation_id] = available_operations[operation_id]
 
+        # Lookup tables used while parsing and generating trees. The list of
+        # operations keeps the order in which the op numbers were resolved
+        self._ops_list = self._ops.values()
+        self._ops_by_string = {}
+        self._node_classes = {}
+        for op in self._ops_list:
+            self._ops_by_string[op["op"]] = op
+            self._node_classes[op["op"]] = Operations._resolve_node_class(op["tree_node_class"])
+
+    @staticmethod
+    def _resolve_node_class(tree_node_class):
+        node_module_name = ".".join(tree_node_class.split('.')[:-1])
+        node_class_name = ".".join(tree_node_class.split('.')[-1:])
+
+        node_module = importlib.import_module(node_module_name)
+        return getattr(node_module, node_class_name)
+
     def get_operation_from_op_num(self, op_num_index):
         try:
-            return self._ops.values()[int(op_num_index) - 1]
+            return self._ops_list[int(op_num_index) - 1]
         except KeyError:
             raise IndexError("get_operation_from_op_num",
                              "Index must be one of the following values: {0}"
                              .format(str(self._ops.keys())))
 
     def get_operation_from_op_string(self, str_op):
-        for k, op in self._ops.iteritems():
-            if op["op"] == str_op:
-                return op
-        raise KeyError('Operations', 'Key %s was not found' % str_op)
+        try:
+            return self._ops_by_string[str_op]
+        except KeyError:
+            raise KeyError('Operations', 'Key %s was not found' % str_op)
+
+    def get_node_class_from_op_string(self, str_op):
+        """ Tree node class that implements the operation
+        """
+        try:
+            return self._node_classes[str_op]
+        except KeyError:
+            raise KeyError('Operations', 'Key %s was not found' % str_op)
 
     def length(self):
         """ Number of operations loaded into the Singleton
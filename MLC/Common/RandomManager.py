@@ -21,6 +21,7 @@
 
 import os
 import MLC.Log.log as lg
+import numpy as np
 import random
 
 
@@ -76,6 +77,23 @@ class RandomManager:
         indexes = [x[0] for x in sorted(enumerate(rand_list), key=lambda x:x[1])]
         return indexes
 
+    @staticmethod
+    def is_replaying():
+        """
+        True while the randoms loaded from a file (e.g. the MATLAB ones) are
+        being used
+        """
+        return len(RandomManager._randoms) > 0
+
+    @staticmethod
+    def numpy_random_state():
+        """
+        Returns a numpy RandomState to draw batches of randoms. It is seeded
+        with a Python random, so the batches are reproducible with random.seed
+        """
+        RandomManager._rand_counter += 1
+        return np.random.RandomState(random.getrandbits(32))
+
     @staticmethod
     def load_random_values(randoms_file):
         with open(randoms_file) as f:
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import MLC.Log.log as lg
+import importlib
+import os
+import sys
+
+
+class ScriptModuleRegistry(object):
+    """
+    Keeps loaded the user scripts of the experiments (the modules of the
+    Evaluation and Preevaluation packages). A script is imported the first
+    time it is requested and the same module is returned afterwards, until
+    the file of the script is modified or the experiment changes (the folder
+    of every opened experiment is added to sys.path, so a change in sys.path
+    means that the script could be found in another folder).
+
+    Modules are indexed by the path of their script, so switching between
+    experiments does not reload scripts that were not modified.
+    """
+
+    def __init__(self, package_name):
+        self._package_name = package_name
+        # script path -> (modification time, module)
+        self._modules = {}
+        # function name -> script path. Only valid for the sys.path saved
+        self._paths = {}
+        self._sys_path = None
+
+    def get_module(self, function_name):
+        if self._sys_path != sys.path:
+            lg.logger_.debug("[SCRIPT_REGISTRY] Experiment changed. {0} scripts will be "
+                             "searched again".format(self._package_name))
+            self._paths = {}
+            self._sys_path = list(sys.path)
+
+        path = self._paths.get(function_name)
+        if path is None:
+            path = self._find_script(function_name)
+
+        if path in self._modules:
+            mtime, module = self._modules[path]
+            if mtime == ScriptModuleRegistry._get_mtime(path):
+                return module
+
+        module = self._load_module(function_name)
+        path = ScriptModuleRegistry._get_script_path(module)
+        self._paths[function_name] = path
+        self._modules[path] = (ScriptModuleRegistry._get_mtime(path), module)
+        return module
+
+    def clear(self):
+        self._modules = {}
+        self._paths = {}
+        self._sys_path = None
+
+    def _find_script(self, function_name):
+        for directory in sys.path:
+            path = os.path.join(directory, self._package_name, function_name + ".py")
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        return None
+
+    def _load_module(self, function_name):
+        # WARNING: Python does not support module unloading and the scripts of
+        # all the experiments live in packages with the same name, so the
+        # package (and its modules) must be removed from sys.modules before
+        # importing the script of another experiment
+        for module_name in sys.modules.keys():
+            if module_name == self._package_name or module_name.startswith(self._package_name + "."):
+                del sys.modules[module_name]
+
+        module_name = "{0}.{1}".format(self._package_name, function_name)
+        lg.logger_.debug('[SCRIPT_REGISTRY] Importing module {0}'.format(module_name))
+        return importlib.import_module(module_name)
+
+    @staticmethod
+    def _get_script_path(module):
+        path = os.path.abspath(module.__file__)
+        if path.endswith(".pyc") or path.endswith(".pyo"):
+            path = path[:-1]
+        return path
+
+    @staticmethod
+    def _get_mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import MLC.Log.log as lg
+
+from MLC.db.mlc_repository import MLCRepository
+from MLC.db.mlc_repository import MLCRepositoryHelper
+
+
+class CostCacheEvaluator(object):
+    """
+    Evaluator that avoids evaluating individuals whose cost is already known.
+    The costs are saved in the experiment database, indexed by the hash of
+    the individual, and the evaluations are delegated to another evaluator.
+
+    Policies (parameter cost_cache of the EVALUATOR section):
+        - never: individuals are evaluated only once.
+        - average: individuals are evaluated up to ev_again_times times, and
+            their cost is the average of all these evaluations.
+        - always: individuals are evaluated every time (no cache).
+    """
+    NEVER = "never"
+    AVERAGE = "average"
+    ALWAYS = "always"
+    POLICIES = [NEVER, AVERAGE, ALWAYS]
+
+    def __init__(self, evaluator, callback_manager, policy, max_evaluations=1):
+        self._evaluator = evaluator
+        self._callback_manager = callback_manager
+        self._policy = policy
+        self._max_evaluations = max_evaluations if policy == CostCacheEvaluator.AVERAGE else 1
+        self._completed = []
+
+    def with_evaluator(self, evaluator):
+        """
+        Returns a cost cache with the same policy that delegates the
+        evaluations to another evaluator
+        """
+        return CostCacheEvaluator(evaluator, self._callback_manager, self._policy, self._max_evaluations)
+
+    def get_evaluator(self):
+        return self._evaluator
+
+    def submit(self, index):
+        # Pipelined evaluators receive only the individuals that would be
+        # evaluated at the generation barrier
+        if not hasattr(self._evaluator, 'submit'):
+            return
+
+        repository = MLCRepository.get_instance()
+        hash = MLCRepositoryHelper.get_hash_for_individual(repository.get_individual(index))
+        cached = repository.get_cached_cost(hash)
+        if cached is None or cached[1] < self._max_evaluations:
+            self._evaluator.submit(index)
+
+    def evaluate(self, indivs):
+        repository = MLCRepository.get_instance()
+
+        hashes = {}
+        to_evaluate = []
+        for index in indivs:
+            if index in hashes:
+                continue
+
+            hashes[index] = MLCRepositoryHelper.get_hash_for_individual(repository.get_individual(index))
+            cached = repository.get_cached_cost(hashes[index])
+            if cached is None or cached[1] < self._max_evaluations:
+                to_evaluate.append(index)
+
+        lg.logger_.info("[POP][COST_CACHE] %s of %s individuals found in the cost cache" %
+                        (len(indivs) - len(to_evaluate), len(indivs)))
+
+        # Evaluate the new individuals and merge their costs with the cached ones
+        if to_evaluate:
+            costs = self._evaluator.evaluate(to_evaluate)
+            repository.update_cached_costs([self._merge_cost(hashes[index], cost)
+                                            for index, cost in zip(to_evaluate, costs)])
+
+        # The individuals evaluated emitted their events in the evaluator
+        from MLC.Application import MLC_CALLBACKS
+        evaluated = set(to_evaluate)
+        jj = []
+        for index in indivs:
+            cost = repository.get_cached_cost(hashes[index])[0]
+            jj.append(cost)
+
+            if index in evaluated:
+                evaluated.remove(index)
+            else:
+                self._callback_manager.on_event(MLC_CALLBACKS.ON_EVALUATE, index, cost)
+
+        return jj
+
+    def _merge_cost(self, hash, cost):
+        # Return the cache entry of the individual with the new cost
+        cached = MLCRepository.get_instance().get_cached_cost(hash)
+        if cached is None:
+            return hash, cost, 1
+
+        cached_cost, evaluations = cached
+        return hash, (cached_cost * evaluations + cost) / float(evaluations + 1), evaluations + 1
+
+    def start(self, index):
+        # The individuals found in the cache are completed at once
+        repository = MLCRepository.get_instance()
+        hash = MLCRepositoryHelper.get_hash_for_individual(repository.get_individual(index))
+        cached = repository.get_cached_cost(hash)
+        if cached is None or cached[1] < self._max_evaluations:
+            self._evaluator.start(index)
+        else:
+            self._completed.append((index, cached[0]))
+
+    def next_completed(self):
+        from MLC.Application import MLC_CALLBACKS
+        if self._completed:
+            index, cost = self._completed.pop(0)
+            self._callback_manager.on_event(MLC_CALLBACKS.ON_EVALUATE, index, cost)
+            return index, cost
+
+        repository = MLCRepository.get_instance()
+        index, cost = self._evaluator.next_completed()
+        hash = MLCRepositoryHelper.get_hash_for_individual(repository.get_individual(index))
+        entry = self._merge_cost(hash, cost)
+        repository.update_cached_costs([entry])
+        return index, entry[1]
+
+    def cancel(self):
+        self._completed = []
+        self._evaluator.cancel()
+
+    def close(self):
+        self._evaluator.close()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import time
+import MLC.Log.log as lg
+
+from MLC.db.mlc_repository import MLCRepository
+from MLC.Population.Evaluation.CostCacheEvaluator import CostCacheEvaluator
+
+
+class EvaluationCheckpoint(object):
+    """
+    Saves the generation being evaluated and the costs of its individuals
+    as they arrive, through the ON_EVALUATE events, so an interrupted
+    evaluation can be resumed without evaluating again the individuals that
+    already have a cost. The costs are written in batches, when the batch is
+    full or FLUSH_INTERVAL seconds after the last write.
+
+    Parameters of the EVALUATOR section:
+        - checkpoint_batch: costs written to the database at a time. 0
+            disables the checkpoints.
+
+    The evaluators that evaluate the individuals in batches, like the
+    evaluation scripts with a cost_batch function, only give the costs
+    when the batch is done. Their costs are checkpointed at the end of
+    each batch, so nothing is saved if the batch is interrupted.
+    """
+    FLUSH_INTERVAL = 10.0
+
+    def __init__(self, batch_size):
+        self._batch_size = batch_size
+        self._generation = None
+        self._costs = []
+        self._last_flush = time.time()
+        self._resumed_costs = None
+
+    def is_enabled(self):
+        return self._batch_size > 0
+
+    def start(self, generation, population):
+        """
+        Saves the population of the generation before evaluating it. Use
+        update if its individuals change
+        """
+        if not self.is_enabled():
+            return
+
+        MLCRepository.get_instance().save_checkpoint(generation, population)
+        self._generation = generation
+
+    def update(self, population):
+        if self._generation is not None:
+            MLCRepository.get_instance().save_checkpoint(self._generation, population)
+
+    def resume(self, generation):
+        """
+        Returns the population checkpointed for the generation, or None. The
+        costs saved are used by the next evaluator returned by evaluator
+        """
+        if not self.is_enabled():
+            return None
+
+        checkpoint = MLCRepository.get_instance().get_checkpoint(generation)
+        if checkpoint is None:
+            return None
+
+        population, self._resumed_costs = checkpoint
+        self._generation = generation
+        lg.logger_.info("[CHECKPOINT] Resuming the evaluation of population %s. %s costs recovered"
+                        % (generation, len(self._resumed_costs)))
+        return population
+
+    def evaluator(self, evaluator):
+        if not self._resumed_costs:
+            return evaluator
+
+        costs = self._resumed_costs
+        self._resumed_costs = None
+
+        # The checkpointed costs take the place of the evaluations, below the
+        # cost cache, so they are merged in the cache as if they were new
+        if isinstance(evaluator, CostCacheEvaluator):
+            return evaluator.with_evaluator(_ResumedEvaluator(evaluator.get_evaluator(), costs))
+        return _ResumedEvaluator(evaluator, costs)
+
+    def on_evaluate(self, index, cost):
+        if self._generation is None:
+            return
+
+        self._costs.append((index, cost))
+        if len(self._costs) >= self._batch_size or \
+           time.time() - self._last_flush >= EvaluationCheckpoint.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self._costs:
+            MLCRepository.get_instance().add_checkpoint_costs(self._generation, self._costs)
+            self._costs = []
+        self._last_flush = time.time()
+
+    def finish(self):
+        """
+        Discards the checkpoint once the generation was saved
+        """
+        if self._generation is None:
+            return
+
+        self._costs = []
+        self._generation = None
+        MLCRepository.get_instance().clear_checkpoint()
+
+
+class _ResumedEvaluator(object):
+
+    def __init__(self, evaluator, costs):
+        self._evaluator = evaluator
+        self._costs = costs
+
+    def evaluate(self, indivs):
+        missing = sorted(set(index for index in indivs if index not in self._costs))
+
+        lg.logger_.info("[CHECKPOINT] %s of %s individuals found in the checkpoint" %
+                        (len(indivs) - len(missing), len(indivs)))
+
+        costs = dict(self._costs)
+        if missing:
+            costs.update(zip(missing, self._evaluator.evaluate(missing)))
+        return [costs[index] for index in indivs]
@@ -20,38 +20,28 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 import MLC.Log.log as lg
-import importlib
 import sys
 
+from MLC.Common.ScriptModuleRegistry import ScriptModuleRegistry
 from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.Population.Evaluation.CostCacheEvaluator import CostCacheEvaluator
+from MLC.Population.Evaluation.MultiprocessEvaluator import MultiprocessEvaluator
+from MLC.Population.Evaluation.PipelinedEvaluator import PipelinedEvaluator
 from MLC.Population.Evaluation.StandaloneEvaluator import StandaloneEvaluator
 
 
 class EvaluatorFactory(object):
+    _registry = ScriptModuleRegistry("Evaluation")
+
     @staticmethod
     def get_callback():
         function_name = Config.get_instance().get('EVALUATOR', 'evaluation_function')
-        module_name = 'Evaluation.{0}'.format(function_name)
 
+        # The module is imported only once, so the setup done at the top
+        # level of the evaluation script is not repeated. It is imported
+        # again only if the script was modified or the experiment changed
         try:
-            # WARNING: I am unloading manually the evaluation function module. I need to do this
-            # because Python does not support module unloading and my evaluation functions are
-            # all the same, so when one experiment loads his module, other project with the same
-            # name of module won't be able to load yours
-            ev_module = sys.modules["Evaluation"]
-            del sys.modules['Evaluation']
-            del ev_module
-            lg.logger_.debug("[EV_FACTORY] Module {0} was removed".format(sys.modules["Evaluation"]))
-        except KeyError, err:
-            # If the module cannot be unload because it does not exists, continue
-            pass
-
-        lg.logger_.debug('[EV_FACTORY] Importing module {0}'.format(module_name))
-        try:
-            # lg.logger_.debug("[EV_FACTORY] Sys.path: {0}".format(sys.path))
-            module = importlib.import_module(module_name)
-            reload(module)
-            return module
+            return EvaluatorFactory._registry.get_module(function_name)
         except ImportError, err:
             lg.logger_.debug("[EV_FACTORY] Evaluation function doesn't exists. "
                              "Aborting program. Error Msg: {0}".format(err))
@@ -61,8 +51,53 @@ class EvaluatorFactory(object):
     def make(strategy, callback_manager):
         if strategy == "mfile_standalone":
             ev_callback = EvaluatorFactory.get_callback()
-            return StandaloneEvaluator(ev_callback, callback_manager)
+            evaluator = StandaloneEvaluator(ev_callback, callback_manager)
+        elif strategy == "multiprocess":
+            evaluator = MultiprocessEvaluator(callback_manager)
         else:
             lg.logger_.error("[EV_FACTORY] Evaluation method " +
                              strategy + " is not valid. Aborting program")
             sys.exit(-1)
+
+        evaluator = EvaluatorFactory._make_pipeline(evaluator)
+        return EvaluatorFactory._make_cost_cache(evaluator, callback_manager)
+
+    @staticmethod
+    def get_pipeline_chunksize():
+        config = Config.get_instance()
+        if not config.has_option('EVALUATOR', 'pipeline_chunksize'):
+            return 0
+        return config.getint('EVALUATOR', 'pipeline_chunksize')
+
+    @staticmethod
+    def _make_pipeline(evaluator):
+        chunksize = EvaluatorFactory.get_pipeline_chunksize()
+        if chunksize <= 0:
+            return evaluator
+
+        # Without asynchronous evaluations the chunks would be evaluated
+        # while the population evolves, with no overlap at all
+        if not hasattr(evaluator, 'evaluate_async'):
+            lg.logger_.error("[EV_FACTORY] Evaluator " + type(evaluator).__name__ +
+                             " can not be pipelined. Aborting program")
+            sys.exit(-1)
+
+        return PipelinedEvaluator(evaluator, chunksize)
+
+    @staticmethod
+    def _make_cost_cache(evaluator, callback_manager):
+        config = Config.get_instance()
+        policy = CostCacheEvaluator.ALWAYS
+        if config.has_option('EVALUATOR', 'cost_cache'):
+            policy = config.get('EVALUATOR', 'cost_cache')
+
+        if policy not in CostCacheEvaluator.POLICIES:
+            lg.logger_.error("[EV_FACTORY] Cost cache policy " +
+                             policy + " is not valid. Aborting program")
+            sys.exit(-1)
+
+        if policy == CostCacheEvaluator.ALWAYS:
+            return evaluator
+
+        max_evaluations = config.getint('EVALUATOR', 'ev_again_times')
+        return CostCacheEvaluator(evaluator, callback_manager, policy, max_evaluations)
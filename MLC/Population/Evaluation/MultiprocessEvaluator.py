@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import itertools
+import multiprocessing
+import signal
+import MLC.Log.log as lg
+
+from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.db.mlc_repository import MLCRepository
+from MLC.individual.Individual import Individual
+
+# Evaluation module and settings of the worker processes. They are set by
+# _init_worker once per process, when the pool is created
+_worker_callback = None
+_worker_timeout = 0
+_worker_bad_value = None
+
+
+class EvaluationTimeoutException(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise EvaluationTimeoutException()
+
+
+def _init_worker(timeout, bad_value):
+    global _worker_callback, _worker_timeout, _worker_bad_value
+
+    # Workers must not handle the Ctrl+C, the main process terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from MLC.Population.Evaluation.EvaluatorFactory import EvaluatorFactory
+    _worker_callback = EvaluatorFactory.get_callback()
+    _worker_timeout = timeout
+    _worker_bad_value = bad_value
+
+    if _worker_timeout > 0:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def _evaluate_individual(value):
+    individual = Individual(value)
+
+    if _worker_timeout <= 0:
+        return _worker_callback.cost(individual)
+
+    try:
+        signal.setitimer(signal.ITIMER_REAL, _worker_timeout)
+        return _worker_callback.cost(individual)
+    except EvaluationTimeoutException:
+        lg.logger_.warn("[POP][MULTIPROCESS_EVAL] Evaluation of individual {0} "
+                        "took more than {1} seconds. Cost set to {2}"
+                        .format(value, _worker_timeout, _worker_bad_value))
+        return _worker_bad_value
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class MultiprocessEvaluator(object):
+    """
+    Evaluates the individuals in a pool of worker processes. Every worker
+    loads the evaluation module of the experiment once and receives the
+    individuals as their value strings, so nothing but strings and costs
+    travel between the processes. The costs are returned in the same order
+    as the individuals and the ON_EVALUATE events are emitted in the main
+    process.
+
+    Parameters of the EVALUATOR section:
+        - multiprocess_workers: amount of worker processes. All the available
+            cores are used when it is 0 or it is not defined.
+        - multiprocess_chunksize: individuals sent to a worker at a time.
+        - multiprocess_timeout: seconds an evaluation can last before its
+            cost is replaced by the badvalue. 0 disables the timeout.
+    """
+    # Seconds waited for the oldest evaluation started before looking for
+    # any other that finished
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, callback_manager):
+        self._config = Config.get_instance()
+        self._callback_manager = callback_manager
+        self._pool = None
+        self._started = []
+
+        self._workers = self._get_option('multiprocess_workers', int, 0)
+        if self._workers <= 0:
+            self._workers = multiprocessing.cpu_count()
+
+        self._chunksize = max(1, self._get_option('multiprocess_chunksize', int, 1))
+        self._timeout = self._get_option('multiprocess_timeout', float, 0.0)
+
+        if self._timeout > 0 and not hasattr(signal, 'SIGALRM'):
+            lg.logger_.warn("[POP][MULTIPROCESS_EVAL] Evaluation timeouts are "
+                            "not supported by this platform. They will be ignored")
+            self._timeout = 0.0
+
+    def _get_option(self, option, option_type, default):
+        if not self._config.has_option('EVALUATOR', option):
+            return default
+        return option_type(self._config.get('EVALUATOR', option))
+
+    def _get_pool(self):
+        if self._pool is None:
+            lg.logger_.info("[POP][MULTIPROCESS_EVAL] Starting {0} workers".format(self._workers))
+            bad_value = self._config.getfloat('EVALUATOR', 'badvalue')
+            self._pool = multiprocessing.Pool(processes=self._workers,
+                                              initializer=_init_worker,
+                                              initargs=(self._timeout, bad_value))
+        return self._pool
+
+    def evaluate(self, indivs):
+        return self.evaluate_async(indivs).get()
+
+    def evaluate_async(self, indivs):
+        """
+        Send the individuals to the workers and return at once. The costs
+        are collected with the get method of the object returned, which
+        emits the ON_EVALUATE events in the calling process
+        """
+        lg.logger_.info("Evaluating %s individuals" % len(indivs))
+
+        values = [MLCRepository.get_instance().get_individual(index).get_value()
+                  for index in indivs]
+
+        costs = self._get_pool().imap(_evaluate_individual, values, self._chunksize)
+        return _PendingCosts(indivs, costs, self._callback_manager)
+
+    def start(self, index):
+        """
+        Send one individual to the workers. The evaluations started are
+        collected with next_completed in the order they finish
+        """
+        value = MLCRepository.get_instance().get_individual(index).get_value()
+        self._started.append((index, self._get_pool().apply_async(_evaluate_individual, (value,))))
+
+    def next_completed(self):
+        while True:
+            for position, (index, result) in enumerate(self._started):
+                if result.ready():
+                    del self._started[position]
+                    cost = result.get()
+                    lg.logger_.debug('[POP][MULTIPROCESS_EVAL] Individual N#{0} - Cost: {1}'
+                                     .format(index, cost))
+
+                    from MLC.Application import MLC_CALLBACKS
+                    self._callback_manager.on_event(MLC_CALLBACKS.ON_EVALUATE, index, cost)
+                    return index, cost
+
+            self._started[0][1].wait(MultiprocessEvaluator.POLL_INTERVAL)
+
+    def cancel(self):
+        # The evaluations running are not interrupted, their costs are ignored
+        self._started = []
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+class _PendingCosts(object):
+
+    def __init__(self, indivs, costs, callback_manager):
+        self._indivs = indivs
+        self._costs = costs
+        self._callback_manager = callback_manager
+
+    def get(self):
+        jj = []
+
+        from MLC.Application import MLC_CALLBACKS
+        for index, cost in itertools.izip(self._indivs, self._costs):
+            lg.logger_.debug('[POP][MULTIPROCESS_EVAL] Individual N#{0} - Cost: {1}'
+                             .format(index, cost))
+            jj.append(cost)
+            self._callback_manager.on_event(MLC_CALLBACKS.ON_EVALUATE, index, cost)
+
+        return jj
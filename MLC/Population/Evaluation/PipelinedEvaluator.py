@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import MLC.Log.log as lg
+
+
+class PipelinedEvaluator(object):
+    """
+    Evaluator that receives the individuals while the population is being
+    evolved. The individuals submitted are sent to the wrapped evaluator in
+    chunks, so the evaluation of the first offspring runs while the rest of
+    the generation is created. The evaluate method is the generation barrier:
+    it waits for the costs of the individuals submitted and evaluates the
+    ones that were not. Every individual is evaluated once per barrier, even
+    if it appears several times in the population.
+
+    The wrapped evaluator must provide an evaluate_async method
+    (multiprocess), EvaluatorFactory refuses to pipeline the other ones.
+
+    Parameters of the EVALUATOR section:
+        - pipeline_chunksize: individuals submitted together to the wrapped
+            evaluator. 0 disables the pipeline.
+    """
+
+    def __init__(self, evaluator, chunksize):
+        self._evaluator = evaluator
+        self._chunksize = max(1, chunksize)
+        self._reset()
+
+    def _reset(self):
+        self._submitted = set()
+        self._pending = []
+        self._chunks = []
+
+    def submit(self, index):
+        if index in self._submitted:
+            return
+
+        self._submitted.add(index)
+        self._pending.append(index)
+        if len(self._pending) >= self._chunksize:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        chunk = self._pending
+        self._pending = []
+        self._chunks.append((chunk, self._evaluator.evaluate_async(chunk)))
+
+    def evaluate(self, indivs):
+        for index in indivs:
+            self.submit(index)
+        self._flush()
+
+        lg.logger_.debug("[POP][PIPELINED_EVAL] Waiting for {0} chunks of individuals"
+                         .format(len(self._chunks)))
+
+        costs = {}
+        for chunk, pending in self._chunks:
+            costs.update(zip(chunk, pending.get()))
+
+        # The individuals submitted but no longer in the population are discarded
+        self._reset()
+        return [costs[index] for index in indivs]
+
+    def start(self, index):
+        self._evaluator.start(index)
+
+    def next_completed(self):
+        return self._evaluator.next_completed()
+
+    def cancel(self):
+        self._evaluator.cancel()
+
+    def close(self):
+        self._evaluator.close()
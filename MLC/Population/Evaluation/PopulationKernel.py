@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import numpy as np
+
+
+class PopulationKernel(object):
+    """
+    Evaluates the control laws of a group of individuals over the same sensor
+    data. The compiled kernels of the individuals (see Individual.get_kernel)
+    are run one after the other, each one over all the samples at once, and
+    their results are stacked into a single (individuals x controls x samples)
+    array, so evaluation functions can compute the cost of the whole group
+    with vectorized operations. The trees are not merged: every distinct
+    kernel is still one Python call, but the individuals that appear several
+    times in the group share their kernel and it is run only once.
+    """
+
+    def __init__(self, individuals):
+        self._kernels = [indiv.get_kernel() for indiv in individuals]
+        self._controls = max([kernel.controls() for kernel in self._kernels] or [0])
+
+    def __len__(self):
+        return len(self._kernels)
+
+    def controls(self):
+        return self._controls
+
+    def evaluate_all(self, sensors):
+        sensors = np.atleast_2d(np.asarray(sensors, dtype=float))
+        result = np.zeros((len(self._kernels), self._controls, sensors.shape[1]))
+
+        filled = {}
+        with np.errstate(all='ignore'):
+            for i, kernel in enumerate(self._kernels):
+                if kernel in filled:
+                    result[i] = result[filled[kernel]]
+                else:
+                    kernel.fill(sensors, result[i])
+                    filled[kernel] = i
+
+        return result
+
+    def evaluate(self, sensors, control=0):
+        """
+        Returns an (individuals x samples) array with the values of the
+        control law number 'control' of every individual
+        """
+        return self.evaluate_all(sensors)[:, control, :]
@@ -32,12 +32,18 @@ class StandaloneEvaluator(object):
         self._config = Config.get_instance()
         self._callback = callback
         self._callback_manager = callback_manager
+        self._started = []
 
     def evaluate(self, indivs):
         jj = []
 
         lg.logger_.info("Evaluating %s individuals" % len(indivs))
 
+        # Evaluation functions can evaluate the whole set of individuals
+        # at once by providing a cost_batch function
+        if hasattr(self._callback, 'cost_batch'):
+            return self._evaluate_batch(indivs)
+
         for index in indivs:
             lg.logger_.debug('[POP][STAND_EVAL] Individual N#' + str(index))
 
@@ -59,3 +65,37 @@ class StandaloneEvaluator(object):
                 sys.exit(-1)
 
         return jj
+
+    def start(self, index):
+        # The evaluations run in this process, they are done one at a time
+        # when their costs are requested
+        self._started.append(index)
+
+    def next_completed(self):
+        index = self._started.pop(0)
+        return index, self.evaluate([index])[0]
+
+    def cancel(self):
+        self._started = []
+
+    def close(self):
+        pass
+
+    def _evaluate_batch(self, indivs):
+        lg.logger_.debug('[POP][STAND_EVAL] Evaluating individuals ' +
+                         'with the cost_batch function')
+
+        py_indivs = [MLCRepository.get_instance().get_individual(index) for index in indivs]
+        jj = list(self._callback.cost_batch(py_indivs))
+
+        if len(jj) != len(indivs):
+            lg.logger_.error("[POP][STAND_EVAL] cost_batch returned {0} costs "
+                             "for {1} individuals. Aborting program."
+                             .format(len(jj), len(indivs)))
+            sys.exit(-1)
+
+        from MLC.Application import MLC_CALLBACKS
+        for index, cost in zip(indivs, jj):
+            self._callback_manager.on_event(MLC_CALLBACKS.ON_EVALUATE, index, cost)
+
+        return jj
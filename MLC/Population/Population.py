@@ -19,12 +19,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import logging
 import math
 import MLC.Log.log as lg
+import numpy as np
 import sys
 import time
 
 from MLC.Common.RandomManager import RandomManager
+from MLC.db.mlc_repository import MLCRepository
 from MLC.individual.Individual import OperationOverIndividualFail
 
 
@@ -40,6 +43,17 @@ class Population(object):
         CROSSOVER = 3
         ELITISM = 4
 
+    # Crossover is the generation method with more parents
+    MAX_PARENTS = 2
+
+    # Every position of the population is a record of this type. The
+    # positions without individual, and the unused parents, are -1
+    DTYPE = np.dtype([("individual", np.int64),
+                      ("cost", np.float64),
+                      ("ev_time", np.float64),
+                      ("gen_method", np.int8),
+                      ("parents", np.int64, (MAX_PARENTS,))])
+
     def __init__(self, size, sub_generations, configuration, mlc_repository):
         # repository to obtain individuals
         self._mlc_repository = mlc_repository
@@ -49,11 +63,12 @@ class Population(object):
         self._subgen = sub_generations
 
         # Declare MATLAB attributes
-        self._individuals = [-1] * self._size
-        self._costs       = [-1] * self._size
-        self._ev_time     = [-1] * self._size
-        self._gen_method  = [-1] * self._size
-        self._parents     = [[]] * self._size
+        self._data = np.empty(self._size, dtype=Population.DTYPE)
+        self._data["individual"] = -1
+        self._data["cost"] = -1
+        self._data["ev_time"] = -1
+        self._data["gen_method"] = -1
+        self._data["parents"] = -1
 
         # genetic operations for individuals
         self._probrep = self._config.getfloat("OPTIMIZATION", "probrep")
@@ -68,18 +83,78 @@ class Population(object):
         except IndexError:
             return "ERROR"
 
+    # MATLAB attributes as lists. They are copies, so they must be assigned
+    # as a whole
+    @property
+    def _individuals(self):
+        return self._data["individual"].tolist()
+
+    @_individuals.setter
+    def _individuals(self, individuals):
+        self._data["individual"] = individuals
+
+    @property
+    def _costs(self):
+        return self._data["cost"].tolist()
+
+    @_costs.setter
+    def _costs(self, costs):
+        self._data["cost"] = costs
+
+    @property
+    def _ev_time(self):
+        return self._data["ev_time"].tolist()
+
+    @_ev_time.setter
+    def _ev_time(self, ev_time):
+        self._data["ev_time"] = ev_time
+
+    @property
+    def _gen_method(self):
+        return self._data["gen_method"].tolist()
+
+    @_gen_method.setter
+    def _gen_method(self, gen_method):
+        self._data["gen_method"] = gen_method
+
+    @property
+    def _parents(self):
+        return [[parent for parent in parents if parent != -1] for parents in self._data["parents"].tolist()]
+
+    @_parents.setter
+    def _parents(self, parents):
+        self._data["parents"] = Population._parents_to_array(parents)
+
+    @staticmethod
+    def _parents_to_array(parents):
+        array = np.full((len(parents), Population.MAX_PARENTS), -1, dtype=np.int64)
+        for i, indiv_parents in enumerate(parents):
+            array[i, :len(indiv_parents)] = indiv_parents
+        return array
+
+    def set_data(self, individuals, costs, ev_time, gen_method, parents):
+        """
+        Sets the first positions of the population, e.g. with the data
+        loaded from the repository
+        """
+        count = len(individuals)
+        self._data["individual"][:count] = individuals
+        self._data["cost"][:count] = costs
+        self._data["ev_time"][:count] = ev_time
+        self._data["gen_method"][:count] = gen_method
+        self._data["parents"][:count] = Population._parents_to_array(parents)
+
     def is_empty(self):
-        for i in self._individuals:
-            if i != -1:
-                return False
-        return True
+        return bool(np.all(self._data["individual"] == -1))
 
     def is_complete(self):
-        return -1 not in self._individuals
+        return not np.any(self._data["individual"] == -1)
 
     def fill(self, gen_creator):
         gen_creator.create(self._size)
         self.set_individuals(gen_creator.individuals())
+        # The creators add the individuals to the repository of the experiment
+        MLCRepository.get_instance().flush_individuals()
 
     def evaluate(self, evaluator):
         """
@@ -97,66 +172,63 @@ class Population(object):
         """
         # Update table individuals and MATLAB Population indexes and costs
         bad_value = self._config.getfloat('EVALUATOR', 'badvalue')
-        costs = evaluator.evaluate(self._individuals)
-
-        for i in xrange(self._size):
-            new_cost = costs[i]
+        costs = np.array(evaluator.evaluate(self._individuals), dtype=np.float64)
 
-            if new_cost > bad_value or str(new_cost) in ('nan', 'inf'):
-                lg.logger_.debug('Evaluate, invalid value found:%s for individual:%s' % (self._individuals[i], new_cost))
-                new_cost = costs[i] = bad_value
+        # Infinite costs are also greater than the bad value
+        with np.errstate(invalid='ignore'):
+            invalid = (costs > bad_value) | np.isnan(costs)
+        if lg.logger_.isEnabledFor(logging.DEBUG):
+            for i in np.flatnonzero(invalid):
+                lg.logger_.debug('Evaluate, invalid value found:%s for individual:%s' % (self._data["individual"][i], costs[i]))
+        costs[invalid] = bad_value
 
-            lg.logger_.debug('Evaluate Idx: %s - Indiv N#: %s - Cost: %s' % (i, self._individuals[i], new_cost))
+        if lg.logger_.isEnabledFor(logging.DEBUG):
+            for i in xrange(self._size):
+                lg.logger_.debug('Evaluate Idx: %s - Indiv N#: %s - Cost: %s' % (i, self._data["individual"][i], costs[i]))
 
-        self._costs = costs
-        self._ev_time = [time.time()] * self._size
+        self._data["cost"] = costs
+        self._data["ev_time"] = time.time()
 
     def remove_bad_individuals(self):
         # Get the individuals which value is the same as the
         # badvalue defined in the configuration
         bad_value = self._config.getfloat('EVALUATOR', 'badvalue')
-        bad_list = [x for x in xrange(len(self._costs)) if self._costs[x] == bad_value]
+        bad_indexes = np.flatnonzero(self._data["cost"] == bad_value)
 
-        if len(bad_list) > 0.4 * len(self._individuals):
+        if len(bad_indexes) > 0.4 * self._size:
             lg.logger_.info('[POP][BAD_INDIVS] %s '
-                            'individuals will be removed.' % len(bad_list))
+                            'individuals will be removed.' % len(bad_indexes))
 
             # The threshold was surpassed. Remove the individuals and return the
             # list of individuals removed
-            for indiv_index in bad_list:
-                self._remove_individual(indiv_index)
-
-            return bad_list
+            self._remove_individuals(bad_indexes)
+            return bad_indexes.tolist()
         else:
             return []
 
     def remove_duplicates(self):
         # Sort the individual array and get the indexes of every element
-        # in the original list
-        indexes = [i[0] for i in sorted(enumerate(self._individuals), key=lambda x:x[1])]
-        sorted_indivs = sorted(self._individuals)
+        # in the original array. The sort is stable, so the first appearance
+        # of every individual is the one kept
+        indexes = np.argsort(self._data["individual"], kind="mergesort")
+        sorted_indivs = self._data["individual"][indexes]
 
-        # Compare every element in the list with the following one. If they are the same,
+        # Compare every element in the array with the following one. If they are the same,
         # remove the individual
-        i = 0
-        amount_indivs_removed = 0
-        while i < (self._size - 1):
-            if sorted_indivs[i] == sorted_indivs[i + 1]:
-                lg.logger_.debug("[POPULATION] Proceed to remove Individual "
-                                 "N#{indiv})".format(indiv=indexes[i]))
-
-                amount_indivs_removed += 1
-                self._remove_individual(indexes[i + 1])
-            i += 1
+        duplicated = indexes[1:][sorted_indivs[1:] == sorted_indivs[:-1]]
+        lg.logger_.debug("[POPULATION] Proceed to remove Individuals in positions {0}"
+                         .format(duplicated.tolist()))
+        self._remove_individuals(duplicated)
 
+        amount_indivs_removed = len(duplicated)
         lg.logger_.info("[POPULATION] Duplicated Individuals removed: " + str(amount_indivs_removed))
         return amount_indivs_removed
 
-    def _remove_individual(self, index):
-        self._individuals[index] = -1
-        self._costs[index] = -1
-        self._gen_method[index] = -1
-        self._parents[index] = []
+    def _remove_individuals(self, indexes):
+        self._data["individual"][indexes] = -1
+        self._data["cost"][indexes] = -1
+        self._data["gen_method"][indexes] = -1
+        self._data["parents"][indexes] = -1
 
     def update_individual(self, *a, **kw):
         """
@@ -174,24 +246,34 @@ class Population(object):
         cost: Cost asociated with the individual. If the cost is not included in the function,
         the program assumes the individual will have the ssame cost than it's father
         """
-        self._individuals[kw['dest_index']] = kw['indiv_index']
+        dest_index = kw['dest_index']
+        self._data["individual"][dest_index] = kw['indiv_index']
         if not 'cost' in kw:
-            self._costs[kw['dest_index']] = kw['rhs_pop'].get_costs()[kw['parent_index']]
+            self._data["cost"][dest_index] = kw['rhs_pop']._data["cost"][kw['parent_index']]
         else:
-            self._costs[kw['dest_index']] = kw['cost']
-        self._gen_method[kw['dest_index']] = kw['gen_method']
+            self._data["cost"][dest_index] = kw['cost']
+        self._data["gen_method"][dest_index] = kw['gen_method']
 
         if kw['gen_method'] == Population.GenerationMethod.CROSSOVER:
-            self._parents[kw['dest_index']] = [kw['parent_index'] + 1, kw['parent_index_2'] + 1]
+            self._data["parents"][dest_index] = [kw['parent_index'] + 1, kw['parent_index_2'] + 1]
         else:
-            self._parents[kw['dest_index']] = [kw['parent_index'] + 1]
+            self._data["parents"][dest_index] = [kw['parent_index'] + 1, -1]
 
     def get_best_individual(self):
-        best_indivs = [x[0] for x in sorted(enumerate(self._costs), key=lambda x: x[1])]
-        best_index = self._individuals[best_indivs[0]]
-        return best_index, self._mlc_repository.get_individual(best_index), self._costs[best_indivs[0]]
+        # argmin returns the first of the individuals with the minimum cost
+        best = np.argmin(self._data["cost"])
+        best_index = int(self._data["individual"][best])
+        return best_index, self._mlc_repository.get_individual(best_index), float(self._data["cost"][best])
+
+    def evolve(self, next_population, evaluator=None):
+        # The individuals are submitted to a pipelined evaluator as soon as
+        # they are placed in the new population
+        update_individual = next_population.update_individual
+        if evaluator is not None:
+            def update_individual(**kw):
+                next_population.update_individual(**kw)
+                evaluator.submit(kw['indiv_index'])
 
-    def evolve(self, next_population):
         # FIXME: It's not necessary to compute the creation of both subgenerations
         # The ranges of both of them will be the same
         pop_subgen = self.create_subgen()
@@ -212,9 +294,8 @@ class Population(object):
 
             # IMPORTANT: Before the first evolution of the new Population, all the elements are invalid. In the
             # second evolution of Population is when all this algorithm will have any sense
-            not_valid_indexes = [x[0] + subgen2_begin
-                                 for x in enumerate(next_population.get_individuals()[subgen2_begin:subgen2_end + 1])
-                                 if x[1] == -1]
+            subgen2_individuals = next_population._data["individual"][subgen2_begin:subgen2_end + 1]
+            not_valid_indexes = (np.flatnonzero(subgen2_individuals == -1) + subgen2_begin).tolist()
             individuals_created = 0
             param_elitism = self._config.getint('OPTIMIZATION', 'elitism')
 
@@ -229,15 +310,15 @@ class Population(object):
                         # This could cause a IndexError
                         pop_idv_index_dest = not_valid_indexes[individuals_created]
 
-                        indiv_index = self._individuals[pop_idv_index_orig]
+                        indiv_index = int(self._data["individual"][pop_idv_index_orig])
                         lg.logger_.info("Individual {0}/{1}: Elitism - Orig indiv {2} - Dest indiv {3}"
                                         .format(individuals_created + 1, len(not_valid_indexes),
                                                 indiv_index, pop_idv_index_dest + 1))
 
                         # Update the individual in the new population with the first param_elitism
-                        next_population.update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
-                                                  parent_index=pop_idv_index_orig, indiv_index=indiv_index,
-                                                  gen_method=Population.GenerationMethod.ELITISM)
+                        update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
+                                          parent_index=pop_idv_index_orig, indiv_index=indiv_index,
+                                          gen_method=Population.GenerationMethod.ELITISM)
                         individuals_created += 1
 
                 except IndexError:
@@ -247,6 +328,9 @@ class Population(object):
             # completing population
             indivs_to_be_completed = len(not_valid_indexes)
             lg.logger_.info("Elitism finished, number of Individuals to be completed: " + str(indivs_to_be_completed))
+
+            # Every new individual needs about one tournament
+            winners = self._tournament_winners(pop_subgen[i], indivs_to_be_completed - individuals_created)
             while individuals_created < indivs_to_be_completed:
                 indivs_left = indivs_to_be_completed - individuals_created
 
@@ -256,27 +340,27 @@ class Population(object):
                                                          self._probcro)
 
                 if op == Population.GeneticOperation.REPLICATION:
-                    pop_idv_index_orig = self._choose_individual(pop_subgen[i])
+                    pop_idv_index_orig = next(winners)
                     pop_idv_index_dest = not_valid_indexes[individuals_created]
 
-                    indiv_index = self._individuals[pop_idv_index_orig]
+                    indiv_index = int(self._data["individual"][pop_idv_index_orig])
                     lg.logger_.info("Individual {0}/{1}: Replication - Orig indiv {2} - Dest indiv {3}"
                                     .format(individuals_created + 1, len(not_valid_indexes),
                                             indiv_index, pop_idv_index_dest + 1))
 
-                    next_population.update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
-                                                      parent_index=pop_idv_index_orig, indiv_index=indiv_index,
-                                                      gen_method=Population.GenerationMethod.REPLICATION)
+                    update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
+                                      parent_index=pop_idv_index_orig, indiv_index=indiv_index,
+                                      gen_method=Population.GenerationMethod.REPLICATION)
                     individuals_created += 1
 
                 elif op == Population.GeneticOperation.MUTATION:
                     new_ind = None
                     while new_ind is None:
                         try:
-                            pop_idv_index_orig = self._choose_individual(pop_subgen[i])
+                            pop_idv_index_orig = next(winners)
                             pop_idv_index_dest = not_valid_indexes[individuals_created]
 
-                            indiv_index = self._individuals[pop_idv_index_orig]
+                            indiv_index = int(self._data["individual"][pop_idv_index_orig])
                             lg.logger_.info("Individual {0}/{1}: Mutation - Orig indiv {2} - Dest indiv {3}"
                                              .format(individuals_created+1, len(not_valid_indexes),
                                                      indiv_index, pop_idv_index_dest + 1))
@@ -288,9 +372,9 @@ class Population(object):
                             lg.logger_.warn(str(ex))
 
                     number, repeated = self._mlc_repository.add_individual(new_ind)
-                    next_population.update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
-                                                      parent_index=pop_idv_index_orig, indiv_index=number,
-                                                      gen_method=Population.GenerationMethod.MUTATION, cost=-1)
+                    update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
+                                      parent_index=pop_idv_index_orig, indiv_index=number,
+                                      gen_method=Population.GenerationMethod.MUTATION, cost=-1)
                     individuals_created += 1
 
                 elif op == Population.GeneticOperation.CROSSOVER:
@@ -302,16 +386,16 @@ class Population(object):
 
                     while fail:
                         # We need to individuals for the crossover. Get two and check that they are not the same
-                        pop_idv_index_orig = self._choose_individual(pop_subgen[i])
+                        pop_idv_index_orig = next(winners)
                         pop_idv_index_orig2 = pop_idv_index_orig
                         while pop_idv_index_orig == pop_idv_index_orig2:
-                            pop_idv_index_orig2 = self._choose_individual(pop_subgen[i])
+                            pop_idv_index_orig2 = next(winners)
 
                         pop_idv_index_dest = not_valid_indexes[individuals_created]
                         pop_idv_index_dest2 = not_valid_indexes[individuals_created + 1]
 
-                        indiv_index = self._individuals[pop_idv_index_orig]
-                        indiv_index2 = self._individuals[pop_idv_index_orig2]
+                        indiv_index = int(self._data["individual"][pop_idv_index_orig])
+                        indiv_index2 = int(self._data["individual"][pop_idv_index_orig2])
 
 
                         lg.logger_.info("Individual {0}/{1}: Crossover (Pair 1) - Orig indiv {2} - Dest index {3} - "
@@ -329,44 +413,29 @@ class Population(object):
                             lg.logger_.warn(str(ex))
 
                     number, repeated = self._mlc_repository.add_individual(new_ind)
-                    next_population.update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
-                                                      parent_index=pop_idv_index_orig, parent_index_2=pop_idv_index_orig2,
-                                                      indiv_index=number, cost=-1,
-                                                      gen_method=Population.GenerationMethod.CROSSOVER)
+                    update_individual(dest_index=pop_idv_index_dest, rhs_pop=self,
+                                      parent_index=pop_idv_index_orig, parent_index_2=pop_idv_index_orig2,
+                                      indiv_index=number, cost=-1,
+                                      gen_method=Population.GenerationMethod.CROSSOVER)
 
                     number, repeated = self._mlc_repository.add_individual(new_ind2)
-                    next_population.update_individual(dest_index=pop_idv_index_dest2, rhs_pop=self,
-                                                      parent_index=pop_idv_index_orig, parent_index_2=pop_idv_index_orig2,
-                                                      indiv_index=number, cost=-1,
-                                                      gen_method=Population.GenerationMethod.CROSSOVER)
+                    update_individual(dest_index=pop_idv_index_dest2, rhs_pop=self,
+                                      parent_index=pop_idv_index_orig, parent_index_2=pop_idv_index_orig2,
+                                      indiv_index=number, cost=-1,
+                                      gen_method=Population.GenerationMethod.CROSSOVER)
                     individuals_created += 2
 
+        # The new individuals are saved in a single transaction, before the
+        # generation is evaluated
+        self._mlc_repository.flush_individuals()
         return next_population
 
     def sort(self):
-        # Calculate subgenerations
-        subgens = self.create_subgen()
-
-        indivs = []
-        costs = []
-        gen_method = []
-        parents = []
-
-        # Order the MATLAB population attributes per subgeneration
-        for subgen in subgens:
-            # Sort the population by intervals. Reorder the population arrays
-            indexes = [i[0] for i in sorted(enumerate(self._costs[subgen[0]:subgen[1] + 1]), key=lambda x:x[1])]
-
-            for i in xrange(subgen[1] - subgen[0] + 1):
-                indivs.append(self._individuals[indexes[i]])
-                costs.append(self._costs[indexes[i]])
-                gen_method.append(self._gen_method[indexes[i]])
-                parents.append(self._parents[indexes[i]])
-
-        self._individuals = indivs
-        self._costs = costs
-        self._gen_method = gen_method
-        self._parents = parents
+        # Order the MATLAB population attributes per subgeneration. The
+        # sort is stable, so the individuals with the same cost keep their order
+        for begin, end in self.create_subgen():
+            subgen = self._data[begin:end + 1]
+            subgen[:] = subgen[np.argsort(subgen["cost"], kind="mergesort")]
 
     def create_subgen(self):
         # Create subgenerations from the actual Population
@@ -416,42 +485,86 @@ class Population(object):
 
         return op
 
-    def _choose_individual(self, subgen_range):
-        selection_method = self._config.get("OPTIMIZATION", "selectionmethod")
-
-        if selection_method == "tournament":
-            tournament_size = self._config.getint("OPTIMIZATION", "tournamentsize")
-            # Get randomly as many individuals as tournament_size property is set
-            indivs_chosen = []
-            subgen_len = subgen_range[1] - subgen_range[0] + 1
-
-            # FIXME: What happen if the size of the tournament is greater
-            # than the amount of individuals in the subgeneration?. Ask Thomas
-
-            for i in range(tournament_size):
-                # FIXME: This is soooo wrong. The individuals obtained will be always the ones
-                # in the first subgeneration. That's because we are working with the length of the
-                # subgeneration instead of the indexes
-                random_indiv = -1
-                while random_indiv == -1 or random_indiv in indivs_chosen:
-                    random_indiv = math.ceil(RandomManager.rand() * subgen_len) - 1
-                indivs_chosen.append(int(random_indiv))
-
-            # Got the random indivs. Grab the one with the minor cost
-            cost = float('inf')
-            indiv_chosen = None
-            for index in indivs_chosen:
-                if self._costs[index] < cost:
-                    cost = self._costs[index]
-                    indiv_chosen = index
-
-            return indiv_chosen
+    def choose_individuals(self, subgen_range, amount):
+        """
+        Runs amount tournaments between the individuals of the subgeneration
+        and returns an array with the indexes of the winners. The randoms of
+        all the tournaments are drawn at once
+        """
+        subgen_len = subgen_range[1] - subgen_range[0] + 1
+        tournament_size = self._get_tournament_size(subgen_len)
+        random_state = RandomManager.numpy_random_state()
+
+        if 2 * tournament_size > subgen_len:
+            # Most of the subgeneration is in every tournament. Shuffle it
+            candidates = np.argsort(random_state.random_sample((amount, subgen_len)), axis=1)[:, :tournament_size]
         else:
+            # The individuals of a tournament must be different. Draw again
+            # the tournaments with repeated individuals
+            candidates = random_state.randint(subgen_len, size=(amount, tournament_size))
+            repeated = Population._has_repeated(candidates)
+            while repeated.any():
+                candidates[repeated] = random_state.randint(subgen_len, size=(repeated.sum(), tournament_size))
+                repeated = Population._has_repeated(candidates)
+
+        # The winner is the first individual with the minor cost
+        candidates += subgen_range[0]
+        return candidates[np.arange(amount), np.argmin(self._data["cost"][candidates], axis=1)]
+
+    @staticmethod
+    def _has_repeated(candidates):
+        sorted_candidates = np.sort(candidates, axis=1)
+        return (sorted_candidates[:, 1:] == sorted_candidates[:, :-1]).any(axis=1)
+
+    def _tournament_winners(self, subgen_range, amount):
+        """
+        Yields the winners of the tournaments of the subgeneration, drawing
+        them in batches of amount tournaments. While the randoms of a file
+        are replayed, every tournament is drawn when it is needed, in order to
+        consume the randoms in the same order than MATLAB
+        """
+        while True:
+            if RandomManager.is_replaying():
+                yield self._choose_individual(subgen_range)
+            else:
+                for winner in self.choose_individuals(subgen_range, max(amount, 1)).tolist():
+                    yield winner
+
+    def _choose_individual(self, subgen_range):
+        subgen_len = subgen_range[1] - subgen_range[0] + 1
+        tournament_size = self._get_tournament_size(subgen_len)
+
+        # Get randomly as many individuals as tournament_size property is set
+        indivs_chosen = []
+        for i in range(tournament_size):
+            random_indiv = -1
+            while random_indiv == -1 or random_indiv in indivs_chosen:
+                random_indiv = math.ceil(RandomManager.rand() * subgen_len) - 1
+            indivs_chosen.append(int(random_indiv))
+
+        # Got the random indivs. Grab the one with the minor cost
+        cost = float('inf')
+        indiv_chosen = None
+        for index in indivs_chosen:
+            if self._data["cost"][subgen_range[0] + index] < cost:
+                cost = self._data["cost"][subgen_range[0] + index]
+                indiv_chosen = subgen_range[0] + index
+
+        return indiv_chosen
+
+    def _get_tournament_size(self, subgen_len):
+        config = self._config.snapshot()
+        selection_method = config.get("OPTIMIZATION", "selectionmethod")
+
+        if selection_method != "tournament":
             # FIXME: This validation must be done at the beginning of the program
             lg.logger_.error("[POPULATION] choose_individual: Invalid selection method."
                              "Correct it and relaunch the program.")
             sys.exit(-1)
 
+        # A tournament can not have more individuals than the subgeneration
+        return min(config.getint("OPTIMIZATION", "tournamentsize"), subgen_len)
+
     def get_size(self):
         return self._size
 
@@ -460,11 +573,14 @@ class Population(object):
 
     def set_individuals(self, indiv_list):
         for x in indiv_list:
-            self._individuals[x[0]] = int(x[1])
+            self._data["individual"][x[0]] = int(x[1])
 
     def get_costs(self):
         return self._costs
 
+    def get_ev_times(self):
+        return self._ev_time
+
     def get_gen_methods(self):
         return self._gen_method
 
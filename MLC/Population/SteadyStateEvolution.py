@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import time
+import MLC.Log.log as lg
+import numpy as np
+
+from MLC.Common.RandomManager import RandomManager
+from MLC.db.mlc_repository import MLCRepository
+from MLC.individual.Individual import OperationOverIndividualFail
+from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.Population.Population import Population
+from MLC.Simulation import Simulation
+
+
+class SteadyStateEvolution(object):
+    """
+    Asynchronous steady-state evolution, for cost functions whose
+    evaluation times vary widely. Instead of waiting for a whole generation,
+    a bounded amount of evaluations is kept in flight: every time one of them
+    finishes, a new offspring is started. The individual that finished
+    faces a tournament of the archive (the current population), and replaces
+    its worst individual if its cost is lower.
+
+    The archive is saved as a new generation (a pseudo-generation) every
+    time as many evaluations as the size of the population finish. Its
+    individuals are sorted by cost, the ones that survived are saved as
+    elitism and the parents are the positions in the previous generation.
+
+    Parameters of the OPTIMIZATION section:
+        - mode: steady_state enables this evolution, generational (the
+            default) evaluates the whole generation at once.
+        - steady_state_inflight: evaluations in flight. 0 starts one per core.
+    """
+
+    def __init__(self, evaluator, in_flight):
+        self._config = Config.get_instance()
+        self._repository = MLCRepository.get_instance()
+        self._evaluator = evaluator
+        self._in_flight = max(1, in_flight)
+
+        self._bad_value = self._config.getfloat('EVALUATOR', 'badvalue')
+        self._look_for_duplicates = self._config.getboolean('OPTIMIZATION', 'lookforduplicates')
+        self._probrep = self._config.getfloat("OPTIMIZATION", "probrep")
+        self._probmut = self._config.getfloat("OPTIMIZATION", "probmut")
+        self._probcro = self._config.getfloat("OPTIMIZATION", "probcro")
+
+    def run(self, population, generation, to_generation, on_new_generation):
+        """
+        Evolve the population of the generation until to_generation
+        generations are saved. on_new_generation is called with the number
+        of every generation saved
+        """
+        self._set_archive(population)
+        random_state = RandomManager.numpy_random_state()
+
+        # Individual -> list of (generation method, parents) of its evaluations
+        started = {}
+        evaluations_started = 0
+        completed = 0
+
+        while generation < to_generation:
+            while evaluations_started < self._in_flight:
+                for index, gen_method, parents in self._create_offspring(random_state, started):
+                    started.setdefault(index, []).append((gen_method, parents))
+                    self._evaluator.start(index)
+                    evaluations_started += 1
+            self._repository.flush_individuals()
+
+            index, cost = self._evaluator.next_completed()
+            evaluations_started -= 1
+            gen_method, parents = started[index].pop(0)
+            if not started[index]:
+                del started[index]
+
+            self._insert(random_state, index, cost, gen_method, parents)
+
+            completed += 1
+            if completed == len(self._individuals):
+                completed = 0
+                generation += 1
+                self._save_archive(generation)
+                on_new_generation(generation)
+
+        # Nothing waits for the evaluations still in flight
+        self._evaluator.cancel()
+
+    def _set_archive(self, population):
+        self._individuals = np.array(population.get_individuals(), dtype=np.int64)
+        self._costs = np.array(population.get_costs(), dtype=np.float64)
+        self._ev_time = np.array(population.get_ev_times(), dtype=np.float64)
+
+        # Position -> (generation method, parents) of the individuals
+        # inserted after the last generation saved
+        self._created = {}
+        self._previous = self._individuals.tolist()
+
+    def _tournament_size(self):
+        return min(self._config.getint("OPTIMIZATION", "tournamentsize"), len(self._individuals))
+
+    def _tournament(self, random_state, worst=False):
+        candidates = random_state.choice(len(self._individuals), self._tournament_size(), replace=False)
+        costs = self._costs[candidates]
+        return int(candidates[np.argmax(costs) if worst else np.argmin(costs)])
+
+    def _create_offspring(self, random_state, started):
+        """
+        Return a list of (individual, generation method, parent individuals)
+        with the offspring to be evaluated. The list is empty when the
+        genetic operation failed or, if the duplicates are not allowed, when
+        the offspring is in the archive or being evaluated
+        """
+        op = Population.choose_genetic_operation(2, self._probrep, self._probmut, self._probcro)
+        parent = int(self._individuals[self._tournament(random_state)])
+
+        offspring = []
+        try:
+            if op == Population.GeneticOperation.REPLICATION:
+                offspring.append((parent, Population.GenerationMethod.REPLICATION, [parent]))
+
+            elif op == Population.GeneticOperation.MUTATION:
+                new_ind = self._repository.get_individual(parent).mutate()
+                number, repeated = self._repository.add_individual(new_ind)
+                offspring.append((number, Population.GenerationMethod.MUTATION, [parent]))
+
+            else:
+                parent2 = parent
+                while parent2 == parent:
+                    parent2 = int(self._individuals[self._tournament(random_state)])
+
+                old_indiv = self._repository.get_individual(parent)
+                new_ind, new_ind2, fail = old_indiv.crossover(self._repository.get_individual(parent2))
+                if not fail:
+                    for ind in [new_ind, new_ind2]:
+                        number, repeated = self._repository.add_individual(ind)
+                        offspring.append((number, Population.GenerationMethod.CROSSOVER, [parent, parent2]))
+
+        except OperationOverIndividualFail, ex:
+            lg.logger_.warn(str(ex))
+
+        if self._look_for_duplicates:
+            in_archive = set(self._individuals.tolist())
+            offspring = [child for child in offspring
+                         if child[0] not in in_archive and child[0] not in started]
+        return offspring
+
+    def _insert(self, random_state, index, cost, gen_method, parents):
+        if np.isnan(cost) or cost > self._bad_value:
+            cost = self._bad_value
+
+        if self._look_for_duplicates and index in self._individuals:
+            return
+
+        worst = self._tournament(random_state, worst=True)
+        if cost >= self._costs[worst]:
+            return
+
+        lg.logger_.debug("[STEADY_STATE] Individual {0} (cost {1}) replaces individual {2} (cost {3})"
+                         .format(index, cost, self._individuals[worst], self._costs[worst]))
+        self._individuals[worst] = index
+        self._costs[worst] = cost
+        self._ev_time[worst] = time.time()
+        self._created[worst] = (gen_method, parents)
+
+    def _save_archive(self, generation):
+        positions = dict((indiv, position) for position, indiv in enumerate(self._previous))
+
+        gen_methods = []
+        parents = []
+        for position, index in enumerate(self._individuals.tolist()):
+            if position in self._created:
+                gen_method, indiv_parents = self._created[position]
+            else:
+                gen_method, indiv_parents = Population.GenerationMethod.ELITISM, [index]
+
+            # The parents inserted after the last generation saved are lost
+            gen_methods.append(gen_method)
+            parents.append([positions[parent] + 1 for parent in indiv_parents if parent in positions])
+
+        population = Simulation.create_empty_population_for(generation)
+        population.set_data(self._individuals.tolist(), self._costs.tolist(),
+                            self._ev_time.tolist(), gen_methods, parents)
+        population.sort()
+        self._repository.add_population(population)
+
+        lg.logger_.info("Population created. Number: %s - Size: %s" % (generation, population.get_size()))
+        self._created = {}
+        self._previous = population.get_individuals()
@@ -1,6 +1,7 @@
 
 from base import BaseConnection
+from buffered import BufferedConnection
 from serialconnection import SerialConnection
 from mockconnection import MockConnection
 
-__all__ = ["BaseConnection", "SerialConnection", "MockConnection" ]
+__all__ = ["BaseConnection", "BufferedConnection", "SerialConnection", "MockConnection" ]
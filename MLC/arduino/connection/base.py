@@ -43,6 +43,12 @@ class BaseConnection:
         """ Receive data from the arduino device """
         raise NotImplementedError
 
+    def recv_into(self, buffer):
+        """ Receive len(buffer) bytes from the arduino device into a writable buffer """
+        length = len(buffer)
+        buffer[:] = self.recv(length)
+        return length
+
     def wake_up(self):
         raise NotImplementedError
 
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+from base import BaseConnection
+
+BUFFER_SIZE = 4096
+
+
+class RingBuffer(object):
+    """
+    Fixed size FIFO of bytes. The bytes wrap around the end of a bytearray,
+    so reading and writing never move the bytes already buffered
+    """
+
+    def __init__(self, capacity):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._capacity = capacity
+        # Position of the first buffered byte and amount of bytes buffered
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def capacity(self):
+        return self._capacity
+
+    def free(self):
+        return self._capacity - self._length
+
+    def write(self, data):
+        """ Appends the data (str, bytearray or memoryview) at the end of the buffer """
+        length = len(data)
+        if length > self.free():
+            raise ValueError("Not enough room in the buffer: %d bytes received, %d free" % (length, self.free()))
+
+        end = (self._start + self._length) % self._capacity
+        first = min(length, self._capacity - end)
+        self._view[end:end + first] = data[:first]
+        self._view[:length - first] = data[first:]
+        self._length += length
+
+    def read_into(self, view):
+        """ Moves up to len(view) bytes from the buffer to the memoryview. Returns the amount of bytes moved """
+        length = min(len(view), self._length)
+        first = min(length, self._capacity - self._start)
+        view[:first] = self._view[self._start:self._start + first]
+        view[first:length] = self._view[:length - first]
+        self._start = (self._start + length) % self._capacity
+        self._length -= length
+        return length
+
+    def read(self, length):
+        """ Removes up to length bytes from the buffer and returns them """
+        data = bytearray(min(length, self._length))
+        self.read_into(memoryview(data))
+        return str(data)
+
+
+class BufferedConnection(BaseConnection):
+    '''
+    Connection that reads all the bytes available into a ring buffer, so
+    consecutive small receptions are served from memory
+
+    The subclasses implement _read_raw with the reads of the device
+    '''
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self._ring = RingBuffer(buffer_size)
+
+    def _read_raw(self, length, max_length):
+        """
+        Reads from the device at least "length" bytes and no more than
+        "max_length". Returns the bytes read
+
+        Raises:
+            ConnectionTimeoutException: If "length" bytes could not be received
+        """
+        raise NotImplementedError
+
+    def recv(self, length):
+        """ Receives the specified amount of bytes """
+        if length <= len(self._ring):
+            return self._ring.read(length)
+
+        data = bytearray(length)
+        self.recv_into(data)
+        return str(data)
+
+    def recv_into(self, buffer):
+        """
+        Receives len(buffer) bytes into a writable buffer (bytearray or
+        memoryview), without creating intermediate strings. Returns the
+        amount of bytes received
+        """
+        view = memoryview(buffer)
+        length = len(view)
+        received = self._ring.read_into(view)
+        if received < length:
+            # The ring is empty now. Read the missing bytes and everything
+            # else available, keeping the bytes left over for next receptions
+            missing = length - received
+            data = memoryview(self._read_raw(missing, max(missing, self._ring.capacity())))
+            view[received:] = data[:missing]
+            self._ring.write(data[missing:])
+
+        return length
@@ -19,21 +19,34 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-from base import BaseConnection
+from base import BaseConnection, ConnectionTimeoutException
 
 class MockConnection(BaseConnection):
     """ Connection that save the data sent using "send" method and response 
         on a "recv" call using a pre-configured response buffer
     """
-    def __init__(self, responses):
-        """ response -- bytes stream of responses that will be used in recv method """
+    def __init__(self, responses, responder=None):
+        """
+        responses -- bytes stream of responses that will be used in recv method
+        responder -- optional function that builds the response of every data sent. If it is
+                     given, recv only returns the responses of the data already sent, in order
+        """
         self._received = []
         self._responses = responses
         self._resp_idx = 0
+        self._responder = responder
+        self._pending = ""
     
     def send(self, data):
         """ \"sends\" the data to a inner buffer """
-        self._received.insert(0,data)
+        # Copied, as the actuation frames reuse their buffer
+        self._received.insert(0,str(data))
+        if self._responder is not None:
+            self._pending += self._responder(str(data))
+
+    def pending(self):
+        """ Bytes of the responses of the data sent that were not received yet """
+        return len(self._pending)
 
     def pop_data(self):
         """ Pops a complete data stream received """
@@ -45,6 +58,12 @@ class MockConnection(BaseConnection):
 
         length -- count of bytes to \"receive\"
         """
+        if self._responder is not None:
+            if len(self._pending) < length:
+                raise ConnectionTimeoutException("no response for the data sent")
+            data, self._pending = self._pending[:length], self._pending[length:]
+            return data
+
         pos = self._resp_idx
         if pos + length > len(self._responses):
             self._resp_idx = (length - (len(self._responses)-pos))%len(self._responses)
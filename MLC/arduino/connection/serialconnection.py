@@ -19,7 +19,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-from base import BaseConnection, ConnectionException, ConnectionTimeoutException
+from base import ConnectionException, ConnectionTimeoutException
+from buffered import BufferedConnection
 from collections import namedtuple
 import serial
 
@@ -29,7 +30,7 @@ class SerialConnectionException(ConnectionException):
         ConnectionException.__init__(self, "Error in connection initialization. {0}".format(what))
 
 
-class SerialConnection(BaseConnection):
+class SerialConnection(BufferedConnection):
 
     def __init__(self, **args):
         """ Starts a serial connection
@@ -48,6 +49,7 @@ class SerialConnection(BaseConnection):
         if "port" not in args.keys():
             raise ValueError("Port is mandatory!")
 
+        BufferedConnection.__init__(self)
         args["baudrate"] = 115200 if "baudrate" not in args.keys() else args["baudrate"]
         args["parity"] = serial.PARITY_NONE if "parity" not in args.keys() else args["parity"]
         args["stopbits"] = serial.STOPBITS_ONE if "stopbits" not in args.keys() else args["stopbits"]
@@ -78,19 +80,20 @@ class SerialConnection(BaseConnection):
         except serial.SerialTimeoutException, err:
             raise ConnectionTimeoutException("write operation timeout after {0} seconds".format(self._write_timeout))
 
-    def recv(self, length):
-        """ Receives the specified amount of bytes
+    def _read_raw(self, length, max_length):
+        """ Receives the specified amount of bytes, plus the ones already available (up to max_length)
         WARNING: This function will raise SerialTimeoutException if the recv bytes are not equals to expected bytes
 
         Keyword arguments:
         length -- amount of bytes to receive
-        
+        max_length -- maximum amount of bytes to receive
+
         Raises:
             ConnectionTimeoutException: In case that the "length" of bytes is not received
         """
-        recv = self._connection.read(length)
+        recv = self._connection.read(max(length, min(self._connection.inWaiting(), max_length)))
 
-        if len(recv) != length:
+        if len(recv) < length:
             raise ConnectionTimeoutException("timeout when receiving expected data")
         else:
             return recv
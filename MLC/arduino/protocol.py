@@ -21,6 +21,8 @@
 
 import collections
 import boards
+import numpy as np
+import struct
 from collections import namedtuple
 from connection.base import ConnectionException
 from connection.base import invalid_connection_builder
@@ -57,6 +59,49 @@ class ProtocolSetupException(ProtocolException):
     def __init__(self, what):
         ProtocolException.__init__(self, "Setup error: %s" % (what))
 
+
+class ActuationFrame(object):
+    """
+    ACTUATE command of a fixed set of output pins, built by
+    ArduinoInterface.compile_actuation. The command is kept in a bytearray,
+    so every control step only writes the new values in place.
+    """
+
+    def __init__(self, pins, analog_pins):
+        self._pins = list(pins)
+
+        # The payload is every pin followed by its value: two bytes (big
+        # endian) for the analog pins and one byte for the digital ones
+        self._payload = struct.Struct(">" + "".join("BH" if pin in analog_pins else "BB" for pin in pins))
+        self._fields = []
+        for pin in pins:
+            self._fields.extend([pin, 0])
+
+        header = _PROTOCOL_CMDS["ACTUATE"] + struct.pack(">I", self._payload.size)
+        self._payload_offset = len(header)
+        self._buffer = bytearray(header) + bytearray(self._payload.size)
+        self._payload.pack_into(self._buffer, self._payload_offset, *self._fields)
+
+    def get_pins(self):
+        return self._pins
+
+    def get_buffer(self):
+        return self._buffer
+
+    def set_values(self, values):
+        """
+        values -- values of the pins, in the order used to compile the frame
+        """
+        if len(values) != len(self._pins):
+            raise ValueError("The actuation needs %s values, %s received" % (len(self._pins), len(values)))
+
+        self._fields[1::2] = values
+        try:
+            self._payload.pack_into(self._buffer, self._payload_offset, *self._fields)
+        except struct.error, err:
+            raise ValueError("Invalid actuation value: %s" % err)
+
+
 class ArduinoInterface:
     # 0=input 1=output -- wiring_constants.h
 
@@ -71,6 +116,9 @@ class ArduinoInterface:
         self._read_count = 0  # Default number of inputs read
         self._read_delay = 0
         self._board = board
+        self._report_plan = None
+        # {tuple of output pins: ActuationFrame} of the actuations done
+        self._frames = {}
 
     def get_analog_inputs(self):
         return self._anlg_inputs()
@@ -127,6 +175,7 @@ class ArduinoInterface:
         self._report_mode = mode
         self._read_count = read_count - 1
         self._read_delay = read_delay
+        self._report_plan = None
 
         self._connection.send(_PROTOCOL_CMDS["REPORT_MODE"] % (
             chr(self._report_mode), chr(self._read_count), chr(self._read_delay)))
@@ -136,6 +185,7 @@ class ArduinoInterface:
             raise ProtocolSetupException("Pin %s is configured as output!" % self.__get_arduino_pin_id(port))
 
         self.__validate_pin(port)
+        self._report_plan = None
 
         # Determines if we are setting as input an analog port
         if port not in self._anlg_inputs and port in self._board["ANALOG_PINS"]:
@@ -185,6 +235,22 @@ class ArduinoInterface:
         self._connection.send(_PROTOCOL_CMDS["RESET"])
         self._anlg_outputs = []
         self._digital_outputs = []
+        self._frames = {}
+
+    def compile_actuation(self, pins):
+        """
+        Builds the ACTUATE command of a fixed set of output pins. The frame
+        can be used in every call to actuate_frame, without validating the
+        pins and building the command again
+
+        arguments:
+        pins -- output pins, in the order their values will be given
+        """
+        for pin in pins:
+            if pin not in self._anlg_outputs and pin not in self._digital_outputs:
+                raise ProtocolSetupException("Port %s not configured as output!" % self.__get_arduino_pin_id(pin))
+
+        return ActuationFrame(pins, self._anlg_outputs)
 
     def actuate(self, data):
         """
@@ -194,77 +260,142 @@ class ArduinoInterface:
         arguments:
         data -- port & value set to actuate
         """
-        payload = ""
-        size = 0
-
-        # Sets as payload every digital or analog port
-        for i in data:
-            if i[0] not in self._anlg_outputs and i[0] not in self._digital_outputs:
-                pin = self.__get_arduino_pin_id(i[0])
-                raise ProtocolSetupException("Port %s not configured as output!" % pin)
-            if i[0] in self._anlg_outputs:
-                payload = "".join(
-                    [payload, chr(i[0]), chr((i[1] & 0xFF00) >> 8), chr(i[1] & 0x00FF)])
-                size += 3
-            if i[0] in self._digital_outputs:
-                payload = "".join([payload, chr(i[0]), chr(i[1])])
-                size += 2
+        return self.actuate_frame(*self.__get_frame(data))
 
-        self._connection.send(
-            "".join([_PROTOCOL_CMDS["ACTUATE"], chr((size & 0xFF000000) >> 24), chr((size & 0x00FF0000) >> 16),
-                     chr((size & 0x0000FF00) >> 8), chr(size & 0x000000FF), payload]))
+    def actuate_frame(self, frame, values=None):
+        """
+        Actuate with a frame built by compile_actuation and return the
+        report of the inputs
+
+        arguments:
+        frame -- compiled frame of the output pins
+        values -- new values of the pins. The last ones are used if None
+        """
+        self.__send_frame(frame, values)
+        return self.__recv_report()
+
+    def actuate_pipelined(self, steps, window=2):
+        """
+        Actuate a sequence of steps without waiting the report of every step
+        before sending the next one. Up to "window" steps are sent ahead, and
+        their reports are yielded in the same order of the steps
+
+        arguments:
+        steps -- iterable of port & value sets to actuate, as used in actuate
+        window -- maximum amount of steps waiting for their report
+        """
+        if window < 1:
+            raise ValueError("The actuation window must be positive")
+
+        in_flight = 0
+        try:
+            for data in steps:
+                if in_flight == window:
+                    in_flight -= 1
+                    yield self.__recv_report()
+
+                self.__send_frame(*self.__get_frame(data))
+                in_flight += 1
+
+            while in_flight:
+                in_flight -= 1
+                yield self.__recv_report()
+        finally:
+            # The steps already sent are reported anyway (after an error, or
+            # if the caller stops iterating). Consume their reports, so the
+            # next actuation reads its own one
+            while in_flight:
+                in_flight -= 1
+                try:
+                    self.__recv_report()
+                except ProtocolIOException, err:
+                    lg.logger_.debug("[ARDUINO] Discarding report of a pipelined actuation: %s" % err)
+
+    def __get_frame(self, data):
+        pins = tuple(port for port, value in data)
+        frame = self._frames.get(pins)
+        if frame is None:
+            frame = self.compile_actuation(pins)
+            self._frames[pins] = frame
+
+        return frame, [value for port, value in data]
+
+    def __send_frame(self, frame, values):
+        if values is not None:
+            frame.set_values(values)
+
+        self._connection.send(frame.get_buffer())
+
+    def __recv_report(self):
+        # The response code is followed by four bytes: the error code after
+        # an ACK, or the length of the payload of an ACTUATE_REPORT
         # FIXME catch connection exceptions
-        response = self._connection.recv(1)
+        header = self._connection.recv(5)
+        response = header[0]
 
         if response == _PROTOCOL_CMDS["ACK"]:
-            response = self._connection.recv(4)  # Clears buffer
-            raise ProtocolIOException("Actuate error. Code: %s" % response)
+            raise ProtocolIOException("Actuate error. Code: %s" % header[1:])
 
         if response != _PROTOCOL_CMDS["ACTUATE_REPORT"]:
-            response = self._connection.recv(4)
             raise ProtocolIOException(
                 "Actuate error. Unknown response %s after actuate operation" % ord(response))
+
+        # The payload gets its own buffer, as the analog reads are views of it
+        payload = bytearray(struct.unpack(">I", header[1:])[0])
         # FIXME catch connection exceptions
-        raw_len = self._connection.recv(4)
-        length = (ord(raw_len[0]) << 24) + (ord(raw_len[1]) << 16) + (ord(raw_len[2]) << 8) + ord(raw_len[3])
-        # FIXME catch connection exceptions
-        data = self._connection.recv(length)
+        self._connection.recv_into(payload)
+        return self.__decode_report(payload)
+
+    def __get_report_plan(self):
+        """
+        Returns {pin: (result key, is analog, block size)} with the layout of
+        the block that every input pin has in the ACTUATE_REPORT payload. A
+        block is the pin followed by its reads: two bytes (big endian) per
+        analog read, or one bit per digital read
+        """
+        if self._report_plan is None:
+            reads = self._read_count + 1
+            analog_offset = len(self._board["DIGITAL_PINS"])
+            self._report_plan = {}
+            for pin in self._anlg_inputs:
+                self._report_plan[pin] = ("A%d" % (pin - analog_offset), True, 1 + 2 * reads)
+            for pin in self._digital_inputs:
+                self._report_plan[pin] = ("D%d" % (pin), False, 1 + (reads + 7) / 8)
+        return self._report_plan
+
+    def __decode_report(self, data):
+        """
+        Returns {pin key: array of reads} with the reads of every input pin
+        in the payload, a bytearray. The analog reads are views of the
+        payload, they are not copied. In AVERAGE mode, the arrays have only
+        the average of the reads
+        """
+        plan = self.__get_report_plan()
+        reads = self._read_count + 1
+        average = self._report_mode == REPORT_MODES.AVERAGE
 
+        results = dict((key, np.empty(0)) for key, _, _ in plan.itervalues())
         pos = 0
-        digital_res = {"D%d" % (x): [] for x in self._digital_inputs}
-        analog_res = {"A%d" % (x - len(self._board["DIGITAL_PINS"])): [] for x in self._anlg_inputs}
-        # results = {x: []
-        # for x in self._anlg_inputs + self._digital_inputs}  # One dictionary
-        # to save all ports results
-
-        results = dict(digital_res.items() + analog_res.items())
-
-        while pos < length:
-            pin = ord(data[pos])
-            if pin in self._anlg_inputs:
-                for i in range(0, self._read_count + 1):
-                    results["A%d" % (pin - len(self._board["DIGITAL_PINS"]))].append(
-                        (ord(data[pos + 1]) << 8) + ord(data[pos + 2]))
-                    pos = pos + 2
-                pos = pos + 1
-
-                if self._report_mode == REPORT_MODES.AVERAGE:
-                    results["A%d" % (pin - len(self._board["DIGITAL_PINS"]))] = [
-                        sum(results["A%d" % (pin - len(self._board["DIGITAL_PINS"]))]) / (self._read_count + 1)]
+        while pos < len(data):
+            pin = data[pos]
+            if pin not in plan:
+                raise ProtocolIOException(
+                    "Unknown port \"%d\" in response. Please, restart the Arduino board and the experiment." % pin)
+
+            key, is_analog, size = plan[pin]
+            if is_analog:
+                values = np.frombuffer(data, dtype='>u2', count=reads, offset=pos + 1)
+                if average:
+                    values = np.array([values.sum(dtype=np.int64) // reads])
             else:
-                if pin in self._digital_inputs:
-                    for i in range(0, self._read_count + 1):
-                        results["D%d" % (pin)].append(
-                            bool(ord(data[pos + 1 + i / 8]) & (0x01 << (i % 8))))
-                    pos = pos + 1 + self._read_count / 8 + 1
-
-                    if self._report_mode == REPORT_MODES.AVERAGE:
-                        results["D%d" % (pin)] = [
-                            (sum(results["D%d" % (pin)]) * 2) > (self._read_count + 1)]
-
-                else:
-                    raise ProtocolIOException(
-                        "Unknown port \"%d\" in response. Please, restart the Arduino board and the experiment." % pin)
+                # The first read is the least significant bit of the first byte
+                bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=size - 1, offset=pos + 1))
+                values = bits.reshape(-1, 8)[:, ::-1].ravel()[:reads].astype(bool)
+                if average:
+                    values = np.array([values.sum() * 2 > reads])
+
+            results[key] = values
+            pos += size
 
         return results
 
@@ -32,8 +32,12 @@ class MLCRepositoryHelper:
 
     @staticmethod
     def get_hash_for_individual(individual):
+        return MLCRepositoryHelper.get_hash_for_value(individual.get_value())
+
+    @staticmethod
+    def get_hash_for_value(value):
         m = hashlib.md5()
-        m.update(individual.get_value())
+        m.update(value)
         return m.hexdigest()
 
 
@@ -105,6 +109,13 @@ class MLCRepository:
     def add_individual(self, individual):
         raise NotImplementedError("This method must be implemented")
 
+    def flush_individuals(self):
+        """
+        Saves the individuals added since the last call. The individuals are
+        saved in batches, so this must be called before they are evaluated
+        """
+        raise NotImplementedError("This method must be implemented")
+
     def update_individual(self, individual_id, individual):
         raise NotImplementedError("This method must be implemented")
 
@@ -131,6 +142,47 @@ class MLCRepository:
                                evaluation_time, generation=-1):
         raise NotImplementedError("This method must be implemented")
 
+    # cost cache
+    def get_cached_cost(self, individual_hash):
+        """
+        Returns a tuple (cost, evaluations) with the cost cached for the
+        individual and the number of evaluations averaged in it, or None if
+        the individual was never evaluated
+        """
+        raise NotImplementedError("This method must be implemented")
+
+    def update_cached_costs(self, cached_costs):
+        """
+        Saves a list of tuples (individual_hash, cost, evaluations)
+        """
+        raise NotImplementedError("This method must be implemented")
+
+    # evaluation checkpoints
+    def save_checkpoint(self, generation, population):
+        """
+        Saves the population of the generation that is about to be
+        evaluated. It replaces the previous checkpoint
+        """
+        raise NotImplementedError("This method must be implemented")
+
+    def get_checkpoint(self, generation):
+        """
+        Returns a tuple (population, {individual_id: cost}) with the
+        population checkpointed for the generation and the costs already
+        saved, or None if there is no checkpoint of the generation
+        """
+        raise NotImplementedError("This method must be implemented")
+
+    def add_checkpoint_costs(self, generation, costs):
+        """
+        Saves a list of tuples (individual_id, cost) in the checkpoint of
+        the generation
+        """
+        raise NotImplementedError("This method must be implemented")
+
+    def clear_checkpoint(self):
+        raise NotImplementedError("This method must be implemented")
+
     # board configuration
     def save_board_configuration(self, board_config, board_id=None):
         raise NotImplementedError("This method must be implemented")
@@ -169,4 +221,10 @@ class MLCRepository:
         else:
             database = SQLiteRepository.IN_MEMORY_DB
 
-        MLCRepository._instance = SQLiteRepository(database, init_db=first_init)
+        # 0 keeps every individual of the experiment in memory
+        individuals_cache_size = 0
+        if Config.get_instance().has_option("BEHAVIOUR", "individuals_cache_size"):
+            individuals_cache_size = Config.get_instance().getint("BEHAVIOUR", "individuals_cache_size")
+
+        MLCRepository._instance = SQLiteRepository(database, init_db=first_init,
+                                                   individuals_cache_size=individuals_cache_size)
@@ -38,18 +38,116 @@ def stmt_create_table_population():
                             FOREIGN KEY(indiv_id) REFERENCES individual(indiv_id))'''
 
 
-def stmt_delete_generation(generation):
+def stmt_create_table_cost_cache():
+    return ''' CREATE TABLE IF NOT EXISTS cost_cache(hash TEXT PRIMARY KEY,
+                                                   cost real,
+                                                   evaluations INTEGER)'''
+
+
+def stmt_create_index_population_gen_cost():
+    return '''CREATE INDEX IF NOT EXISTS population_gen_cost ON population(gen, cost)'''
+
+
+def stmt_create_index_population_indiv_gen():
+    return '''CREATE INDEX IF NOT EXISTS population_indiv_gen ON population(indiv_id, gen)'''
+
+
+def stmt_add_column_individual_hash():
+    return '''ALTER TABLE individual ADD COLUMN hash TEXT'''
+
+
+def stmt_fill_individual_hashes():
+    # individual_hash is a function registered in every connection
+    return '''UPDATE individual SET hash = individual_hash(value) WHERE hash IS NULL'''
+
+
+def stmt_create_index_individual_hash():
+    return '''CREATE INDEX IF NOT EXISTS individual_hash ON individual(hash)'''
+
+
+def stmt_drop_index_individual_hash():
+    return '''DROP INDEX IF EXISTS individual_hash'''
+
+
+def stmt_create_unique_index_individual_hash():
+    return '''CREATE UNIQUE INDEX IF NOT EXISTS individual_hash ON individual(hash)'''
+
+
+def stmt_create_table_checkpoint_population():
+    return ''' CREATE TABLE IF NOT EXISTS checkpoint_population(position INTEGER PRIMARY KEY,
+                                                              gen INTEGER,
+                                                              cost real,
+                                                              evaluation_time INTEGER,
+                                                              gen_method INTEGER,
+                                                              parents TEXT,
+                                                              indiv_id INTEGER)'''
+
+
+def stmt_create_table_checkpoint_cost():
+    return ''' CREATE TABLE IF NOT EXISTS checkpoint_cost(gen INTEGER,
+                                                        indiv_id INTEGER,
+                                                        cost real,
+                                                        PRIMARY KEY (gen, indiv_id))'''
+
+
+def stmt_get_schema_version():
+    return '''PRAGMA user_version'''
+
+
+def stmt_set_schema_version(version):
+    # Pragmas do not accept bound parameters
+    return '''PRAGMA user_version = %d''' % int(version)
+
+
+def stmt_schema_migrations():
+    """
+    Statements that upgrade the schema of the databases created by previous
+    versions of MLC. The migration N takes the database to the schema
+    version N + 1. The migrations of the changes done before the schema
+    version was stored must be safe to run over databases that already have
+    them, because those experiments also start in version 0.
+    New migrations must be appended at the end of the list.
+    """
+    return [
+        # 1: cache of the costs of the individuals already evaluated
+        [stmt_create_table_cost_cache()],
+        # 2: indexes used to get generations and the data of the individuals
+        [stmt_create_index_population_gen_cost(),
+         stmt_create_index_population_indiv_gen()],
+        # 3: hash of the individuals, used to find them without loading them
+        [stmt_add_column_individual_hash(),
+         stmt_fill_individual_hashes(),
+         stmt_create_index_individual_hash()],
+        # 4: the hash identifies the individual, even between processes
+        [stmt_drop_index_individual_hash(),
+         stmt_create_unique_index_individual_hash()],
+        # 5: checkpoints of the generation being evaluated
+        [stmt_create_table_checkpoint_population(),
+         stmt_create_table_checkpoint_cost()],
+    ]
+
+
+def stmt_get_all_cached_costs():
+    return '''SELECT hash, cost, evaluations FROM cost_cache'''
+
+
+def stmt_update_cached_cost():
+    return '''INSERT OR REPLACE INTO cost_cache (hash, cost, evaluations)
+              VALUES (?, ?, ?)'''
+
+
+def stmt_delete_generation():
     return """DELETE FROM population
-              WHERE gen = %s""" % (generation,)
+              WHERE gen = ?"""
 
 
-def stmt_delete_from_generations(from_generation):
+def stmt_delete_from_generations():
     return """DELETE FROM population
-              WHERE gen >= %s""" % (from_generation,)
+              WHERE gen >= ?"""
 
-def stmt_delete_to_generations(to_generation):
+def stmt_delete_to_generations():
     return """DELETE FROM population
-              WHERE gen <= %s""" % (to_generation,)
+              WHERE gen <= ?"""
 
 def stmt_delete_unused_individuals():
     return '''DELETE FROM individual
@@ -57,7 +155,7 @@ def stmt_delete_unused_individuals():
 
 
 def stmt_get_unused_individuals():
-    return '''SELECT indiv_id FROM individual
+    return '''SELECT indiv_id, hash FROM individual
               WHERE indiv_id NOT IN (SELECT DISTINCT indiv_id FROM population)'''
 
 
@@ -70,21 +168,49 @@ def stmt_get_generations():
     return '''SELECT distinct gen FROM population'''
 
 
-def stmt_insert_individual_in_population(generation, indiv_id, cost, evaluation_time, gen_method, parents):
+def stmt_insert_individual_in_population():
     return '''INSERT INTO population (gen, cost, evaluation_time, gen_method, parents, indiv_id)
-              VALUES (%s, "%s", %s, %s, "%s", %s)''' % (generation,
-                                                        cost,
-                                                        evaluation_time,
-                                                        gen_method,
-                                                        parents,
-                                                        indiv_id)
+              VALUES (?, ?, ?, ?, ?, ?)'''
 
 
-def stmt_get_individuals_from_population(generation):
+def stmt_get_individuals_from_population():
     return '''SELECT indiv_id, cost, evaluation_time, gen_method, parents, ID
               FROM population
-              WHERE gen = %s
-              ORDER BY ID''' % generation
+              WHERE gen = ?
+              ORDER BY ID'''
+
+
+def stmt_insert_individual_in_checkpoint():
+    return '''INSERT INTO checkpoint_population (position, gen, cost, evaluation_time, gen_method, parents, indiv_id)
+              VALUES (?, ?, ?, ?, ?, ?, ?)'''
+
+
+def stmt_get_individuals_from_checkpoint():
+    return '''SELECT indiv_id, cost, evaluation_time, gen_method, parents
+              FROM checkpoint_population
+              WHERE gen = ?
+              ORDER BY position'''
+
+
+def stmt_update_checkpoint_cost():
+    return '''INSERT OR REPLACE INTO checkpoint_cost (gen, indiv_id, cost)
+              VALUES (?, ?, ?)'''
+
+
+def stmt_get_checkpoint_costs():
+    return '''SELECT indiv_id, cost FROM checkpoint_cost WHERE gen = ?'''
+
+
+def stmt_delete_checkpoint_population():
+    return '''DELETE FROM checkpoint_population'''
+
+
+def stmt_delete_checkpoint_costs():
+    return '''DELETE FROM checkpoint_cost'''
+
+
+def stmt_delete_checkpoint_costs_of_other_gens():
+    return '''DELETE FROM checkpoint_cost WHERE gen != ?'''
 
 
 class SQLSaveFormal:
@@ -101,54 +227,65 @@ class SQLSaveFormal:
         return indiv_formal_column.split('@')
 
 
-def stmt_insert_individual(individual_id, individual):
-    return '''INSERT INTO individual VALUES (%s, "%s", "%s", %s)''' % (individual_id,
-                                                                       individual.get_value(),
-                                                                       SQLSaveFormal.to_sql(individual.get_formal()),
-                                                                       individual.get_complexity())
+def stmt_insert_individual():
+    # The individual is not inserted if its hash already exists
+    return '''INSERT OR IGNORE INTO individual (value, formal, complexity, hash)
+              VALUES (?, ?, ?, ?)'''
 
 
 def stmt_get_all_individuals():
-    return '''SELECT indiv_id, value, formal, complexity
+    return '''SELECT indiv_id, value, formal, complexity, hash
               from individual
               ORDER BY indiv_id'''
 
 
-def stmt_get_individual_data(indiv_id):
+def stmt_get_individual():
+    return '''SELECT value, formal, complexity
+              FROM individual
+              WHERE indiv_id = ?'''
+
+
+def stmt_get_individual_id_by_hash():
+    return '''SELECT indiv_id FROM individual WHERE hash = ?'''
+
+
+def stmt_count_individuals():
+    return '''SELECT COUNT(*) FROM individual'''
+
+
+def stmt_get_individual_data():
     return '''SELECT gen, cost, evaluation_time
               FROM population
-              WHERE indiv_id = %s''' % (indiv_id)
+              WHERE indiv_id = ?'''
 
 
 def stmt_get_individuals_data():
-    return '''SELECT indiv_id, gen, cost, evaluation_time
+    return '''SELECT population.indiv_id, gen, cost, evaluation_time, value
               FROM   population
-              ORDER BY indiv_id'''
+              JOIN   individual ON individual.indiv_id = population.indiv_id
+              ORDER BY population.indiv_id'''
 
 
-def stmt_update_all_costs(individual_id, cost, evaluation_time):
+def stmt_update_all_costs():
     return '''UPDATE population
-              SET cost = %s, evaluation_time = %s
-              WHERE indiv_id = %s''' % (cost, evaluation_time, individual_id)
+              SET cost = ?, evaluation_time = ?
+              WHERE indiv_id = ?'''
 
 
-def stmt_update_cost(individual_id, cost, evaluation_time, generation):
+def stmt_update_cost():
     return '''UPDATE population
-              SET cost = %s, evaluation_time = %s
-              WHERE indiv_id = %s AND gen = %s''' % (cost,
-                                                     evaluation_time,
-                                                     individual_id,
-                                                     generation)
+              SET cost = ?, evaluation_time = ?
+              WHERE indiv_id = ? AND gen = ?'''
 """
 The individual with the least cost in the last population 
 is considered to be the best individual
 """
 def stmt_get_individual_with_min_cost_in_last_pop():
-    return '''SELECT indiv_id, 
-                     cost 
-                FROM population 
-            ORDER BY gen DESC, 
-                     cost ASC 
+    return '''SELECT indiv_id,
+                     cost
+                FROM population
+               WHERE gen = (SELECT MAX(gen) FROM population)
+            ORDER BY cost IS NULL, cost ASC
                LIMIT 1'''
 
 def stmt_enable_foreign_key():
@@ -20,8 +20,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 import sqlite3
+import threading
 import time
 
+from collections import OrderedDict
+
 from MLC.db.mlc_repository import MLCRepository
 from MLC.db.mlc_repository import MLCRepositoryHelper, IndividualData
 from MLC.individual.Individual import Individual
@@ -40,38 +43,83 @@ logger = get_gui_logger()
 class SQLiteRepository(MLCRepository):
     IN_MEMORY_DB = ":memory:"
 
-    def __init__(self, database, init_db=False):
-        self._conn = sqlite3.connect(database)
+    # Pragmas of the connections to a database file. WAL lets the readers
+    # (e.g. the GUI browsing a running experiment) work without blocking the
+    # writer, and a synchronous NORMAL is safe in that mode
+    FILE_DB_PRAGMAS = ["PRAGMA journal_mode = WAL",
+                       "PRAGMA synchronous = NORMAL",
+                       "PRAGMA cache_size = -16000"]
+
+    def __init__(self, database, init_db=False, individuals_cache_size=0):
         self._database = database
 
+        # Every thread works with its own connection. An in memory database
+        # only exists in the connection that created it, so it is shared
+        self._thread_connections = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._shared_conn = None
+        if self._database == SQLiteRepository.IN_MEMORY_DB:
+            self._shared_conn = self.__connect()
+
         if init_db:
             self.__initialize_db()
 
-        self.__execute(stmt_enable_foreign_key())
+        # Upgrade the databases of experiments created with older versions
+        self.__migrate_schema()
 
         # cache for population
         gen_numbers = self._get_generations()
         self.__generations = len(gen_numbers)
         self.__base_gen = gen_numbers[0] if gen_numbers else 1
 
-        # all individuals: {individual_id: (Individual, generated(bool))
-        self.__individuals = self.__load_individuals()
+        # individuals in memory: {individual_id: Individual}, sorted from
+        # the least to the most recently used. With a cache size, the
+        # individuals are loaded on demand and only the most recently used
+        # are kept. Otherwise, all of them are loaded now
+        self.__individuals_cache_size = individuals_cache_size
+        self.__individuals = OrderedDict() if self.__lazy_loading() else {}
+
+        # {hash: individual_id} of the individuals in memory, only used when
+        # all of them are loaded. Otherwise they are found in the DB
         self._hashlist = {}
 
-        # load hashes
-        for indiv_id, individual in self.__individuals.items():
-            hash = MLCRepositoryHelper.get_hash_for_individual(individual)
-            self._hashlist[hash] = indiv_id
+        if not self.__lazy_loading():
+            self.__load_individuals()
 
-        # enhancement
-        self.__next_individual_id = 1 if not self.__individuals else max(self.__individuals.keys()) + 1
-        self.__individuals_to_flush = {}
+        # costs of the individuals already evaluated: {hash: (cost, evaluations)}
+        self.__cached_costs = self.__load_cached_costs()
 
     def close(self):
-        self._conn.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                # The individuals not flushed yet are kept
+                conn.commit()
+                conn.close()
+            self._connections = []
+        self._thread_connections = threading.local()
+        self._shared_conn = None
+
+    def __connect(self):
+        # The connections are only used by the thread that opened them, but
+        # they are closed by the thread that closes the repository
+        conn = sqlite3.connect(self._database, check_same_thread=False)
+        if self._database != SQLiteRepository.IN_MEMORY_DB:
+            for pragma in SQLiteRepository.FILE_DB_PRAGMAS:
+                conn.execute(pragma)
+
+        # Foreign keys are enabled per connection
+        conn.execute(stmt_enable_foreign_key())
+        conn.create_function("individual_hash", 1,
+                             lambda value: MLCRepositoryHelper.get_hash_for_value(str(value)))
+
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
 
     def __initialize_db(self):
-        cursor = self._conn.cursor()
+        conn = self.__get_db_connection()
+        cursor = conn.cursor()
 
         # MLC Population tables
         cursor.execute(stmt_create_table_individuals())
@@ -85,68 +133,77 @@ class SQLiteRepository(MLCRepository):
         cursor.execute(stmt_create_table_pwm_pin())
 
         cursor.close()
-        self._conn.commit()
+        conn.commit()
 
-    def __get_db_connection(self, reopen_connection=False):
-        # TODO: Workaround. SQLite throw an exception when a connection is used 
-        # in different threads. To solve it, we create a new connection 
-        # every time a new connection is delivered
-        if self._database != SQLiteRepository.IN_MEMORY_DB:
-            # Close the previous connection
-            try:
-                self._conn.close()
-            except sqlite3.ProgrammingError:
-                # FIXME: There are open connections that cannot be closed for 
-                # the Thread bug. See what can be done
-                pass
-
-            self._conn = sqlite3.connect(self._database)
-        return self._conn
-
-    def __insert_individuals_pending(self, individual):
-        individual_id = self.__next_individual_id
-        self.__individuals_to_flush[individual_id] = individual
-        self.__next_individual_id += 1
-        return individual_id
-
-    def __flush_individuals(self):
+    def __migrate_schema(self):
         conn = self.__get_db_connection()
-        cursor = conn.cursor()
-        for individual_id in sorted(self.__individuals_to_flush.keys()):
-            cursor.execute(stmt_insert_individual(individual_id, self.__individuals_to_flush[individual_id]))
-        cursor.close()
-        conn.commit()
-        self.__individuals_to_flush = {}
+        version = conn.execute(stmt_get_schema_version()).fetchone()[0]
+        migrations = stmt_schema_migrations()
+
+        for new_version in range(version + 1, len(migrations) + 1):
+            logger.info("[SQLITE_REPO] Upgrading the schema of the database {0} to version {1}"
+                        .format(self._database, new_version))
+            cursor = conn.cursor()
+            for statement in migrations[new_version - 1]:
+                cursor.execute(statement)
+            cursor.execute(stmt_set_schema_version(new_version))
+            cursor.close()
+            conn.commit()
+
+    def __get_db_connection(self):
+        if self._shared_conn is not None:
+            return self._shared_conn
+
+        conn = getattr(self._thread_connections, "conn", None)
+        if conn is None:
+            conn = self.__connect()
+            self._thread_connections.conn = conn
+        return conn
+
+    def __lazy_loading(self):
+        return self.__individuals_cache_size > 0
+
+    def __cache_individual(self, individual_id, individual):
+        self.__individuals[individual_id] = individual
+        if self.__lazy_loading() and len(self.__individuals) > self.__individuals_cache_size:
+            self.__individuals.popitem(last=False)
 
     # operation over generations
     def add_population(self, population):
-        self.__flush_individuals()
-
         conn = self.__get_db_connection()
         cursor = conn.cursor()
 
         try:
             next_gen_id = self.__base_gen + self.__generations
-            for i in range(len(population._individuals)):
-                individual_id = population._individuals[i]
-                individual_cost = population._costs[i]
-                evaluation_time = population._ev_time[i]
-                individual_gen_method = population._gen_method[i]
-                individual_parents = ','.join(str(elem) for elem in population._parents[i])
-                cursor.execute(stmt_insert_individual_in_population(next_gen_id,
-                                                                    individual_id,
-                                                                    individual_cost,
-                                                                    evaluation_time,
-                                                                    individual_gen_method,
-                                                                    individual_parents))
+            cursor.executemany(stmt_insert_individual_in_population(),
+                               SQLiteRepository.__population_rows(next_gen_id, population))
+            conn.commit()
+
         except sqlite3.IntegrityError:
+            conn.rollback()
             raise KeyError("Trying to insert an invalid Individual")
 
-        cursor.close()
-        conn.commit()
+        finally:
+            cursor.close()
 
         self.__generations += 1
 
+    @staticmethod
+    def __population_rows(gen_id, population):
+        rows = []
+        for individual, cost, ev_time, gen_method, parents in zip(population.get_individuals(),
+                                                                  population.get_costs(),
+                                                                  population.get_ev_times(),
+                                                                  population.get_gen_methods(),
+                                                                  population.get_parents()):
+            rows.append((gen_id,
+                         cost,
+                         ev_time,
+                         gen_method,
+                         ','.join(str(elem) for elem in parents),
+                         individual))
+        return rows
+
     def get_population(self, generation):
         gen_id = self.__base_gen + generation - 1
         pop = self.__load_population(gen_id)
@@ -161,7 +218,9 @@ class SQLiteRepository(MLCRepository):
             return
 
         gen_id = self.__base_gen + from_generation - 1
-        self.__execute(stmt_delete_from_generations(gen_id))
+        self.__execute(stmt_delete_from_generations(), (gen_id,))
+        # The checkpoint belongs to a generation that is evolved again
+        self.clear_checkpoint()
         self.__generations = from_generation - 1
         if from_generation == 1:
             self.__base_gen = 1
@@ -171,7 +230,7 @@ class SQLiteRepository(MLCRepository):
             to_generation = self.__generations
 
         gen_id = self.__base_gen + to_generation - 1
-        self.__execute(stmt_delete_to_generations(gen_id))
+        self.__execute(stmt_delete_to_generations(), (gen_id,))
         self.__generations = self.__generations - to_generation
         if self.__generations == 0:
             self.__base_gen = 1
@@ -186,17 +245,16 @@ class SQLiteRepository(MLCRepository):
         cursor = conn.execute(stmt_get_unused_individuals())
 
         for row in cursor:
-            to_delete.append(row[0])
+            to_delete.append((row[0], str(row[1])))
         cursor.close()
 
         # delete individuals from the DB
         self.__execute(stmt_delete_unused_individuals())
 
         # delete them from the cache
-        for indiv_id in to_delete:
-            individual_to_delete = self.__individuals[indiv_id]
-            del self.__individuals[indiv_id]
-            del self._hashlist[MLCRepositoryHelper.get_hash_for_individual(individual_to_delete)]
+        for indiv_id, hash in to_delete:
+            self.__individuals.pop(indiv_id, None)
+            self._hashlist.pop(hash, None)
 
         return len(to_delete)
 
@@ -207,12 +265,36 @@ class SQLiteRepository(MLCRepository):
         if hash in self._hashlist:
             return self._hashlist[hash], True
 
-        individual_id = self.__insert_individuals_pending(individual)
+        # The unique index on the hash does the deduplication, so it also
+        # works with the individuals added by other processes. The new
+        # individuals are committed together by flush_individuals
+        conn = self.__get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(stmt_insert_individual(), (individual.get_value(),
+                                                      SQLSaveFormal.to_sql(individual.get_formal()),
+                                                      individual.get_complexity(),
+                                                      hash))
+            exists = cursor.rowcount == 0
+            if exists:
+                individual_id = cursor.execute(stmt_get_individual_id_by_hash(), (hash,)).fetchone()[0]
+            else:
+                individual_id = cursor.lastrowid
+        finally:
+            cursor.close()
 
-        self.__individuals[individual_id] = individual
-        self._hashlist[hash] = individual_id
+        if not self.__lazy_loading():
+            self._hashlist[hash] = individual_id
+            self.__cache_individual(individual_id, individual)
+        elif not exists:
+            self.__cache_individual(individual_id, individual)
 
-        return individual_id, False
+        return individual_id, exists
+
+    def flush_individuals(self):
+        # Ends the transaction opened by add_individual, so the database is
+        # not locked while the individuals are evaluated
+        self.__get_db_connection().commit()
 
     def update_individual(self, individual_id, individual):
         raise NotImplementedError("This method must be implemented")
@@ -230,19 +312,29 @@ class SQLiteRepository(MLCRepository):
         return min_indiv_id
 
     def get_individual(self, individual_id):
+        if not self.__lazy_loading():
+            try:
+                return self.__individuals[individual_id]
+            except KeyError:
+                raise KeyError("Individual N#%s does not exists" % individual_id)
+
         try:
-            return self.__individuals[individual_id]
+            individual = self.__individuals.pop(individual_id)
         except KeyError:
-            raise KeyError("Individual N#%s does not exists" % individual_id)
+            individual = self.__load_individual(individual_id)
+
+        # Keep the most recently used individuals at the end of the dictionary
+        self.__cache_individual(individual_id, individual)
+        return individual
 
     def get_individual_data(self, individual_id):
         try:
-            data = IndividualData(self.__individuals[individual_id].get_value())
+            data = IndividualData(self.get_individual(individual_id).get_value())
             conn = self.__get_db_connection()
-            cursor = conn.execute(stmt_get_individual_data(individual_id))
+            cursor = conn.execute(stmt_get_individual_data(), (individual_id,))
 
             for row in cursor:
-                data._add_data(row[0] - self.__base_gen + 1, row[1], row[2])
+                data._add_data(row[0] - self.__base_gen + 1, SQLiteRepository.__cost_from_sql(row[1]), row[2])
 
             cursor.close()
             conn.commit()
@@ -260,42 +352,102 @@ class SQLiteRepository(MLCRepository):
         for row in cursor:
             indiv_id = row[0]
             if indiv_id not in indiv_data_dict:
-                data = IndividualData(self.__individuals[indiv_id].get_value())
+                data = IndividualData(str(row[4]))
                 indiv_data_dict[indiv_id] = data
 
-            indiv_data_dict[indiv_id]._add_data(row[1], row[2], row[3])
+            indiv_data_dict[indiv_id]._add_data(row[1], SQLiteRepository.__cost_from_sql(row[2]), row[3])
 
         cursor.close()
         conn.commit()
         return indiv_data_dict
 
     def count_individual(self):
-        return len(self.__individuals)
+        if not self.__lazy_loading():
+            return len(self.__individuals)
+
+        conn = self.__get_db_connection()
+        return conn.execute(stmt_count_individuals()).fetchone()[0]
 
     # special methods
     def update_individual_cost(self, individual_id, cost, evaluation_time, generation=-1):
         stmt_to_update_cost = None
 
         if generation == -1:
-            stmt_to_update_cost = stmt_update_all_costs(individual_id, cost, evaluation_time)
+            stmt_to_update_cost = stmt_update_all_costs()
+            parameters = (cost, evaluation_time, individual_id)
         else:
-            stmt_to_update_cost = stmt_update_cost(individual_id, cost,
-                                                   evaluation_time,
-                                                   generation + self.__base_gen - 1)
+            stmt_to_update_cost = stmt_update_cost()
+            parameters = (cost, evaluation_time, individual_id, generation + self.__base_gen - 1)
+
+        logger.debug("[SQLITE_REPO] [UPDATE_INDIV_COST] - Query executed: {0} - Parameters: {1}"
+                     .format(stmt_to_update_cost, parameters))
+        self.__execute(stmt_to_update_cost, parameters)
 
-        logger.debug("[SQLITE_REPO] [UPDATE_INDIV_COST] - Query executed: {0}"
-                     .format(stmt_to_update_cost))
-        self.__execute(stmt_to_update_cost)
+    # cost cache
+    def get_cached_cost(self, individual_hash):
+        return self.__cached_costs.get(individual_hash)
+
+    def update_cached_costs(self, cached_costs):
+        conn = self.__get_db_connection()
+        cursor = conn.cursor()
+        cursor.executemany(stmt_update_cached_cost(), cached_costs)
+        cursor.close()
+        conn.commit()
+
+        for individual_hash, cost, evaluations in cached_costs:
+            self.__cached_costs[individual_hash] = (cost, evaluations)
+
+    # evaluation checkpoints
+    def save_checkpoint(self, generation, population):
+        conn = self.__get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(stmt_delete_checkpoint_population())
+        # The costs of the generation are kept if its individuals are updated
+        cursor.execute(stmt_delete_checkpoint_costs_of_other_gens(), (generation,))
+        cursor.executemany(stmt_insert_individual_in_checkpoint(),
+                           [(position,) + row for position, row in
+                            enumerate(SQLiteRepository.__population_rows(generation, population))])
+        cursor.close()
+        conn.commit()
+
+    def get_checkpoint(self, generation):
+        population = self.__load_population(generation, stmt_get_individuals_from_checkpoint())
+        if population.is_empty():
+            return None
+
+        conn = self.__get_db_connection()
+        cursor = conn.execute(stmt_get_checkpoint_costs(), (generation,))
+        costs = dict((row[0], SQLiteRepository.__cost_from_sql(row[1])) for row in cursor)
+        cursor.close()
+        return population, costs
+
+    def add_checkpoint_costs(self, generation, costs):
+        conn = self.__get_db_connection()
+        conn.executemany(stmt_update_checkpoint_cost(),
+                         [(generation, index, cost) for index, cost in costs])
+        conn.commit()
 
-    def __execute(self, statement):
-        # print ">>> %s" % statement
+    def clear_checkpoint(self):
         conn = self.__get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(statement)
+        cursor.execute(stmt_delete_checkpoint_population())
+        cursor.execute(stmt_delete_checkpoint_costs())
+        cursor.close()
+        conn.commit()
+
+    def __execute(self, statement, parameters=()):
+        conn = self.__get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(statement, parameters)
         cursor.close()
         conn.commit()
         return cursor.lastrowid
 
+    @staticmethod
+    def __cost_from_sql(cost):
+        # SQLite stores NaN values as NULL
+        return float('nan') if cost is None else cost
+
     def _get_generations(self):
         generations = []
         conn = self.__get_db_connection()
@@ -306,39 +458,52 @@ class SQLiteRepository(MLCRepository):
         conn.commit()
         return sorted(generations)
 
-    def __load_population(self, generation):
-        i = 0
+    def __load_population(self, generation, statement=stmt_get_individuals_from_population()):
         population = Simulation.create_empty_population_for(generation)
         conn = self.__get_db_connection()
-        cursor = conn.execute(stmt_get_individuals_from_population(generation))
-        for row in cursor:
-            population._individuals[i] = row[0]
-            population._costs[i] = row[1]
-            population._ev_time[i] = row[2]
-            population._gen_method[i] = row[3]
+        cursor = conn.execute(statement, (generation,))
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.commit()
 
-            if not row[4] == '':
-                population._parents[i] = [int(elem) for elem in row[4].split(',')]
-            else:
-                population._parents[i] = []
+        population.set_data([row[0] for row in rows],
+                            [SQLiteRepository.__cost_from_sql(row[1]) for row in rows],
+                            [row[2] for row in rows],
+                            [row[3] for row in rows],
+                            [[int(elem) for elem in row[4].split(',')] if row[4] else [] for row in rows])
+        return population
+
+    def __load_cached_costs(self):
+        cached_costs = {}
+        conn = self.__get_db_connection()
+        cursor = conn.execute(stmt_get_all_cached_costs())
+
+        for row in cursor:
+            cached_costs[str(row[0])] = (SQLiteRepository.__cost_from_sql(row[1]), row[2])
 
-            i += 1
         cursor.close()
         conn.commit()
-        return population
+        return cached_costs
 
     def __load_individuals(self):
-        individuals = {}
         conn = self.__get_db_connection()
         cursor = conn.execute(stmt_get_all_individuals())
 
         for row in cursor:
             new_individual = Individual(str(row[1]), SQLSaveFormal.from_sql(row[2]), row[3])
-            individuals[row[0]] = new_individual
+            self.__individuals[row[0]] = new_individual
+            self._hashlist[str(row[4])] = row[0]
 
         cursor.close()
         conn.commit()
-        return individuals
+
+    def __load_individual(self, individual_id):
+        conn = self.__get_db_connection()
+        row = conn.execute(stmt_get_individual(), (individual_id,)).fetchone()
+        if row is None:
+            raise KeyError("Individual N#%s does not exists" % individual_id)
+
+        return Individual(str(row[0]), SQLSaveFormal.from_sql(row[1]), row[2])
 
     # board configuration
     def save_board_configuration(self, board_config, board_id=None):
@@ -349,29 +514,29 @@ class SQLiteRepository(MLCRepository):
         try:
             # save/update board configuration
             if board_id is None:
-                cursor.execute(stmt_insert_board(board_config.board_type["SHORT_NAME"],
-                                                 0, # serial connection hardcoded
-                                                 board_config.read_count,
-                                                 board_config.read_delay,
-                                                 board_config.report_mode,
-                                                 board_config.analog_resolution))
+                cursor.execute(stmt_insert_board(), (board_config.board_type["SHORT_NAME"],
+                                                     0, # serial connection hardcoded
+                                                     board_config.read_count,
+                                                     board_config.read_delay,
+                                                     board_config.report_mode,
+                                                     board_config.analog_resolution))
                 board_id = cursor.lastrowid
             else:
-                cursor.execute(stmt_update_board(board_id,
-                                                 board_config.board_type["SHORT_NAME"],
-                                                 0,
-                                                 board_config.read_count,
-                                                 board_config.read_delay,
-                                                 board_config.report_mode,
-                                                 board_config.analog_resolution))
+                cursor.execute(stmt_update_board(), (board_config.board_type["SHORT_NAME"],
+                                                     0,
+                                                     board_config.read_count,
+                                                     board_config.read_delay,
+                                                     board_config.report_mode,
+                                                     board_config.analog_resolution,
+                                                     board_id))
                 if cursor.rowcount < 1:
                     raise KeyError("Board %s does not exist" % board_id)
 
             # if board update is successful, update board pins
             # delete board pin configuration
-            cursor.execute(stmt_delete_digital_pin(board_id))
-            cursor.execute(stmt_delete_analog_pin(board_id))
-            cursor.execute(stmt_delete_pwm_pin(board_id))
+            cursor.execute(stmt_delete_digital_pin(), (board_id,))
+            cursor.execute(stmt_delete_analog_pin(), (board_id,))
+            cursor.execute(stmt_delete_pwm_pin(), (board_id,))
 
             # update digital pins
             self.__insert_pins(board_config.digital_input_pins, cursor, stmt_insert_digital_pin, board_id, 0)
@@ -382,8 +547,7 @@ class SQLiteRepository(MLCRepository):
             self.__insert_pins(board_config.analog_output_pins, cursor, stmt_insert_analog_pin, board_id, 1)
 
             # update pwm pins
-            for pin_id in board_config.pwm_pins:
-                cursor.execute(stmt_insert_pwm_pin(board_id, pin_id))
+            cursor.executemany(stmt_insert_pwm_pin(), [(pin_id, board_id) for pin_id in board_config.pwm_pins])
 
         except Exception:
             raise
@@ -394,14 +558,13 @@ class SQLiteRepository(MLCRepository):
         return board_id
 
     def __insert_pins(self, pin_list, cursor, stmt_insert_pin, board_id, pin_type):
-        for pin_id in pin_list:
-            cursor.execute(stmt_insert_pin(board_id, pin_id, pin_type))
+        cursor.executemany(stmt_insert_pin(), [(pin_id, board_id, pin_type) for pin_id in pin_list])
 
     def __get_pins(self, cursor, stmt_get_pins, board_id):
         input_pins = []
         output_pins = []
 
-        for row in cursor.execute(stmt_get_pins(board_id)):
+        for row in cursor.execute(stmt_get_pins(), (board_id,)):
             pin_id, pin_type = row[0], row[1]
             if pin_type == 0:
                 input_pins.append(pin_id)
@@ -421,7 +584,7 @@ class SQLiteRepository(MLCRepository):
     def load_board_configuration(self, board_id):
         protocol = None
         conn = self.__get_db_connection()
-        cursor = conn.execute(stmt_get_board(board_id))
+        cursor = conn.execute(stmt_get_board(), (board_id,))
 
         for row in cursor:
             board_type = filter(lambda x: x["SHORT_NAME"] == row[0], types)
@@ -446,7 +609,7 @@ class SQLiteRepository(MLCRepository):
         protocol.digital_input_pins.extend(input_pins)
         protocol.digital_output_pins.extend(output_pins)
 
-        for row in cursor.execute(stmt_get_pwm_pins(board_id)):
+        for row in cursor.execute(stmt_get_pwm_pins(), (board_id,)):
             protocol.pwm_pins.append(row[0])
 
         cursor.close()
@@ -460,21 +623,21 @@ class SQLiteRepository(MLCRepository):
         try:
             # save/update board configuration
             if connection_id is None:
-                cursor.execute(stmt_insert_serial_connection(board_id,
-                                                             serial_connection.port,
-                                                             serial_connection.baudrate,
-                                                             serial_connection.parity,
-                                                             serial_connection.stopbits,
-                                                             serial_connection.bytesize))
+                cursor.execute(stmt_insert_serial_connection(), (board_id,
+                                                                 serial_connection.port,
+                                                                 serial_connection.baudrate,
+                                                                 serial_connection.parity,
+                                                                 serial_connection.stopbits,
+                                                                 serial_connection.bytesize))
                 connection_id = cursor.lastrowid
             else:
-                cursor.execute(stmt_update_serial_connection(connection_id,
-                                                             board_id,
-                                                             serial_connection.port,
-                                                             serial_connection.baudrate,
-                                                             serial_connection.parity,
-                                                             serial_connection.stopbits,
-                                                             serial_connection.bytesize))
+                cursor.execute(stmt_update_serial_connection(), (board_id,
+                                                                 serial_connection.port,
+                                                                 serial_connection.baudrate,
+                                                                 serial_connection.parity,
+                                                                 serial_connection.stopbits,
+                                                                 serial_connection.bytesize,
+                                                                 connection_id))
                 if cursor.rowcount < 1:
                     raise KeyError("Connection %s does not exist" % board_id)
         except sqlite3.IntegrityError:
@@ -491,7 +654,7 @@ class SQLiteRepository(MLCRepository):
         serial_connection = None
 
         conn = self.__get_db_connection()
-        cursor = conn.execute(stmt_get_serial_connection(board_id))
+        cursor = conn.execute(stmt_get_serial_connection(), (board_id,))
 
         for row in cursor:
             serial_connection = SerialConnectionConfig(port=row[0],
@@ -26,8 +26,12 @@ from collections import Counter
 from MLC.mlc_parameters.mlc_parameters import Config
 from MLC.Common.Operations import Operations
 from MLC.Common.LispTreeExpr.LispTreeExpr import LispTreeExpr
+from MLC.Common.LispTreeExpr.OperationNodes import OpNodeFactory
+from MLC.Common.LispTreeExpr.TreeNodes import LeafNode
+from MLC.Common.LispTreeExpr.TreeKernel import TreeKernelCache
 from MLC.Common.RandomManager import RandomManager
 from MLC.Common.PreevaluationManager import PreevaluationManager
+from MLC.db.mlc_repository import MLCRepositoryHelper
 
 
 class IndividualException(Exception):
@@ -114,9 +118,6 @@ class Individual(object):
             self._complexity = self._tree.complexity()
             self._value = self._tree.get_expanded_tree_as_string()
 
-        self._range = self._config.getint("POPULATION", "range")
-        self._precision = self._config.getint("POPULATION", "precision")
-
     @property
     def _tree(self):
         if self._lazy_tree is None:
@@ -129,8 +130,7 @@ class Individual(object):
 
     def mutate(self, mutation_type=MutationType.ANY):
         try:
-            new_value = self.__mutate_tree(mutation_type)
-            return Individual(new_value)
+            return self.__mutate_tree(mutation_type)
 
         except TreeException, ex:
             raise OperationOverIndividualFail(self._value, "MUTATE", str(ex))
@@ -141,9 +141,9 @@ class Individual(object):
             [NEW_IND1,NEW_IND2,FAIL]=CROSSOVER(MLCIND1,MLCIND2,MLC_PARAMETERS)
         """
         try:
-            new_value_1, new_value_2 = self.__crossover_tree(other_individual)
-            indiv1 = Individual(new_value_1)
-            indiv2 = Individual(new_value_2)
+            new_root_1, new_root_2 = self.__crossover_tree(other_individual)
+            indiv1 = Individual.from_root_node(new_root_1)
+            indiv2 = Individual.from_root_node(new_root_2)
 
             # Check if the individual is valid
             preev_function = PreevaluationManager.get_callback()
@@ -151,14 +151,25 @@ class Individual(object):
             if preev_function is None:
                 success = True
             else:
-                preev_function = PreevaluationManager.get_callback()
                 success = preev_function.preev(indiv1) and preev_function.preev(indiv2)
 
-            return Individual(new_value_1), Individual(new_value_2), not success
+            return indiv1, indiv2, not success
 
         except TreeException, ex:
             raise OperationOverIndividualFail(self._value, "CROSSOVER", str(ex))
 
+    @staticmethod
+    def from_root_node(root):
+        """
+        Creates an individual from the root node of a tree built with the
+        node operations, serializing the tree once instead of parsing the
+        value of the individual
+        """
+        tree = LispTreeExpr.from_root_node(root)
+        individual = Individual(tree.get_expanded_tree_as_string(), tree.formal(), tree.complexity())
+        individual._lazy_tree = tree
+        return individual
+
     def compare(self, other_individual):
         return self.get_value() == other_individual.get_value()
 
@@ -180,17 +191,29 @@ class Individual(object):
     def get_tree(self):
         return self._tree
 
+    def get_kernel(self):
+        """
+        Return the tree of the individual compiled as a TreeKernel. Kernels
+        are shared between individuals with the same value
+        """
+        individual_hash = MLCRepositoryHelper.get_hash_for_individual(self)
+        return TreeKernelCache.get_instance().get_kernel(individual_hash, self._tree)
+
     def __crossover_tree(self, other_individual):
         """
             Extract a subtree out of a tree, extract a correct subtree out of
             another tree (with depth that can fit into maxdepth).
             Then interchange the two subtrees inputs:
 
-            :return: (first new tree, second new tree) as strings
+            :return: (first new tree, second new tree) as root nodes
         """
-        maxtries = self._config.getint("GP", "maxtries")
-        mutmindepth = self._config.getint("GP", "mutmindepth")
-        maxdepth = self._config.getint("GP", "maxdepth")
+        config = self._config.snapshot()
+        maxtries = config.getint("GP", "maxtries")
+        mutmindepth = config.getint("GP", "mutmindepth")
+        maxdepth = config.getint("GP", "maxdepth")
+
+        root_1 = self.get_tree().get_root_node()
+        root_2 = other_individual.get_tree().get_root_node()
 
         correct = False
         count = 0
@@ -198,8 +221,9 @@ class Individual(object):
         while not correct and count < maxtries:
             try:
                 # Extracting subtrees
-                value_1, sm1, n = self.__extract_subtree(self.get_tree(), mutmindepth, maxdepth, maxdepth)
-                value_2, sm2, _ = self.__extract_subtree(other_individual.get_tree(), mutmindepth, n, maxdepth - n + 1)
+                sm1, _, path_1 = self.__extract_subtree(root_1, mutmindepth, maxdepth, maxdepth)
+                n = sm1.get_subtreedepth()
+                sm2, _, path_2 = self.__extract_subtree(root_2, mutmindepth, n, maxdepth - n + 1)
                 correct = True
 
             except TreeException, ex:
@@ -212,77 +236,74 @@ class Individual(object):
                                 "substitution {0} tests".format(maxtries))
 
         # Replacing subtrees
-        value_1 = value_1.replace('@', sm2)
-        value_2 = value_2.replace('@', sm1)
-
-        return value_1, value_2
+        return root_1.replace_subtree(path_1, sm2), root_2.replace_subtree(path_2, sm1)
 
     def __mutate_tree(self, mutation_type):
-        mutmindepth = self._config.getint("GP", "mutmindepth")
-        maxdepth = self._config.getint("GP", "maxdepth")
-        sensor_spec = self._config.getboolean("POPULATION", "sensor_spec")
-        sensors = self._config.getint("POPULATION", 'sensors')
-        mutation_types = self._config.get_list("GP", 'mutation_types')
+        config = self._config.snapshot()
+        mutmindepth = config.getint("GP", "mutmindepth")
+        maxdepth = config.getint("GP", "maxdepth")
+        sensor_spec = config.getboolean("POPULATION", "sensor_spec")
+        sensors = config.getint("POPULATION", 'sensors')
+        mutation_types = config.get_list("GP", 'mutation_types')
 
         # equi probability for each mutation type selected.
         if mutation_type == Individual.MutationType.ANY:
             rand_number = RandomManager.rand()
             mutation_type = mutation_types[int(np.floor(rand_number * len(mutation_types)))]
 
+        root = self._tree.get_root_node()
+
         if mutation_type in [Individual.MutationType.REMOVE_SUBTREE_AND_REPLACE, Individual.MutationType.SHRINK]:
-            new_individual_value = None
+            if sensor_spec:
+                config_sensor_list = sorted(config.get_list('POPULATION', 'sensor_list'))
+            else:
+                config_sensor_list = range(sensors - 1, -1, -1)
+
+            if mutation_type == Individual.MutationType.REMOVE_SUBTREE_AND_REPLACE:
+                next_individual_type = 0
+            else:
+                next_individual_type = 4
+
+            new_individual = None
             preevok = False
             while not preevok:
                 # remove subtree and grow new subtree
                 try:
-                    subtree, _, _ = self.__extract_subtree(self._tree, mutmindepth, maxdepth, maxdepth)
-                    if mutation_type == Individual.MutationType.REMOVE_SUBTREE_AND_REPLACE:
-                        next_individual_type = 0
-                    else:
-                        next_individual_type = 4
-
-                    new_individual_value = Individual.__generate_indiv_regressive_tree(subtree, self._config, next_individual_type)
-
-                    if new_individual_value:
-                        if sensor_spec:
-                            config_sensor_list = sorted(self._config.get_list('POPULATION', 'sensor_list'))
-                        else:
-                            config_sensor_list = range(sensors - 1, -1, -1)
-
-                        for i in range(len(config_sensor_list)):
-                            new_individual_value = new_individual_value.replace("z%d" % i, "S%d" % config_sensor_list[i])
-
-                        # Preevaluate the Individual
-                        preevok = self._preevaluate_individual(new_individual_value)
-                    else:
-                        raise TreeException()
-
+                    _, depth, path = self.__extract_subtree(root, mutmindepth, maxdepth, maxdepth)
                 except TreeException:
                     raise TreeException("[MUTATE_TREE] A non subtractable Individual was generated. "
                                         "Individual: {0}".format(self._tree.get_expanded_tree_as_string()))
 
-            return new_individual_value
+                # The new subtree grows from the parent of the node removed
+                new_subtree = Individual.__generate_subtree(config, next_individual_type,
+                                                            depth - 1, False, config_sensor_list)
+                new_individual = Individual.from_root_node(root.replace_subtree(path, new_subtree))
+
+                # Preevaluate the Individual
+                preevok = self._preevaluate_individual(new_individual)
+
+            return new_individual
 
         elif mutation_type == Individual.MutationType.REPARAMETRIZATION:
-            new_individual_value = None
+            new_individual = None
             preevok = False
             while not preevok:
-                new_individual_value = self.__reparam_tree(LispTreeExpr(self.get_value()))
-                preevok = self._preevaluate_individual(new_individual_value)
+                new_individual = Individual.from_root_node(self.__reparam_tree(root))
+                preevok = self._preevaluate_individual(new_individual)
 
-            return new_individual_value
+            return new_individual
 
         elif mutation_type == Individual.MutationType.HOIST:
             preevok = False
             counter = 0
-            maxtries = self._config.getint("GP", "maxtries")
+            maxtries = config.getint("GP", "maxtries")
 
             while not preevok and counter < maxtries:
                 counter += 1
-                controls = self._config.getint("POPULATION", "controls")
+                controls = config.getint("POPULATION", "controls")
                 prob_threshold = 1 / float(controls)
 
-                cl = [stree.to_string() for stree in self.get_tree().get_root_node()._nodes]
+                cl = list(root._nodes)
 
                 changed = False
                 k = 0
@@ -293,7 +314,9 @@ class Individual(object):
                     if (RandomManager.rand() < prob_threshold) or (k == controls and not changed):
 
                         try:
-                            _, sm, _ = self.__extract_subtree(LispTreeExpr('(root ' + cl[nc - 1] + ')'),
+                            control_law = OpNodeFactory.make('root', -1)
+                            control_law.add_child(cl[nc - 1])
+                            sm, _, _ = self.__extract_subtree(control_law,
                                                               mutmindepth + 1,
                                                               maxdepth,
                                                               maxdepth + 1)
@@ -303,49 +326,49 @@ class Individual(object):
                         except TreeException:
                             changed = False
 
-                new_individual_value = "(root %s)" % " ".join(cl[:controls])
-                preevok = self._preevaluate_individual(new_individual_value)
+                new_individual = Individual.from_root_node(root.copy_with_children(cl[:controls]))
+                preevok = self._preevaluate_individual(new_individual)
 
             if counter == maxtries:
                 raise TreeException("[MUTATE HOIST] Candidate could not found a "
                                     "substitution {0} tests".format(maxtries))
 
-            return new_individual_value
+            return new_individual
         else:
             raise NotImplementedError("Mutation type %s not implemented" % mutation_type)
 
-    def __extract_subtree(self, expression_tree, mindepth, subtreedepthmax, maxdepth):
+    def __extract_subtree(self, root, mindepth, subtreedepthmax, maxdepth):
+        """
+            Chooses randomly one of the internal nodes of the tree with a
+            depth between mindepth and maxdepth and a subtree depth not
+            greater than subtreedepthmax.
+
+            :return: (node, depth of the node, path to the node)
+        """
         candidates = []
-        for node in expression_tree.internal_nodes():
-            if mindepth <= node.get_depth() <= maxdepth:
+        for node, depth, path in root.internal_subtrees():
+            if mindepth <= depth <= maxdepth:
                 if node.get_subtreedepth() <= subtreedepthmax:
-                    candidates.append(node)
+                    candidates.append((node, depth, path))
 
         if not candidates:
-            raise TreeException("No subtrees to extract from '%s' "
+            raise TreeException("No subtrees to extract from '(root %s)' "
                                 "with mindepth=%s, maxdepth=%s, subtreedepthmax=%s" %
-                                (expression_tree, mindepth, maxdepth, subtreedepthmax))
+                                (root.to_string(), mindepth, maxdepth, subtreedepthmax))
 
-        candidates.sort(key=lambda x: x.get_expr_index(), reverse=False)
+        # Candidates are sorted by their position in the expression
         n = int(np.ceil(RandomManager.rand() * len(candidates))) - 1
-        extracted_node = candidates[n]
-        index = extracted_node.get_expr_index()
-        old_value = expression_tree.get_expanded_tree_as_string()
-        new_value = old_value[:index] + old_value[index:].replace(extracted_node.to_string(), '@', 1)
-        return new_value, extracted_node.to_string(), extracted_node.get_subtreedepth()
+        return candidates[n]
 
-    def __reparam_tree(self, tree_expression):
-        def leaf_value_generator():
-            leaf_value = (RandomManager.rand() - 0.5) * 2 * self._range
-            return "%0.*f" % (self._precision, leaf_value)
+    def __reparam_tree(self, root):
+        value_range = self._config.snapshot().getint("POPULATION", "range")
+        precision = self._config.snapshot().getint("POPULATION", "precision")
 
-        return self.__change_const_tree(tree_expression, leaf_value_generator)
+        def leaf_value_generator():
+            leaf_value = (RandomManager.rand() - 0.5) * 2 * value_range
+            return "%0.*f" % (precision, leaf_value)
 
-    def __change_const_tree(self, tree_expression, leaf_value_generator):
-        for leaf in tree_expression.leaf_nodes():
-            if not leaf.is_sensor():
-                leaf._arg = leaf_value_generator()
-        return tree_expression.get_expanded_tree_as_string()
+        return root.with_constants(leaf_value_generator)
 
     def __str__(self):
         return "value: %s\n" % self.get_value() + \
@@ -361,6 +384,7 @@ class Individual(object):
             mode MODE. MODE is a number which interpretation depends on the
             MLCIND.type property.
         """
+        config = config.snapshot()
         value = None
         if rhs_value is None:
             controls = config.getint('POPULATION', 'controls')
@@ -448,10 +472,58 @@ class Individual(object):
                 new_value = Individual.__generate_indiv_regressive_tree(new_value, config, indiv_type)
         return new_value
 
+    @staticmethod
+    def __generate_subtree(config, indiv_type, depth, pending_seeds, sensor_list):
+        """
+            Tree version of __generate_indiv_regressive_tree, used by the
+            mutations. Grows a random subtree whose parent is at the given
+            depth. pending_seeds tells if there are other subtrees waiting to
+            be generated after this one.
+        """
+        if indiv_type == 4:
+            min_depth = int(config.get('GP', 'mindepth'))
+            max_depth = 1
+        else:
+            min_depth = int(config.get('GP', 'mindepth'))
+            max_depth = int(config.get('GP', 'maxdepth'))
+
+        leaf_node = False
+        if depth >= max_depth:
+            leaf_node = True
+        elif (depth < min_depth and not pending_seeds) or indiv_type == 3:
+            leaf_node = False
+        else:
+            leaf_node = RandomManager.rand() < config.getfloat('POPULATION', 'leaf_prob')
+
+        if leaf_node:
+            use_sensor = RandomManager.rand() < config.getfloat('POPULATION', 'sensor_prob')
+            if use_sensor:
+                sensor_number = int(math.ceil(RandomManager.rand() * config.getint('POPULATION', 'sensors'))) - 1
+                node = LeafNode(-1, "S%d" % sensor_list[sensor_number])
+            else:
+                value_range = config.getfloat('POPULATION', 'range')
+                precision = config.get('POPULATION', 'precision')
+                # Generate a float number between -range and +range with a precision of 'precision'
+                node = LeafNode(-1, ("%." + precision + "f") % ((RandomManager.rand() - 0.5) * 2 * value_range))
+            return node
+
+        # Create a node
+        op_num = math.ceil(RandomManager.rand() * Operations.get_instance().length())
+        op = Operations.get_instance().get_operation_from_op_num(op_num)
+        node = OpNodeFactory.make(op["op"], -1)
+        for i in range(op["nbarg"]):
+            # The arguments at the right are generated after this one
+            node.add_child(Individual.__generate_subtree(config, indiv_type, depth + 1,
+                                                         pending_seeds or i < op["nbarg"] - 1,
+                                                         sensor_list))
+
+        node.set_subtreedepth(1 + max([child.get_subtreedepth() for child in node._nodes]))
+        return node
+
     def _preevaluate_individual(self, new_indiv):
         preev_function = PreevaluationManager.get_callback()
         if preev_function is not None:
-            return preev_function.preev(Individual(new_indiv))
+            return preev_function.preev(new_indiv)
         else:
             return True
 
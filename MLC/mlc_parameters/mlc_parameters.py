@@ -37,6 +37,59 @@ class saved():
         self.cr.restore()
 
 
+class ConfigSnapshot(object):
+    """
+    Read only copy of the Config, with the values already interpolated. The
+    values are converted to their type the first time they are requested, so
+    the hot paths of the algorithm don't parse the configuration every time.
+    Use Config.snapshot to obtain it.
+    """
+
+    def __init__(self, config):
+        self._values = Config.to_dictionary(config)
+        self._typed_values = {}
+
+    def snapshot(self):
+        return self
+
+    def has_option(self, section, option):
+        return section in self._values and option.lower() in self._values[section]
+
+    def get(self, section, option):
+        try:
+            options = self._values[section]
+        except KeyError:
+            raise ConfigParser.NoSectionError(section)
+
+        try:
+            return options[option.lower()]
+        except KeyError:
+            raise ConfigParser.NoOptionError(option, section)
+
+    def getint(self, section, option):
+        return self._get_typed(section, option, "int", int)
+
+    def getfloat(self, section, option):
+        return self._get_typed(section, option, "float", float)
+
+    def getboolean(self, section, option):
+        return self._get_typed(section, option, "boolean", Config.parse_boolean)
+
+    def get_list(self, section, param, item_type=int):
+        # Lists are mutable, return a copy of the cached one
+        return list(self._get_typed(section, param, ("list", item_type),
+                                    lambda value: Config.parse_list(value, item_type)))
+
+    def _get_typed(self, section, option, value_type, converter):
+        key = (section, option, value_type)
+        try:
+            return self._typed_values[key]
+        except KeyError:
+            value = converter(self.get(section, option))
+            self._typed_values[key] = value
+            return value
+
+
 class Config(ConfigParser.ConfigParser):
     """
     Singleton class that parse and manipulates the Config file of the MLC
@@ -44,12 +97,15 @@ class Config(ConfigParser.ConfigParser):
     _instance = None
 
     def __init__(self):
+        self._snapshot = None
         ConfigParser.ConfigParser.__init__(self)
         self._log_prefix = '[CONFIG] '
 
     def get_list(self, section, param, item_type=int):
-        value = self.get(section, param)
+        return Config.parse_list(self.get(section, param), item_type)
 
+    @staticmethod
+    def parse_list(value, item_type=int):
         split_range = value.split(":")
         if len(split_range) == 2:
             return [item_type(x) for x in range(int(split_range[0]), int(split_range[1]))]
@@ -57,6 +113,42 @@ class Config(ConfigParser.ConfigParser):
         split_list = value.split(",")
         return [item_type(x) for x in split_list]
 
+    @staticmethod
+    def parse_boolean(value):
+        if value.lower() not in ConfigParser.RawConfigParser._boolean_states:
+            raise ValueError('Not a boolean: %s' % value)
+        return ConfigParser.RawConfigParser._boolean_states[value.lower()]
+
+    def snapshot(self):
+        """
+        Return a ConfigSnapshot of the configuration. The snapshot is built
+        again only after the configuration changes.
+        """
+        if self._snapshot is None:
+            self._snapshot = ConfigSnapshot(self)
+        return self._snapshot
+
+    # Every method that modifies the configuration discards the snapshot
+    def set(self, section, option, value=None):
+        self._snapshot = None
+        ConfigParser.ConfigParser.set(self, section, option, value)
+
+    def add_section(self, section):
+        self._snapshot = None
+        ConfigParser.ConfigParser.add_section(self, section)
+
+    def remove_section(self, section):
+        self._snapshot = None
+        return ConfigParser.ConfigParser.remove_section(self, section)
+
+    def remove_option(self, section, option):
+        self._snapshot = None
+        return ConfigParser.ConfigParser.remove_option(self, section, option)
+
+    def _read(self, fp, fpname):
+        self._snapshot = None
+        ConfigParser.ConfigParser._read(self, fp, fpname)
+
     @staticmethod
     def get_instance():
         if Config._instance is None:
@@ -30,17 +30,28 @@ import time
 
 from MLC.arduino.protocol import ArduinoUserInterface
 from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.Population.Evaluation.PopulationKernel import PopulationKernel
 from PyQt5.QtCore import Qt
 
 
-def individual_data(indiv):
-    SAMPLES = 201
+SAMPLES = 201
+
+
+def reference_data():
     x = np.linspace(-10.0, 10.0, num=SAMPLES)
     y = np.tanh(x**3 - x**2 - 1)
+    return x, y
+
 
+def add_noise(y):
     config = Config.get_instance()
     artificial_noise = config.getint('EVALUATOR', 'artificialnoise')
-    y_with_noise = y + [random.random() / 2 - 0.25 for _ in xrange(SAMPLES)] + artificial_noise * 500
+    return y + [random.random() / 2 - 0.25 for _ in xrange(SAMPLES)] + artificial_noise * 500
+
+
+def individual_data(indiv):
+    x, y = reference_data()
+    y_with_noise = add_noise(y)
 
     if isinstance(indiv.get_formal(), str):
         formal = indiv.get_formal().replace('S0', 'x')
@@ -51,13 +62,10 @@ def individual_data(indiv):
     # Calculate J like the sum of the square difference of the
     # functions in every point
     lg.logger_.debug('[POP][TOY_PROBLEM] Individual Formal: ' + formal)
-    b = indiv.get_tree().calculate_expression([x])
 
-    # If the expression doesn't have the term 'x',
-    # the eval returns a value (float) instead of an array.
-    # In that case transform it to an array
-    if type(b) == float:
-        b = np.repeat(b, SAMPLES)
+    # The compiled kernel always returns one array of samples per control,
+    # even when the expression doesn't have the term 'x'
+    b = indiv.get_kernel()([x])[0]
 
     return x, y, y_with_noise, b
 
@@ -74,6 +82,21 @@ def cost(indiv):
     return cost_value
 
 
+def cost_batch(indivs):
+    # Same costs as calling cost() once per individual, but the reference
+    # curve is calculated only once and the control laws of all the
+    # individuals are evaluated together
+    x, y = reference_data()
+    y_with_noise = np.array([add_noise(y) for _ in indivs])
+    b = PopulationKernel(indivs).evaluate([x])
+
+    np.seterr(all='ignore')
+    cost_values = np.sum((b - y_with_noise)**2, axis=1)
+    np.seterr(all='warn')
+
+    return [float(cost_value) for cost_value in cost_values]
+
+
 def show_best(index, generation, indiv, cost, block=True):
     x, y, y_with_noise, b = individual_data(indiv)
     mean_squared_error = np.sqrt((y_with_noise - b)**2 / (1 + np.absolute(x**2)))
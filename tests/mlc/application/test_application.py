@@ -167,6 +167,47 @@ class ApplicationTest(unittest.TestCase):
             self.assertEqual(ApplicationTest.on_start, 1)
             self.assertEqual(ApplicationTest.on_start_counter_2, 1)
 
+    def test_steady_state_saves_pseudo_generations(self):
+        with saved(Config.get_instance()) as config:
+            Config.get_instance().set("POPULATION", "size", "10")
+            Config.get_instance().set("BEHAVIOUR", "save", "false")
+
+            evaluated = []
+            new_generations = []
+            callbacks_dict = {MLC_CALLBACKS.ON_EVALUATE: lambda index, cost: evaluated.append(index),
+                              MLC_CALLBACKS.ON_NEW_GENERATION: new_generations.append}
+
+            ApplicationTest.mlc_local.new_experiment(ApplicationTest.experiment_name,
+                                                     ApplicationTest.test_conf_path)
+            ApplicationTest.mlc_local.open_experiment(ApplicationTest.experiment_name)
+            configuration = ApplicationTest.mlc_local.get_experiment_configuration(ApplicationTest.experiment_name)
+            configuration["OPTIMIZATION"]["mode"] = "steady_state"
+            configuration["OPTIMIZATION"]["steady_state_inflight"] = "3"
+            ApplicationTest.mlc_local.set_experiment_configuration(ApplicationTest.experiment_name, configuration)
+            ApplicationTest.mlc_local.go(experiment_name=ApplicationTest.experiment_name,
+                                         to_generation=3,
+                                         from_generation=0,
+                                         callbacks=callbacks_dict)
+
+            populations = [ApplicationTest.mlc_local.get_generation(ApplicationTest.experiment_name, generation)
+                           for generation in range(1, 3 + 1)]
+            ApplicationTest.mlc_local.close_experiment(ApplicationTest.experiment_name)
+            ApplicationTest.mlc_local.delete_experiment(ApplicationTest.experiment_name)
+
+            # A pseudo-generation is saved every time 10 evaluations finish
+            self.assertEqual(new_generations, [1, 2, 3])
+            self.assertEqual(len(evaluated), 3 * 10)
+
+            best_costs = []
+            for population in populations:
+                costs = population.get_costs()
+                self.assertEqual(len(costs), 10)
+                self.assertEqual(costs, sorted(costs))
+                best_costs.append(costs[0])
+
+            # The best individual is only replaced by a better one
+            self.assertEqual(best_costs, sorted(best_costs, reverse=True))
+
     @unittest.skip
     def test_set_custom_gen_creator(self):
         with saved(Config.get_instance()) as config:
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import unittest
+from MLC.arduino.connection.base import ConnectionTimeoutException
+from MLC.arduino.connection.buffered import BufferedConnection, RingBuffer
+
+
+class StreamConnection(BufferedConnection):
+    """ Buffered connection that reads from a fixed stream, counting the reads """
+
+    def __init__(self, stream, buffer_size):
+        BufferedConnection.__init__(self, buffer_size)
+        self._stream = stream
+        self.reads = 0
+
+    def _read_raw(self, length, max_length):
+        if len(self._stream) < length:
+            raise ConnectionTimeoutException("end of stream")
+        self.reads += 1
+        data, self._stream = self._stream[:max_length], self._stream[max_length:]
+        return data
+
+
+class TestBufferedConnection(unittest.TestCase):
+
+    def test_ring_buffer_wraps_around(self):
+        ring = RingBuffer(8)
+        ring.write("abcdef")
+        self.assertEqual("abcd", ring.read(4))
+        ring.write("ghijkl")
+        self.assertEqual(8, len(ring))
+        with self.assertRaises(ValueError):
+            ring.write("m")
+
+        data = bytearray(5)
+        self.assertEqual(5, ring.read_into(memoryview(data)))
+        self.assertEqual("efghi", str(data))
+        self.assertEqual("jkl", ring.read(10))
+        self.assertEqual(0, len(ring))
+
+    def test_small_receptions_are_buffered(self):
+        connection = StreamConnection("\xF1\x00\x00\x00\x03\x3D\x01\x02" * 3, buffer_size=16)
+        for i in range(0, 3):
+            self.assertEqual("\xF1", connection.recv(1))
+            self.assertEqual("\x00\x00\x00\x03", connection.recv(4))
+            payload = bytearray(3)
+            self.assertEqual(3, connection.recv_into(payload))
+            self.assertEqual("\x3D\x01\x02", str(payload))
+        self.assertEqual(2, connection.reads)
+
+        with self.assertRaises(ConnectionTimeoutException):
+            connection.recv(1)
+
+    def test_reception_bigger_than_buffer(self):
+        connection = StreamConnection("0123456789" * 4, buffer_size=8)
+        self.assertEqual("012", connection.recv(3))
+        self.assertEqual("3456789" + "0123456789" * 2, connection.recv(27))
+        self.assertEqual("0123456789", connection.recv(10))
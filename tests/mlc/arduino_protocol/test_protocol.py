@@ -19,6 +19,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import numpy as np
 import unittest
 from MLC.arduino.connection import MockConnection
 from MLC.arduino.protocol import ArduinoInterface, ProtocolSetupException, ProtocolIOException
@@ -31,6 +32,17 @@ REPORT = "\xF1\x00\x00\x00\x05\x10\x01\x3D\x05\x20"
 REPORT_B = "\xF1\x00\x00\x00\x1A\x10\xF1\x0A\x3D\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00"
 REPORT_C = "\xF1\x00\x00\x00\x16\x3D\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00\x3E\x01\x00\x01\x00\x01\x00\x01\x00\x01\x00"
 
+ACTUATION_REPORT_LENGTH = 8
+
+
+def echo_actuation(data):
+    # Reports the value actuated on A6 as the reading of A7
+    if data[0] != "\xF0":
+        return ""
+    if data[6:8] == "\xFF\xFF":
+        return NACK
+    return "\xF1\x00\x00\x00\x03\x3D" + data[6:8]
+
 
 class TestArduinoInterface(unittest.TestCase):
     def setUp(self):
@@ -146,3 +158,81 @@ class TestArduinoInterface(unittest.TestCase):
         self.assertEqual(1, len(response["D16"]))
         self.assertTrue(response["D16"][0])
         self.assertEqual(0x0100, response["A7"][0])
+
+    def test_average_is_integer(self):
+        self._connection = MockConnection("\xF1\x00\x00\x00\x07\x3D\x00\x01\x00\x02\x00\x02")
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.set_report_mode(REPORT_MODES.AVERAGE, read_count=3)
+        self._interface.add_output(60)
+        self._interface.add_input(61)
+        response = self._interface.actuate([(60, 128)])
+        self.assertEqual(1, response["A7"][0])
+        self.assertTrue(np.issubdtype(response["A7"].dtype, np.integer))
+
+    def test_actuate_returns_arrays(self):
+        self._connection = MockConnection(REPORT_B)
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.set_report_mode(REPORT_MODES.BULK, read_count=11, read_delay=5)
+        self._interface.add_output(60)
+        self._interface.add_input(61)
+        self._interface.add_input(16)
+        response = self._interface.actuate([(60, 128)])
+        np.testing.assert_array_equal(response["A7"], np.repeat(0x0100, 11))
+        np.testing.assert_array_equal(response["D16"], [True, False, False, False, True, True,
+                                                        True, True, False, True, False])
+
+    def test_unknown_port_in_report(self):
+        self._connection = MockConnection(REPORT)
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.add_output(60)
+        self._interface.add_input(61)
+        with self.assertRaises(ProtocolIOException):
+            self._interface.actuate([(60, 128)])
+
+    def test_compiled_actuation_frame(self):
+        self._connection = MockConnection(REPORT)
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.add_output(60)
+        self._interface.add_output(15)
+        self._interface.add_input(61)
+        self._interface.add_input(16)
+        for i in range(0, 8):
+            self._connection.pop_data()
+
+        frame = self._interface.compile_actuation([60, 15])
+        self._interface.actuate_frame(frame, [128, 1])
+        self.assertEqual("\xF0\x00\x00\x00\x05\x3C\x00\x80\x0F\x01", self._connection.pop_data())
+        self._interface.actuate_frame(frame, [0x0102, 0])
+        self.assertEqual("\xF0\x00\x00\x00\x05\x3C\x01\x02\x0F\x00", self._connection.pop_data())
+        self._interface.actuate([(60, 0x0102), (15, 0)])
+        self.assertEqual("\xF0\x00\x00\x00\x05\x3C\x01\x02\x0F\x00", self._connection.pop_data())
+
+        with self.assertRaises(ValueError):
+            frame.set_values([0x10000, 0])
+        with self.assertRaises(ProtocolSetupException):
+            self._interface.compile_actuation([61])
+
+    def test_pipelined_actuation(self):
+        self._connection = MockConnection("", responder=echo_actuation)
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.add_output(60)
+        self._interface.add_input(61)
+        readings = []
+        steps_ahead = []
+        for report in self._interface.actuate_pipelined(([(60, i)] for i in range(1, 11)), window=3):
+            readings.append(report["A7"][0])
+            steps_ahead.append(self._connection.pending() / ACTUATION_REPORT_LENGTH)
+        self.assertEqual(range(1, 11), readings)
+        self.assertEqual(2, max(steps_ahead))
+
+    def test_pipelined_actuation_error(self):
+        self._connection = MockConnection("", responder=echo_actuation)
+        self._interface = ArduinoInterface(self._connection, boards.Due)
+        self._interface.add_output(60)
+        self._interface.add_input(61)
+        steps = [[(60, 1)], [(60, 0xFFFF)], [(60, 3)], [(60, 4)]]
+        with self.assertRaises(ProtocolIOException):
+            list(self._interface.actuate_pipelined(steps, window=3))
+        # The reports of the steps sent after the failed one are discarded
+        self.assertEqual(0, self._connection.pending())
+        self.assertEqual(5, self._interface.actuate([(60, 5)])["A7"][0])
@@ -30,6 +30,7 @@ from MLC.Common.LispTreeExpr.LispTreeExpr import NotBalancedParanthesisException
 from MLC.Common.LispTreeExpr.LispTreeExpr import OperationArgumentsAmountException
 from MLC.Common.LispTreeExpr.LispTreeExpr import OperationNotFoundException
 from MLC.Common.LispTreeExpr.LispTreeExpr import RootNotFoundExprException
+from MLC.Common.LispTreeExpr.LispTreeExpr import TrailingTrashExprException
 
 import os
 
@@ -144,6 +145,14 @@ class ExpressionTreeTest(unittest.TestCase):
         expression = '(root (tanh (+ (tanh (+ (sin (+ (+ (- S0 (log 3.4232)) (- S0 (log -3.3987 123))) (- S0 (log 7.7256)))) (sin (- S0 (log 6.3053))))) (- S0 (log 2.7057)))))'
         self.assert_check_expression_with_exception(expression, OperationArgumentsAmountException)
 
+    def test_check_expression_every_control_law(self):
+        LispTreeExpr.check_expression('(root S0 (* S0 2.5))')
+
+        self.assertRaises(OperationArgumentsAmountException,
+                          LispTreeExpr.check_expression, '(root (sin S0) (* S0 2.5 1.0))')
+        self.assertRaises(TrailingTrashExprException,
+                          LispTreeExpr.check_expression, '(root (sin S0)) (cos S0)')
+
     def test_tree_depth_root(self):
         expression = '(root S0)'
         tree = LispTreeExpr(expression)
@@ -192,6 +201,15 @@ class ExpressionTreeTest(unittest.TestCase):
         self.assertNode(subtree_1, depth=3, childs=1, expr_index=19)
         self.assertNode(subtree_1._nodes[0], depth=3, childs=0, expr_index=24)
 
+    def test_tree_node_ids(self):
+        expression = '(root (+ (tanh S0) 2.5) (cos S1))'
+        tree = LispTreeExpr(expression)
+
+        # The ids are given in preorder, the nodes list the leaves before their parents
+        nodes = [(node.get_node_id(), node.get_subtreedepth(), node.get_expr_index()) for node in tree.nodes()]
+        self.assertEquals(nodes, [(3, 0, 15), (2, 1, 9), (4, 0, 19), (1, 2, 6), (6, 0, 29), (5, 1, 24)])
+        self.assertEquals(tree.get_root_node().get_subtreedepth(), 3)
+
     def test_do_not_raise_exception_when_numpy_warning_appear(self):
         # This expression raise a numpy warning
         expression = '(root (cos (exp 1e20)))'
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+import numpy as np
+from MLC import config as config_path
+from MLC.Log.log import set_logger
+from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.Common.LispTreeExpr.LispTreeExpr import LispTreeExpr
+from MLC.Common.LispTreeExpr.TreeKernel import TreeKernelCache
+
+import os
+
+
+class TreeKernelTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        set_logger("testing")
+        config = Config.get_instance()
+        config.read(os.path.join(config_path.get_test_path(), 'mlc/individual/configuration.ini'))
+
+    def setUp(self):
+        self._sensors = [np.linspace(-10, 10, 101), np.linspace(-1, 1, 101)]
+        TreeKernelCache.get_instance().clear()
+
+    def test_kernel_matches_calculate_expression(self):
+        self.assert_kernel_matches('(root (+ (tanh S0) (cos S1)))')
+        self.assert_kernel_matches('(root (* (exp S1) (sin (- S0 2.5))))')
+        self.assert_kernel_matches('(root (tanh (* 3.1 S0)) (+ S1 1.5))')
+
+    def test_protected_operations(self):
+        self.assert_kernel_matches('(root (/ S0 (- S0 S0)))')
+        self.assert_kernel_matches('(root (log (- S1 S1)))')
+        self.assert_kernel_matches('(root (/ S1 (* 0.0 S0)) (log (* -2.0 S0)))')
+
+    def test_constant_controls_are_broadcasted(self):
+        kernel = LispTreeExpr('(root (cos (exp 2.0)) (+ 1.0 S0))').compile_kernel()
+        controls = kernel(self._sensors)
+
+        self.assertEquals(controls.shape, (2, 101))
+        self.assertEquals(kernel.controls(), 2)
+        self.assertTrue(np.all(controls[0] == controls[0][0]))
+
+    def test_constant_subtrees_are_folded(self):
+        kernel = LispTreeExpr('(root (+ S0 (cos (* 2.0 3.0))))').compile_kernel()
+        self.assertNotIn("np.cos", kernel.get_source())
+        self.assert_kernel_matches('(root (+ S0 (cos (* 2.0 3.0))))')
+
+    def test_common_subexpressions_are_computed_once(self):
+        kernel = LispTreeExpr('(root (+ (sin S0) (sin S0)))').compile_kernel()
+        self.assertEquals(kernel.get_source().count("np.sin"), 1)
+
+    def test_cache_reuses_kernels(self):
+        cache = TreeKernelCache.get_instance()
+        tree = LispTreeExpr('(root (sin S0))')
+
+        kernel = cache.get_kernel('hash', tree)
+        self.assertIs(kernel, cache.get_kernel('hash', tree))
+        self.assertEquals(cache.size(), 1)
+
+        cache.clear()
+        self.assertEquals(cache.size(), 0)
+
+    def assert_kernel_matches(self, expression):
+        expected = LispTreeExpr(expression).calculate_expression(self._sensors)
+        if not isinstance(expected, list):
+            expected = [expected]
+
+        controls = LispTreeExpr(expression).compile_kernel()(self._sensors)
+        self.assertEquals(len(controls), len(expected))
+        for control, value in zip(controls, expected):
+            np.testing.assert_array_equal(control, np.broadcast_to(value, control.shape))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import unittest
+
+from MLC import config as config_path
+from MLC.Log.log import set_logger
+from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.Common.Operations import Operations
+from MLC.Common.LispTreeExpr.OperationNodes import OpNodeFactory, PlusNode, SineNode
+
+
+class OperationsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        set_logger("testing")
+        config = Config.get_instance()
+        config.read(os.path.join(config_path.get_test_path(), 'mlc/individual/configuration.ini'))
+        Operations.get_instance(reload_operations=True)
+
+    def test_operations_by_number_and_string_are_the_same(self):
+        operations = Operations.get_instance()
+        for op_num in range(1, operations.length() + 1):
+            op = operations.get_operation_from_op_num(op_num)
+            self.assertIs(operations.get_operation_from_op_string(op["op"]), op)
+
+    def test_node_classes_are_resolved(self):
+        operations = Operations.get_instance()
+        self.assertIs(operations.get_node_class_from_op_string("+"), PlusNode)
+        self.assertIsInstance(OpNodeFactory.make("sin", 3), SineNode)
+        self.assertRaises(KeyError, operations.get_operation_from_op_string, "y")
+        self.assertRaises(KeyError, operations.get_node_class_from_op_string, "y")
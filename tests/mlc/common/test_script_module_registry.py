@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from MLC.Log.log import set_logger
+from MLC.Common.ScriptModuleRegistry import ScriptModuleRegistry
+
+
+class ScriptModuleRegistryTest(unittest.TestCase):
+    PACKAGE = "RegistryTestScripts"
+
+    @classmethod
+    def setUpClass(cls):
+        set_logger("testing")
+
+    def setUp(self):
+        self._experiment_dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        for index, experiment_dir in enumerate(self._experiment_dirs):
+            self._write_script(experiment_dir, "VALUE = %s\n" % index)
+
+        self._registry = ScriptModuleRegistry(ScriptModuleRegistryTest.PACKAGE)
+        sys.path.append(self._experiment_dirs[0])
+
+    def tearDown(self):
+        for experiment_dir in self._experiment_dirs:
+            if experiment_dir in sys.path:
+                sys.path.remove(experiment_dir)
+            shutil.rmtree(experiment_dir)
+
+    def test_module_is_loaded_once(self):
+        module = self._registry.get_module("script")
+        self.assertEqual(module.VALUE, 0)
+        self.assertIs(module, self._registry.get_module("script"))
+
+    def test_module_is_reloaded_when_the_script_changes(self):
+        module = self._registry.get_module("script")
+
+        script_path = self._write_script(self._experiment_dirs[0], "VALUE = 10\n")
+        mtime = os.path.getmtime(script_path) + 10
+        os.utime(script_path, (mtime, mtime))
+
+        new_module = self._registry.get_module("script")
+        self.assertIsNot(module, new_module)
+        self.assertEqual(new_module.VALUE, 10)
+
+    def test_module_is_reloaded_when_the_experiment_changes(self):
+        module = self._registry.get_module("script")
+
+        sys.path.remove(self._experiment_dirs[0])
+        sys.path.append(self._experiment_dirs[1])
+        self.assertEqual(self._registry.get_module("script").VALUE, 1)
+
+        # The module of the first experiment was not modified, it is not loaded again
+        sys.path.remove(self._experiment_dirs[1])
+        sys.path.append(self._experiment_dirs[0])
+        self.assertIs(module, self._registry.get_module("script"))
+
+    def test_unknown_script(self):
+        self.assertRaises(ImportError, self._registry.get_module, "unknown_script")
+
+    def _write_script(self, experiment_dir, content):
+        package_dir = os.path.join(experiment_dir, ScriptModuleRegistryTest.PACKAGE)
+        if not os.path.exists(package_dir):
+            os.makedirs(package_dir)
+            open(os.path.join(package_dir, "__init__.py"), "w").close()
+
+        script_path = os.path.join(package_dir, "script.py")
+        with open(script_path, "w") as script:
+            script.write(content)
+
+        # Remove the compiled script, the file could be modified twice in a second
+        if os.path.exists(script_path + "c"):
+            os.remove(script_path + "c")
+        return script_path
@@ -21,10 +21,14 @@
 
 import unittest
 import shutil
+import sqlite3
+import threading
 import os
 
 from MLC.mlc_parameters.mlc_parameters import Config, saved
-from MLC.db.mlc_repository import MLCRepository
+from MLC.db.mlc_repository import MLCRepository, MLCRepositoryHelper
+from MLC.db.sqlite.sql_statements import *
+from MLC.db.sqlite.sqlite_repository import SQLiteRepository
 from MLC.individual.Individual import Individual
 from MLC.Population.Population import Population
 from MLC.config import set_working_directory
@@ -177,6 +181,41 @@ class MLCRepositoryTest(unittest.TestCase):
         self.assertEqual(p_from_repo._ev_time, p._ev_time)
         self.assertEqual(p_from_repo._gen_method, p._gen_method)
 
+    def test_add_population_keeps_full_precision_and_nan_costs(self):
+        mlc_repo = self.__get_new_repo()
+
+        mlc_repo.add_individual(Individual("(root (+ 1 1))"))
+        mlc_repo.add_individual(Individual("(root (+ 2 2))"))
+
+        p = Population(2, 0, Config.get_instance(), mlc_repo)
+        p._individuals = [1, 2]
+        p._costs = [0.1234567890123456, float("nan")]
+        p._parents = [[1, 2], []]
+        mlc_repo.add_population(p)
+
+        p_from_repo = mlc_repo.get_population(1)
+        self.assertEqual(p_from_repo._costs[0], 0.1234567890123456)
+        self.assertEqual(str(p_from_repo._costs[1]), "nan")
+        self.assertEqual(p_from_repo._parents[:2], [[1, 2], []])
+
+    def test_individual_with_min_cost_skips_nan_costs(self):
+        mlc_repo = self.__get_new_repo()
+
+        mlc_repo.add_individual(Individual("(root (+ 1 1))"))
+        mlc_repo.add_individual(Individual("(root (+ 2 2))"))
+        mlc_repo.add_individual(Individual("(root (+ 3 3))"))
+
+        p = Population(3, 0, Config.get_instance(), mlc_repo)
+        p._individuals = [1, 2, 3]
+        p._costs = [5.0, float("nan"), 2.0]
+        mlc_repo.add_population(p)
+        self.assertEqual(mlc_repo.get_individual_with_min_cost_in_last_pop(), 3)
+
+        # The NaN costs are stored as NULL, they are only chosen when there
+        # is no other cost
+        mlc_repo.update_individual_cost(3, float("nan"), 1.0)
+        self.assertEqual(mlc_repo.get_individual_with_min_cost_in_last_pop(), 1)
+
     def test_add_population_with_invalid_individual(self):
         mlc_repo = self.__get_new_repo()
 
@@ -364,6 +403,222 @@ class MLCRepositoryTest(unittest.TestCase):
             self.assertEqual(mlc_repo.count_individual(), 2)
             self.assertEqual(mlc_repo.count_population(), 1)
 
+    def test_cost_cache_is_persisted(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                mlc_repo = self.__get_new_repo()
+                self.assertEqual(mlc_repo.get_cached_cost("hash_1"), None)
+
+                mlc_repo.update_cached_costs([("hash_1", 1.5, 1), ("hash_2", float("nan"), 2)])
+                mlc_repo.update_cached_costs([("hash_1", 2.5, 2)])
+                self.assertEqual(mlc_repo.get_cached_cost("hash_1"), (2.5, 2))
+
+                # reload mlc_repository using another instance
+                mlc_repo = self.__get_new_repo()
+                self.assertEqual(mlc_repo.get_cached_cost("hash_1"), (2.5, 2))
+                self.assertEqual(str(mlc_repo.get_cached_cost("hash_2")[0]), "nan")
+                self.assertEqual(mlc_repo.get_cached_cost("hash_2")[1], 2)
+            finally:
+                os.remove(db_path)
+
+    def test_read_from_another_thread(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                mlc_repo = self.__get_new_repo()
+                mlc_repo.add_individual(Individual("(root (+ 1 1))"))
+                p = Population(1, 0, Config.get_instance(), mlc_repo)
+                p._individuals = [1]
+                p._costs = [2.5]
+                mlc_repo.add_population(p)
+
+                # The GUI reads the experiment while the evolution thread keeps its connection open
+                costs = []
+                reader = threading.Thread(target=lambda: costs.append(mlc_repo.get_population(1)._costs[0]))
+                reader.start()
+                reader.join()
+                self.assertEqual(costs, [2.5])
+
+                conn = sqlite3.connect(db_path)
+                self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+                conn.close()
+            finally:
+                mlc_repo.close()
+                os.remove(db_path)
+
+    def test_old_database_is_migrated(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                # Database created before the schema was versioned
+                conn = sqlite3.connect(db_path)
+                conn.execute(stmt_create_table_individuals())
+                conn.execute(stmt_create_table_population())
+                conn.execute("INSERT INTO individual VALUES (1, '(root (+ 1 1))', '(1 + 1)', 1)")
+                conn.execute("INSERT INTO population (gen, cost, evaluation_time, gen_method, parents, indiv_id) "
+                             "VALUES (1, 5.0, 0, 1, '', 1)")
+                conn.commit()
+                conn.close()
+
+                mlc_repo = self.__get_new_repo()
+                self.assertEqual(mlc_repo.get_population(1)._costs[0], 5.0)
+                self.assertEqual(mlc_repo.add_individual(Individual("(root (+ 1 1))")), (1, True))
+                mlc_repo.close()
+
+                conn = sqlite3.connect(db_path)
+                hash = conn.execute("SELECT hash FROM individual WHERE indiv_id = 1").fetchone()[0]
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                indexes = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+                checkpoint_columns = [row[1] for row in conn.execute("PRAGMA table_info(checkpoint_cost)")]
+                conn.close()
+                self.assertEqual(version, len(stmt_schema_migrations()))
+                self.assertIn("population_gen_cost", indexes)
+                self.assertIn("population_indiv_gen", indexes)
+                self.assertEqual(checkpoint_columns, ["gen", "indiv_id", "cost"])
+                self.assertEqual(hash, MLCRepositoryHelper.get_hash_for_value("(root (+ 1 1))"))
+            finally:
+                os.remove(db_path)
+
+    def test_lazy_loading_of_individuals(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                mlc_repo = self.__get_new_repo()
+                values = ["(root (+ 1 1))", "(root (+ 2 2))", "(root (+ 3 3))"]
+                for value in values:
+                    mlc_repo.add_individual(Individual(value))
+                p = Population(3, 0, Config.get_instance(), mlc_repo)
+                p._individuals = [1, 2, 3]
+                mlc_repo.add_population(p)
+                mlc_repo.close()
+
+                config.set("BEHAVIOUR", "individuals_cache_size", "2")
+                mlc_repo = self.__get_new_repo()
+                self.assertEqual(mlc_repo.count_individual(), 3)
+
+                # Dedup works with the individuals that are not in memory
+                self.assertEqual(mlc_repo.add_individual(Individual("(root (+ 1 1))")), (1, True))
+                self.assertEqual(mlc_repo.add_individual(Individual("(root (+ 4 4))")), (4, False))
+                self.assertEqual(mlc_repo.count_individual(), 4)
+
+                for indiv_id in [1, 2, 3, 4, 1]:
+                    self.assertEqual(mlc_repo.get_individual(indiv_id).get_value(), (values + ["(root (+ 4 4))"])[indiv_id - 1])
+                self.assertEqual(mlc_repo.get_individual_data(3).get_value(), "(root (+ 3 3))")
+                self.assertRaises(KeyError, mlc_repo.get_individual, 5)
+                mlc_repo.close()
+            finally:
+                os.remove(db_path)
+
+    def test_checkpoint_is_persisted(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                mlc_repo = self.__get_new_repo()
+                for value in ["(root (+ 1 1))", "(root (+ 2 2))", "(root (+ 3 3))"]:
+                    mlc_repo.add_individual(Individual(value))
+                p = Population(3, 0, Config.get_instance(), mlc_repo)
+                p._individuals = [3, 1, 2]
+                p._gen_method = [4, 2, 3]
+                p._parents = [[1], [2], [1, 3]]
+
+                mlc_repo.save_checkpoint(2, p)
+                mlc_repo.add_checkpoint_costs(2, [(3, 5.5), (1, 1.5)])
+                mlc_repo.add_checkpoint_costs(2, [(1, 2.5)])
+                mlc_repo.close()
+
+                mlc_repo = self.__get_new_repo()
+                self.assertIsNone(mlc_repo.get_checkpoint(1))
+                population, costs = mlc_repo.get_checkpoint(2)
+                self.assertEqual(population.get_individuals(), [3, 1, 2])
+                self.assertEqual(population.get_gen_methods(), [4, 2, 3])
+                self.assertEqual(population.get_parents(), [[1], [2], [1, 3]])
+                self.assertEqual(costs, {3: 5.5, 1: 2.5})
+
+                # The checkpoint is not a generation of the experiment
+                self.assertEqual(mlc_repo.count_population(), 0)
+
+                # The costs are kept while the individuals of the generation
+                # are updated, but not in the checkpoint of the next one
+                mlc_repo.save_checkpoint(2, p)
+                self.assertEqual(mlc_repo.get_checkpoint(2)[1], {3: 5.5, 1: 2.5})
+                mlc_repo.save_checkpoint(3, p)
+                self.assertEqual(mlc_repo.get_checkpoint(3)[1], {})
+
+                mlc_repo.clear_checkpoint()
+                self.assertIsNone(mlc_repo.get_checkpoint(2))
+                mlc_repo.close()
+            finally:
+                os.remove(db_path)
+
+    def test_add_individual_from_two_repositories(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                # e.g. two processes working over the same experiment
+                repo_1 = self.__get_new_repo()
+                repo_2 = SQLiteRepository(db_path)
+
+                # The individuals are flushed before they are evaluated
+                self.assertEqual(repo_1.add_individual(Individual("(root (+ 1 1))")), (1, False))
+                repo_1.flush_individuals()
+                self.assertEqual(repo_2.add_individual(Individual("(root (+ 1 1))")), (1, True))
+                self.assertEqual(repo_2.add_individual(Individual("(root (+ 2 2))")), (2, False))
+                repo_2.flush_individuals()
+                self.assertEqual(repo_1.add_individual(Individual("(root (+ 2 2))")), (2, True))
+                self.assertEqual(repo_2.get_individual(1).get_value(), "(root (+ 1 1))")
+                self.assertEqual(repo_1.count_individual(), 2)
+                repo_1.close()
+                repo_2.close()
+            finally:
+                os.remove(db_path)
+
+    def test_individuals_are_saved_when_flushed(self):
+        with saved(Config.get_instance()) as config:
+            config.set("BEHAVIOUR", "save", "true")
+
+            db_path = os.path.join(MLCRepositoryTest.WORKSPACE_DIR,
+                                   MLCRepositoryTest.EXPERIMENT_NAME,
+                                   MLCRepositoryTest.EXPERIMENT_NAME + ".db")
+            try:
+                mlc_repo = self.__get_new_repo()
+                mlc_repo.add_individual(Individual("(root (+ 1 1))"))
+                mlc_repo.add_individual(Individual("(root (+ 2 2))"))
+
+                # Other connections only see the individuals once they are flushed
+                conn = sqlite3.connect(db_path)
+                self.assertEqual(conn.execute(stmt_count_individuals()).fetchone()[0], 0)
+                mlc_repo.flush_individuals()
+                self.assertEqual(conn.execute(stmt_count_individuals()).fetchone()[0], 2)
+                conn.close()
+                mlc_repo.close()
+            finally:
+                os.remove(db_path)
+
     def test_remove_from_population(self):
         mlc_repo = self.__get_new_repo()
 
@@ -820,6 +1075,16 @@ class MLCRepositoryTest(unittest.TestCase):
         self.assertEquals(serial_connection.stopbits, loaded_serial_connection.stopbits)
         self.assertEquals(serial_connection.bytesize, loaded_serial_connection.bytesize)
 
+    def test_save_serial_connection_with_quotes(self):
+        mlc_repo = self.__get_new_repo()
+        board_id = mlc_repo.save_board_configuration(self.__create_board_config())
+
+        serial_connection = SerialConnectionConfig(baudrate=1, parity="N", stopbits=3, bytesize=4,
+                                                   port='/dev/"tty\'ACM0')
+        mlc_repo.save_serial_connection(serial_connection, board_id)
+
+        self.assertEquals(mlc_repo.load_serial_connection(board_id).port, '/dev/"tty\'ACM0')
+
     def test_save_serial_connection_invalid_board_id(self):
         mlc_repo = self.__get_new_repo()
         serial_connection = self.__create_serial_connection()
@@ -259,6 +259,26 @@ class IndividualTest(unittest.TestCase):
                                 value="(root (sin 4.37))",
                                 formal="sin(4.37)")
 
+    def test_mutate_hoist_shares_subtrees(self):
+        new_ind = self._individual_l3.mutate(Individual.MutationType.HOIST)
+
+        # The hoisted subtree is reused instead of being parsed again
+        old_root = self._individual_l3.get_tree().get_root_node()
+        new_root = new_ind.get_tree().get_root_node()
+        self.assertIs(new_root._nodes[0], old_root._nodes[0]._nodes[0])
+        self.assertEquals(new_ind.get_tree().get_expanded_tree_as_string(), new_ind.get_value())
+        self.assertEquals(len(list(new_ind.get_tree().internal_nodes())), 6)
+
+    def test_crossover_keeps_parents_untouched(self):
+        value_l2 = self._individual_l2.get_value()
+        value_l3 = self._individual_l3.get_value()
+        new_ind1, new_ind2, _ = self._individual_l2.crossover(self._individual_l3)
+
+        self.assertEquals(self._individual_l2.get_tree().get_expanded_tree_as_string(), value_l2)
+        self.assertEquals(self._individual_l3.get_tree().get_expanded_tree_as_string(), value_l3)
+        self.assertEquals(new_ind1.get_tree().get_expanded_tree_as_string(), new_ind1.get_value())
+        self.assertEquals(new_ind2.get_tree().get_expanded_tree_as_string(), new_ind2.get_value())
+
     def test_mutate_shrink(self):
         # self._engine.rand('seed', 40.0, nargout=0)
         new_ind = self._individual_l3.mutate(Individual.MutationType.SHRINK)
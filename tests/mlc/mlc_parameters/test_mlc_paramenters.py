@@ -19,8 +19,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import ConfigParser
 import os, unittest
-from MLC.mlc_parameters.mlc_parameters import Config
+from MLC.mlc_parameters.mlc_parameters import Config, saved
 
 
 class ConfigTest(unittest.TestCase):
@@ -91,3 +92,21 @@ list_float_range = 1:10"""
             self.assertTrue(isinstance(item, float))
         self.assertTrue(isinstance(value, list))
 
+    def test_snapshot_values_are_typed(self):
+        snapshot = self._config.snapshot()
+        self.assertEqual(snapshot.getint("SECTION_NUMBERS", "int_field"), 1)
+        self.assertEqual(snapshot.getfloat("SECTION_NUMBERS", "float_field"), 0.004)
+        self.assertIs(snapshot.getboolean("SECTION_BOOLEANS", "bool_field_false"), False)
+        self.assertEqual(snapshot.get_list("SECTION_LISTS", "list_float_field", item_type=float), [1.01, 5.05])
+        self.assertEqual(snapshot.get_list("SECTION_LISTS", "list_range"), range(1, 10))
+        self.assertRaises(ConfigParser.NoOptionError, snapshot.get, "SECTION_NUMBERS", "missing_field")
+
+    def test_snapshot_is_rebuilt_when_config_changes(self):
+        snapshot = self._config.snapshot()
+        self.assertIs(self._config.snapshot(), snapshot)
+
+        with saved(self._config):
+            self._config.set("SECTION_NUMBERS", "int_field", "2")
+            self.assertEqual(self._config.snapshot().getint("SECTION_NUMBERS", "int_field"), 2)
+
+        self.assertEqual(self._config.snapshot().getint("SECTION_NUMBERS", "int_field"), 1)
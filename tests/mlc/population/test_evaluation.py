@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+from tests.test_helpers import TestHelper
+
+from MLC.Application import MLC_CALLBACKS
+from MLC.Application import MLCCallbacksManager
+from MLC.Log.log import set_logger
+from MLC.mlc_parameters.mlc_parameters import saved, Config
+from MLC.db.mlc_repository import MLCRepository
+from MLC.Common.LispTreeExpr.TreeKernel import TreeKernel
+from MLC.individual.Individual import Individual
+from MLC.Population.Evaluation.CostCacheEvaluator import CostCacheEvaluator
+from MLC.Population.Evaluation.EvaluationCheckpoint import EvaluationCheckpoint
+from MLC.Population.Evaluation.EvaluatorFactory import EvaluatorFactory
+from MLC.Population.Evaluation.MultiprocessEvaluator import MultiprocessEvaluator
+from MLC.Population.Evaluation.PipelinedEvaluator import PipelinedEvaluator
+from MLC.Population.Evaluation.PopulationKernel import PopulationKernel
+from MLC.Population.Evaluation.StandaloneEvaluator import StandaloneEvaluator
+from MLC.Population.Population import Population
+
+
+class SingleCostCallback(object):
+    @staticmethod
+    def cost(indiv):
+        x = np.linspace(-1.0, 1.0, num=11)
+        b = indiv.get_tree().calculate_expression([x])
+
+        # Expressions without sensors are calculated as a float
+        if type(b) == float:
+            b = np.repeat(b, len(x))
+        return float(np.sum(b**2))
+
+
+class BatchCostCallback(SingleCostCallback):
+    batches = 0
+
+    @staticmethod
+    def cost_batch(indivs):
+        BatchCostCallback.batches += 1
+        x = np.linspace(-1.0, 1.0, num=11)
+        return [float(cost) for cost in np.sum(PopulationKernel(indivs).evaluate([x])**2, axis=1)]
+
+
+class CountingEvaluator(object):
+    def __init__(self):
+        self.evaluated = []
+        self.costs = {}
+
+    def evaluate(self, indivs):
+        self.evaluated.extend(indivs)
+        for index in indivs:
+            self.costs[index] = self.costs.get(index, 0) + 1.0
+        return [self.costs[index] for index in indivs]
+
+    def close(self):
+        pass
+
+
+class AsyncCountingEvaluator(CountingEvaluator):
+    def __init__(self):
+        CountingEvaluator.__init__(self)
+        self.chunks = []
+
+    def evaluate_async(self, indivs):
+        self.chunks.append(indivs)
+        return AsyncCountingEvaluator.Pending(self, indivs)
+
+    class Pending(object):
+        def __init__(self, evaluator, indivs):
+            self._evaluator = evaluator
+            self._indivs = indivs
+
+        def get(self):
+            return self._evaluator.evaluate(self._indivs)
+
+
+SLOW_EVALUATION_SCRIPT = """
+import time
+
+def cost(indiv):
+    if indiv.get_value() == "(root 3.0)":
+        time.sleep(5)
+    return float(len(indiv.get_value()))
+"""
+
+
+class EvaluationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        TestHelper.load_default_configuration()
+        set_logger('testing')
+
+    def test_population_kernel(self):
+        x = np.linspace(-1.0, 1.0, num=11)
+        indivs = [Individual("(root (sin S0))"), Individual("(root 2.5)")]
+
+        kernel = PopulationKernel(indivs)
+        result = kernel.evaluate([x])
+
+        self.assertEqual(len(kernel), 2)
+        self.assertEqual(result.shape, (2, 11))
+        np.testing.assert_array_equal(result[0], np.sin(x))
+        np.testing.assert_array_equal(result[1], np.repeat(2.5, 11))
+
+    def test_population_kernel_runs_repeated_kernels_once(self):
+        x = np.linspace(-1.0, 1.0, num=11)
+        indivs = [Individual("(root (sin S0))"), Individual("(root 2.5)"), Individual("(root (sin S0))")]
+
+        kernel = PopulationKernel(indivs)
+        sin_kernel = indivs[0].get_kernel()
+        fills = []
+        sin_kernel.fill = lambda sensors, result: fills.append(TreeKernel.fill(sin_kernel, sensors, result))
+        try:
+            result = kernel.evaluate([x])
+        finally:
+            del sin_kernel.fill
+
+        self.assertEqual(len(fills), 1)
+        np.testing.assert_array_equal(result[0], np.sin(x))
+        np.testing.assert_array_equal(result[2], np.sin(x))
+
+    def test_batch_and_single_evaluations_are_equal(self):
+        with saved(Config.get_instance()):
+            Config.get_instance().set("BEHAVIOUR", "save", "false")
+            MLCRepository.make("")
+            repo = MLCRepository.get_instance()
+
+            values = ["(root (sin S0))", "(root (* S0 (exp S0)))", "(root (/ 1.0 S0))", "(root 3.0)"]
+            indivs = [repo.add_individual(Individual(value))[0] for value in values]
+
+            evaluated = []
+            callbacks = MLCCallbacksManager()
+            callbacks.subscribe(MLC_CALLBACKS.ON_EVALUATE,
+                                lambda index, cost: evaluated.append(index))
+
+            single_costs = StandaloneEvaluator(SingleCostCallback, callbacks).evaluate(indivs)
+            batch_costs = StandaloneEvaluator(BatchCostCallback, callbacks).evaluate(indivs)
+
+            self.assertEqual(single_costs, batch_costs)
+            self.assertEqual(BatchCostCallback.batches, 1)
+            self.assertEqual(evaluated, indivs + indivs)
+
+    def test_multiprocess_evaluation(self):
+        # Create an Evaluation package with a cost function that never ends for one individual
+        evaluation_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(evaluation_dir, "Evaluation"))
+        open(os.path.join(evaluation_dir, "Evaluation", "__init__.py"), "w").close()
+        with open(os.path.join(evaluation_dir, "Evaluation", "slow_ev.py"), "w") as ev_file:
+            ev_file.write(SLOW_EVALUATION_SCRIPT)
+        sys.path.append(evaluation_dir)
+
+        try:
+            with saved(Config.get_instance()):
+                Config.get_instance().set("BEHAVIOUR", "save", "false")
+                Config.get_instance().set("EVALUATOR", "evaluation_function", "slow_ev")
+                Config.get_instance().set("EVALUATOR", "multiprocess_workers", "2")
+                Config.get_instance().set("EVALUATOR", "multiprocess_chunksize", "2")
+                Config.get_instance().set("EVALUATOR", "multiprocess_timeout", "0.5")
+                MLCRepository.make("")
+                repo = MLCRepository.get_instance()
+
+                values = ["(root (sin S0))", "(root 3.0)", "(root (/ 1.0 S0))", "(root S0)", "(root 2.0)"]
+                indivs = [repo.add_individual(Individual(value))[0] for value in values]
+
+                evaluated = []
+                callbacks = MLCCallbacksManager()
+                callbacks.subscribe(MLC_CALLBACKS.ON_EVALUATE,
+                                    lambda index, cost: evaluated.append(index))
+
+                evaluator = MultiprocessEvaluator(callbacks)
+                costs = evaluator.evaluate(indivs)
+                evaluator.close()
+
+                bad_value = Config.get_instance().getfloat("EVALUATOR", "badvalue")
+                self.assertEqual(costs, [15.0, bad_value, 17.0, 9.0, 10.0])
+                self.assertEqual(evaluated, indivs)
+        finally:
+            sys.path.remove(evaluation_dir)
+            shutil.rmtree(evaluation_dir)
+
+    def test_cost_cache_never_reevaluates(self):
+        evaluator, callbacks, evaluated, indivs = self._make_cost_cache(CostCacheEvaluator.NEVER, 5)
+
+        self.assertEqual(evaluator.evaluate(indivs + [indivs[0]]), [1.0, 1.0, 1.0])
+        self.assertEqual(evaluator.evaluate(indivs), [1.0, 1.0])
+        self.assertEqual(callbacks.evaluated, indivs)
+        # Only the individuals found in the cache emit their events in the cache
+        self.assertEqual(evaluated, [indivs[0]] + indivs)
+
+    def test_cost_cache_average(self):
+        evaluator, callbacks, evaluated, indivs = self._make_cost_cache(CostCacheEvaluator.AVERAGE, 3)
+
+        # The counting evaluator returns 1, 2, 3... so the averages are 1, 1.5, 2
+        self.assertEqual(evaluator.evaluate(indivs), [1.0, 1.0])
+        self.assertEqual(evaluator.evaluate(indivs), [1.5, 1.5])
+        self.assertEqual(evaluator.evaluate(indivs), [2.0, 2.0])
+        self.assertEqual(evaluator.evaluate(indivs), [2.0, 2.0])
+        self.assertEqual(callbacks.evaluated, indivs * 3)
+
+    def test_pipelined_evaluation(self):
+        async_evaluator = AsyncCountingEvaluator()
+        evaluator = PipelinedEvaluator(async_evaluator, 2)
+
+        for index in [1, 2, 1, 3]:
+            evaluator.submit(index)
+
+        # The first chunk is evaluated before the generation barrier
+        self.assertEqual(async_evaluator.chunks, [[1, 2]])
+        self.assertEqual(async_evaluator.evaluated, [])
+
+        self.assertEqual(evaluator.evaluate([3, 1, 4, 2, 1]), [1.0, 1.0, 1.0, 1.0, 1.0])
+        self.assertEqual(async_evaluator.chunks, [[1, 2], [3, 4]])
+        self.assertEqual(async_evaluator.evaluated, [1, 2, 3, 4])
+
+        # Nothing is kept after the barrier, the individuals are evaluated again
+        self.assertEqual(evaluator.evaluate([2]), [2.0])
+
+    def test_pipeline_needs_async_evaluations(self):
+        with saved(Config.get_instance()):
+            Config.get_instance().set("EVALUATOR", "pipeline_chunksize", "2")
+            self.assertIsInstance(EvaluatorFactory._make_pipeline(AsyncCountingEvaluator()), PipelinedEvaluator)
+            self.assertRaises(SystemExit, EvaluatorFactory._make_pipeline, CountingEvaluator())
+
+            Config.get_instance().set("EVALUATOR", "pipeline_chunksize", "0")
+            counting_evaluator = CountingEvaluator()
+            self.assertIs(EvaluatorFactory._make_pipeline(counting_evaluator), counting_evaluator)
+
+    def test_resume_checkpointed_evaluation(self):
+        with saved(Config.get_instance()):
+            Config.get_instance().set("BEHAVIOUR", "save", "false")
+            Config.get_instance().set("POPULATION", "size", "4")
+            MLCRepository.make("")
+            repo = MLCRepository.get_instance()
+            values = ["(root S0)", "(root (sin S0))", "(root (cos S0))", "(root (exp S0))"]
+            indivs = [repo.add_individual(Individual(value))[0] for value in values]
+
+            population = Population(4, 1, Config.get_instance(), repo)
+            population._individuals = indivs
+
+            # The evaluation is interrupted after the third individual. Only
+            # the complete batches of costs were written
+            checkpoint = EvaluationCheckpoint(2)
+            checkpoint.start(2, population)
+            for index, cost in zip(indivs[:3], [1.0, 2.0, 3.0]):
+                checkpoint.on_evaluate(index, cost)
+
+            checkpoint = EvaluationCheckpoint(2)
+            self.assertIsNone(checkpoint.resume(1))
+            resumed = checkpoint.resume(2)
+            self.assertEqual(resumed.get_individuals(), indivs)
+
+            counting_evaluator = CountingEvaluator()
+            self.assertEqual(checkpoint.evaluator(counting_evaluator).evaluate(indivs), [1.0, 2.0, 1.0, 1.0])
+            self.assertEqual(counting_evaluator.evaluated, indivs[2:])
+
+            # Once the generation is saved, the checkpoint is discarded
+            checkpoint.finish()
+            self.assertIsNone(EvaluationCheckpoint(2).resume(2))
+
+    def test_resumed_costs_are_cached(self):
+        with saved(Config.get_instance()):
+            evaluator, counting_evaluator, evaluated, indivs = self._make_cost_cache(CostCacheEvaluator.AVERAGE, 3)
+            Config.get_instance().set("POPULATION", "size", "2")
+            population = Population(2, 1, Config.get_instance(), MLCRepository.get_instance())
+            population._individuals = indivs
+
+            # The first generation was evaluated, the second one was
+            # interrupted after the evaluation of the first individual
+            self.assertEqual(evaluator.evaluate(indivs), [1.0, 1.0])
+            checkpoint = EvaluationCheckpoint(1)
+            checkpoint.start(2, population)
+            checkpoint.on_evaluate(indivs[0], 2.0)
+
+            checkpoint = EvaluationCheckpoint(1)
+            checkpoint.resume(2)
+            # The resumed cost is averaged with the cached one, like the new cost
+            self.assertEqual(checkpoint.evaluator(evaluator).evaluate(indivs), [1.5, 1.5])
+            self.assertEqual(counting_evaluator.evaluated, indivs + [indivs[1]])
+            self.assertEqual(evaluator.evaluate(indivs), [5 / 3.0, 2.0])
+
+    def _make_cost_cache(self, policy, max_evaluations):
+        MLCRepository.make("")
+        repo = MLCRepository.get_instance()
+        indivs = [repo.add_individual(Individual(value))[0] for value in ["(root S0)", "(root (sin S0))"]]
+
+        evaluated = []
+        callbacks = MLCCallbacksManager()
+        callbacks.subscribe(MLC_CALLBACKS.ON_EVALUATE, lambda index, cost: evaluated.append(index))
+
+        counting_evaluator = CountingEvaluator()
+        evaluator = CostCacheEvaluator(counting_evaluator, callbacks, policy, max_evaluations)
+        return evaluator, counting_evaluator, evaluated, indivs
@@ -19,10 +19,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+import random
 import unittest
 from tests.test_helpers import TestHelper
 
 from MLC.mlc_parameters.mlc_parameters import saved, Config
+from MLC.Common.RandomManager import RandomManager
 from MLC.Population.Population import Population
 from MLC.db.mlc_repository import MLCRepository
 from MLC.Population.Creation.IndividualSelection import IndividualSelection
@@ -52,6 +54,103 @@ class PopulationTest(unittest.TestCase):
                                expected_pop_indexes=[1],
                                expected_individuals={1: Individual("1+1")})
 
+    def test_sort_and_remove_duplicates(self):
+        population = Population(5, 1, Config.get_instance(), None)
+        population._individuals = [3, 1, 3, 2, 1]
+        population._costs = [0.5, 0.2, 0.1, 0.2, 0.7]
+        population._gen_method = [1, 2, 3, 4, 1]
+        population._parents = [[1], [2], [3, 4], [5], []]
+
+        # Individuals with the same cost keep their order
+        population.sort()
+        self.assertEqual(population.get_individuals(), [3, 1, 2, 3, 1])
+        self.assertEqual(population.get_costs(), [0.1, 0.2, 0.2, 0.5, 0.7])
+        self.assertEqual(population.get_gen_methods(), [3, 2, 4, 1, 1])
+        self.assertEqual(population.get_parents(), [[3, 4], [2], [5], [1], []])
+
+        # The first appearance of every individual is kept
+        self.assertEqual(population.remove_duplicates(), 2)
+        self.assertEqual(population.get_individuals(), [3, 1, 2, -1, -1])
+        self.assertEqual(population.get_parents(), [[3, 4], [2], [5], [], []])
+        self.assertFalse(population.is_complete())
+
+    def test_remove_bad_individuals(self):
+        bad_value = Config.get_instance().getfloat("EVALUATOR", "badvalue")
+        population = Population(4, 1, Config.get_instance(), None)
+        population._individuals = [1, 2, 3, 4]
+
+        population._costs = [bad_value, 1.0, 2.0, 3.0]
+        self.assertEqual(population.remove_bad_individuals(), [])
+
+        population._costs = [bad_value, 1.0, bad_value, 3.0]
+        self.assertEqual(population.remove_bad_individuals(), [0, 2])
+        self.assertEqual(population.get_individuals(), [-1, 2, -1, 4])
+
+    def test_choose_individuals_in_subgeneration(self):
+        with saved(Config.get_instance()) as config:
+            config.set("OPTIMIZATION", "selectionmethod", "tournament")
+            config.set("OPTIMIZATION", "tournamentsize", "2")
+            population = Population(8, 2, config, None)
+            population._costs = [7, 6, 5, 4, 3, 2, 1, 0]
+
+            random.seed(10)
+            winners = population.choose_individuals((4, 7), 100)
+            # The worst individual of the subgeneration never wins
+            self.assertEqual(set(winners), set([5, 6, 7]))
+
+            # The batches are reproducible with the Python seed
+            random.seed(10)
+            self.assertEqual(population.choose_individuals((4, 7), 100).tolist(), winners.tolist())
+
+            # The tournament can not be greater than the subgeneration
+            config.set("OPTIMIZATION", "tournamentsize", "7")
+            self.assertEqual(set(population.choose_individuals((0, 3), 10)), set([3]))
+
+    def test_tournament_winners_replaying_randoms(self):
+        with saved(Config.get_instance()) as config:
+            config.set("OPTIMIZATION", "selectionmethod", "tournament")
+            config.set("OPTIMIZATION", "tournamentsize", "2")
+            population = Population(4, 1, config, None)
+            population._costs = [3, 2, 1, 0]
+
+            # Every tournament takes its randoms when it is needed
+            RandomManager.clear_random_values()
+            RandomManager._randoms = [0.1, 0.6, 0.9, 0.3, 0.5]
+            try:
+                winners = population._tournament_winners((0, 3), 10)
+                self.assertEqual(next(winners), 2)
+                self.assertEqual(RandomManager._randoms, [0.9, 0.3, 0.5])
+                self.assertEqual(next(winners), 3)
+                self.assertEqual(RandomManager._randoms, [0.5])
+            finally:
+                RandomManager.clear_random_values()
+
+    def test_evolve_submits_the_individuals_placed(self):
+        class SubmittedEvaluator(object):
+            def __init__(self):
+                self.submitted = []
+
+            def submit(self, index):
+                self.submitted.append(index)
+
+        with saved(Config.get_instance()) as config:
+            config.set("POPULATION", "size", "5")
+            config.set("BEHAVIOUR", "save", "false")
+            from MLC.Log.log import set_logger
+            set_logger('testing')
+
+            MLCRepository.make("")
+            population = Population(5, 1, config, MLCRepository.get_instance())
+            population.fill(MixedRampedGauss())
+            population._costs = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+            evaluator = SubmittedEvaluator()
+            next_population = population.evolve(Population(5, 1, config, MLCRepository.get_instance()), evaluator)
+
+            # Every individual is submitted when it is placed in the new population
+            self.assertEqual(len(evaluator.submitted), 5)
+            self.assertEqual(sorted(evaluator.submitted), sorted(next_population.get_individuals()))
+
     def __fill_and_assert(self, fill_creator, expected_pop_indexes, expected_individuals):
         with saved(Config.get_instance()) as config:
             Config.get_instance().set("POPULATION", "size", "5")
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+Latency and throughput benchmark of the ArduinoInterface. The interface
+talks to a stand-in of the board firmware that answers every command as
+the board would, through one of these transports:
+
+    mock -- MockConnection, the firmware answers inside send
+    pty  -- SerialConnection over a pseudo-terminal served by a thread
+    tcp  -- a buffered socket connection to a loopback server thread
+
+For every transport, report mode, read count and pin count it measures the
+time to encode an ACTUATE frame, the time to decode an ACTUATE_REPORT, the
+percentiles of the round trip of an actuation and its jitter. The results
+are written as JSON. If a baseline file is given, the cases that are slower
+than the baseline are listed and the script exits with an error.
+
+Usage: python hil_benchmark.py [-o results.json] [-b baseline.json] [options]
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import struct
+import sys
+import threading
+import time
+import tty
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+import numpy as np
+
+from MLC.arduino import boards
+from MLC.arduino.connection import BufferedConnection, MockConnection, SerialConnection
+from MLC.arduino.connection.base import ConnectionTimeoutException
+from MLC.arduino.protocol import ArduinoInterface, REPORT_MODES
+
+BOARD = boards.Due
+TRANSPORTS = ["mock", "pty", "tcp"]
+# Amount of different reports served by the firmware stand-in
+REPORT_POOL = 16
+WARM_UP = 50
+BATCHES = 5
+
+
+class FirmwareStandIn(object):
+    """
+    Answers the commands of the ArduinoInterface like the board firmware.
+    The inputs are read with random values
+    """
+
+    def __init__(self):
+        self._inputs = []
+        self._reads = 1
+        self._pending = ""
+        self._reports = None
+        self._next_report = 0
+
+    def feed(self, data):
+        """ Receives a stream of commands and returns the responses of the complete ones """
+        self._pending += str(data)
+        responses = []
+        while len(self._pending) >= 5:
+            end = 5 + struct.unpack(">I", self._pending[1:5])[0]
+            if len(self._pending) < end:
+                break
+            responses.append(self._execute(self._pending[0], self._pending[5:end]))
+            self._pending = self._pending[end:]
+        return "".join(responses)
+
+    def _execute(self, command, payload):
+        if command == "\x02" and ord(payload) not in self._inputs:
+            self._inputs.append(ord(payload))
+            self._reports = None
+        elif command == "\x05":
+            self._reads = ord(payload[1]) + 1
+            self._reports = None
+        elif command == "\xF0":
+            return self.report()
+        return ""
+
+    def report(self):
+        """ Returns the response to an ACTUATE command """
+        if self._reports is None:
+            self._reports = [self._make_report() for i in xrange(REPORT_POOL)]
+        self._next_report = (self._next_report + 1) % REPORT_POOL
+        return self._reports[self._next_report]
+
+    def _make_report(self):
+        payload = ""
+        for pin in self._inputs:
+            if pin in BOARD["ANALOG_PINS"]:
+                reads = np.random.randint(0, 4096, self._reads).astype('>u2')
+            else:
+                reads = np.random.randint(0, 256, (self._reads + 7) / 8).astype(np.uint8)
+            payload += chr(pin) + reads.tostring()
+        return "\xF1" + struct.pack(">I", len(payload)) + payload
+
+
+class SocketConnection(BufferedConnection):
+    """ Connection to the firmware stand-in through a TCP socket """
+
+    def __init__(self, address, timeout=5):
+        BufferedConnection.__init__(self)
+        self._socket = socket.create_connection(address, timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, data):
+        self._socket.sendall(data)
+
+    def _read_raw(self, length, max_length):
+        data = ""
+        try:
+            while len(data) < length:
+                chunk = self._socket.recv(max_length - len(data))
+                if not chunk:
+                    break
+                data += chunk
+        except socket.timeout:
+            pass
+
+        if len(data) < length:
+            raise ConnectionTimeoutException("timeout when receiving expected data")
+        return data
+
+    def close(self):
+        self._socket.close()
+
+
+def serve(firmware, read, write):
+    """ Answers the commands received until the transport is closed """
+    try:
+        while True:
+            data = read()
+            if not data:
+                return
+            response = firmware.feed(data)
+            if response:
+                write(response)
+    except (OSError, socket.error):
+        return
+
+
+def open_transport(name):
+    """ Returns the connection to a new firmware stand-in, the stand-in and a function that closes them """
+    firmware = FirmwareStandIn()
+
+    if name == "mock":
+        return MockConnection("", responder=firmware.feed), firmware, lambda: None
+
+    if name == "pty":
+        master, slave = os.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        server = threading.Thread(target=serve, args=(firmware, lambda: os.read(master, 4096),
+                                                      lambda data: os.write(master, data)))
+        server.daemon = True
+        server.start()
+        connection = SerialConnection(port=os.ttyname(slave))
+
+        def close():
+            # Reading the master fails once the slave is closed, so the
+            # server ends before its fd can be reused
+            connection._connection.close()
+            os.close(slave)
+            server.join()
+            os.close(master)
+        return connection, firmware, close
+
+    if name == "tcp":
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+
+        def accept():
+            client, _ = listener.accept()
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            serve(firmware, lambda: client.recv(4096), client.sendall)
+            client.close()
+        server = threading.Thread(target=accept)
+        server.daemon = True
+        server.start()
+        connection = SocketConnection(listener.getsockname())
+
+        def close():
+            connection.close()
+            server.join()
+            listener.close()
+        return connection, firmware, close
+
+    raise ValueError("Unknown transport: %s" % name)
+
+
+def setup_interface(connection, mode, read_count, pins):
+    """
+    Configures half of the pins (rounding up) as analog inputs and the rest
+    as digital inputs, with the same amount of outputs of each kind.
+    Returns the interface and the output pins
+    """
+    analog, digital = (pins + 1) / 2, pins / 2
+    analog_pins = list(BOARD["ANALOG_PINS"])
+    analog_inputs, analog_outputs = analog_pins[:analog], analog_pins[-analog:] if analog else []
+    digital_inputs, digital_outputs = range(22, 22 + digital), range(2, 2 + digital)
+
+    interface = ArduinoInterface(connection, BOARD)
+    interface.set_report_mode(mode, read_count=read_count)
+    for pin in analog_outputs + digital_outputs:
+        interface.add_output(pin)
+    for pin in analog_inputs + digital_inputs:
+        interface.add_input(pin)
+
+    return interface, analog_outputs + digital_outputs
+
+
+def step_values(outputs, step):
+    return [(step * 7 + i) % 2 if pin in BOARD["DIGITAL_PINS"] else (step * 37 + i) % 4096
+            for i, pin in enumerate(outputs)]
+
+
+def time_per_call(function, calls):
+    """ Best average time of a call (in microseconds) over several batches """
+    best = None
+    for batch in xrange(BATCHES):
+        start = time.time()
+        for i in xrange(calls):
+            function()
+        elapsed = (time.time() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+def run_case(transport, mode_name, read_count, pins, repetitions, window):
+    connection, firmware, close = open_transport(transport)
+    try:
+        interface, outputs = setup_interface(connection, getattr(REPORT_MODES, mode_name), read_count, pins)
+        frame = interface.compile_actuation(outputs)
+        values = [step_values(outputs, step) for step in xrange(REPORT_POOL)]
+
+        # The stand-in does not answer the setup commands. Once the first
+        # actuations are reported, they were all processed
+        for step in xrange(WARM_UP):
+            interface.actuate_frame(frame, values[step % REPORT_POOL])
+
+        # Encoding: write the values of a step in the compiled frame
+        encode_us = time_per_call(lambda: frame.set_values(values[0]), repetitions)
+
+        # Decoding: the private decoder of the interface, timed alone, with
+        # a report of the firmware stand-in
+        payload = bytearray(firmware.report()[5:])
+        decode = interface._ArduinoInterface__decode_report
+        decode_us = time_per_call(lambda: decode(payload), repetitions)
+
+        round_trips = np.empty(repetitions)
+        start = time.time()
+        for step in xrange(repetitions):
+            step_start = time.time()
+            interface.actuate_frame(frame, values[step % REPORT_POOL])
+            round_trips[step] = time.time() - step_start
+        elapsed = time.time() - start
+        round_trips *= 1e6
+
+        result = {"transport": transport,
+                  "mode": mode_name,
+                  "read_count": read_count,
+                  "pins": pins,
+                  "encode_us": encode_us,
+                  "decode_us": decode_us,
+                  "round_trip_us": dict(("p%d" % p, np.percentile(round_trips, p)) for p in (50, 90, 99)),
+                  # Mean difference between consecutive round trips, and their deviation
+                  "jitter_us": np.abs(np.diff(round_trips)).mean(),
+                  "round_trip_std_us": round_trips.std(),
+                  "steps_per_s": repetitions / elapsed}
+        result["round_trip_us"]["max"] = round_trips.max()
+
+        if window > 1:
+            steps = ([(pin, value) for pin, value in zip(outputs, values[step % REPORT_POOL])]
+                     for step in xrange(repetitions))
+            start = time.time()
+            for report in interface.actuate_pipelined(steps, window):
+                pass
+            result["pipelined_steps_per_s"] = repetitions / (time.time() - start)
+
+        return result
+    finally:
+        close()
+
+
+def case_key(result):
+    return (result["transport"], result["mode"], result["read_count"], result["pins"])
+
+
+def compare(results, baseline, tolerance):
+    """ Returns the descriptions of the measures that are slower than the baseline """
+    previous = dict((case_key(result), result) for result in baseline["results"])
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        for name, new_value, old_value in [("encode_us", result["encode_us"], old["encode_us"]),
+                                           ("decode_us", result["decode_us"], old["decode_us"]),
+                                           ("round_trip_us.p50", result["round_trip_us"]["p50"],
+                                            old["round_trip_us"]["p50"])]:
+            if new_value > old_value * (1 + tolerance):
+                regressions.append("%s %s read_count=%s pins=%s: %s %.1f -> %.1f" %
+                                   (case_key(result) + (name, old_value, new_value)))
+    return regressions
+
+
+def parse_list(cast):
+    return lambda value: [cast(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ArduinoInterface latency and throughput benchmark")
+    parser.add_argument("-o", "--output", default="hil_benchmark.json", help="JSON file of the results")
+    parser.add_argument("-b", "--baseline", help="JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slow down over the baseline (default: 0.25)")
+    parser.add_argument("--transports", type=parse_list(str), default=TRANSPORTS)
+    parser.add_argument("--modes", type=parse_list(str), default=list(REPORT_MODES._fields))
+    parser.add_argument("--read-counts", type=parse_list(int), default=[1, 10, 100])
+    parser.add_argument("--pins", type=parse_list(int), default=[1, 4, 8])
+    parser.add_argument("--repetitions", type=int, default=500)
+    parser.add_argument("--window", type=int, default=4,
+                        help="Steps sent ahead in the pipelined actuation, 1 to skip it (default: 4)")
+    args = parser.parse_args()
+
+    results = []
+    for transport in args.transports:
+        for mode in args.modes:
+            for read_count in args.read_counts:
+                for pins in args.pins:
+                    result = run_case(transport, mode, read_count, pins, args.repetitions, args.window)
+                    results.append(result)
+                    print "%-4s %-7s read_count=%-3d pins=%d  encode %6.1fus  decode %6.1fus  " \
+                          "round trip p50 %7.1fus p99 %7.1fus  jitter %6.1fus" % \
+                          (transport, mode, read_count, pins, result["encode_us"], result["decode_us"],
+                           result["round_trip_us"]["p50"], result["round_trip_us"]["p99"], result["jitter_us"])
+
+    with open(args.output, "w") as output:
+        json.dump({"platform": platform.platform(),
+                   "python": platform.python_version(),
+                   "numpy": np.__version__,
+                   "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "repetitions": args.repetitions,
+                   "results": results}, output, indent=2, sort_keys=True)
+    print "Results saved in %s" % args.output
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print "REGRESSION %s" % regression
+        if regressions:
+            sys.exit(-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+Micro-benchmark of the LispTreeExpr parser. Parses random populations with
+the current parser and with the previous one, that sliced the expression on
+every recursive call, checking that both build the same trees.
+
+Usage: python parser_benchmark.py [population size] [repetitions]
+"""
+
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from MLC.Common.LispTreeExpr.LispTreeExpr import LispTreeExpr
+from MLC.Common.LispTreeExpr.OperationNodes import OpNodeFactory
+from MLC.Common.LispTreeExpr.TreeNodes import LeafNode
+from MLC.Common.Operations import Operations
+from MLC.individual.Individual import Individual
+from MLC.Log.log import set_logger
+from MLC.mlc_parameters.mlc_parameters import Config
+
+
+class SlicingLispTreeExpr(LispTreeExpr):
+    """
+    Parser used before the tokenizer was introduced. Every node receives the
+    slice of the expression that starts with it.
+    """
+    def _parse(self, expr):
+        root, _ = self._generate_slice_node(expr, is_root_expression=True)
+        return root
+
+    def _number_of_subexpressions(self, expr):
+        level = 0
+        nbarg = 1
+        for i in range(len(expr)):
+            if expr[i] == '(':
+                level += 1
+            if expr[i] == ')':
+                level -= 1
+            if expr[i] == ' ' and level == 0:
+                nbarg += 1
+        return nbarg
+
+    def _get_slice_operation(self, expr, is_root_expression=False):
+        if is_root_expression:
+            return {"op": "root",
+                    "nbarg": self._number_of_subexpressions(expr[len("(root "):len(expr) - 1])}
+        return Operations.get_instance().get_operation_from_op_string(expr[1:expr.find(' ')])
+
+    def _generate_slice_leaf_node(self, expr, parent_depth, expr_index):
+        find_space = expr.find(' ')
+        find_close_parenthesis = expr.find(')')
+
+        if find_space != -1 and find_space < find_close_parenthesis:
+            param_len = find_space
+        elif find_close_parenthesis != -1:
+            param_len = find_close_parenthesis
+        else:
+            param_len = len(expr)
+
+        leaf = LeafNode(self._node_id_generator.next_node_id(), expr[:param_len])
+        leaf.set_depth(parent_depth)
+        leaf.set_expr_index(expr_index)
+        self._nodes.append(leaf)
+        return leaf, param_len + 1
+
+    def _generate_slice_node(self, expr, is_root_expression=False, parent_depth=0, expr_index=0):
+        if expr[0] != '(':
+            return self._generate_slice_leaf_node(expr, parent_depth, expr_index)
+
+        op = self._get_slice_operation(expr, is_root_expression)
+        node = OpNodeFactory.make(op["op"], self._node_id_generator.next_node_id())
+        node.set_depth(parent_depth + 1)
+        node.set_expr_index(expr_index)
+        expr_offset = 0
+        child_subtreedepth = 0
+
+        for i in range(op["nbarg"]):
+            next_arg_pos = 1 + len(op["op"]) + 1 + expr_offset
+            child_node, offset = self._generate_slice_node(expr[next_arg_pos:],
+                                                           parent_depth=parent_depth + 1,
+                                                           expr_index=expr_index + next_arg_pos)
+            node.add_child(child_node)
+            child_subtreedepth = max(child_subtreedepth, child_node.get_subtreedepth())
+            expr_offset += offset
+
+        node.set_subtreedepth(1 + child_subtreedepth)
+        if not is_root_expression:
+            self._nodes.append(node)
+        return node, 1 + len(op["op"]) + 1 + expr_offset + 1
+
+
+def node_signature(tree):
+    return [(node.get_node_id(), node.get_depth(), node.get_expr_index(),
+             node.get_subtreedepth(), node.to_string()) for node in tree.nodes()]
+
+
+def time_parser(parser_class, values, repetitions):
+    # Only the parsing is measured, not the complexity nor the formal expression
+    best = None
+    for _ in range(repetitions):
+        start = time.time()
+        for value in values:
+            tree = parser_class.__new__(parser_class)
+            tree._node_id_generator = LispTreeExpr.NodeIdGenerator()
+            tree._nodes = []
+            tree._parse(value)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    population_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    set_logger("testing")
+    config = Config.get_instance()
+    config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../integration_tests/test_basic/configuration.ini"))
+    config.set("OPTIMIZATION", "simplify", "false")
+    random.seed(0)
+
+    # Individuals of type 0 grow up to maxdepth, the deepest trees of a run
+    values = [Individual.generate(individual_type=indiv_type, config=config).get_value()
+              for indiv_type in (0, 3)
+              for _ in range(population_size / 2)]
+    characters = sum([len(value) for value in values])
+
+    for value in values:
+        if node_signature(LispTreeExpr(value)) != node_signature(SlicingLispTreeExpr(value)):
+            print "Parsers differ for expression {0}".format(value)
+            sys.exit(-1)
+
+    print "Individuals: {0} - Average length: {1:.0f} - Max length: {2}".format(
+        len(values), characters / float(len(values)), max([len(value) for value in values]))
+
+    # The cost of slicing grows with the length of the expressions
+    values.sort(key=len)
+    for name, population in (("All individuals", values),
+                             ("Longest 10%", values[-max(1, len(values) / 10):])):
+        slicing_time = time_parser(SlicingLispTreeExpr, population, repetitions)
+        tokenizer_time = time_parser(LispTreeExpr, population, repetitions)
+        print "{0}: slicing parser {1:.4f} s - tokenizer parser {2:.4f} s - speedup {3:.2f}x".format(
+            name, slicing_time, tokenizer_time, slicing_time / tokenizer_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# MLC (Machine Learning Control): A genetic algorithm library to solve chaotic problems
+# Copyright (C) 2015-2017, Thomas Duriez (thomas.duriez@gmail.com)
+# Copyright (C) 2015, Adrian Durán (adrianmdu@gmail.com)
+# Copyright (C) 2015-2017, Ezequiel Torres Feyuk (ezequiel.torresfeyuk@gmail.com)
+# Copyright (C) 2016-2017, Marco Germano Zbrun (marco.germano@intraway.com)
+# Copyright (C) 2016-2017, Raúl Lopez Skuba (raulopez0@gmail.com)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Micro-benchmark of the decoding of the ACTUATE_REPORT payloads. Decodes the
+reports of a Due with several analog and digital inputs with the
+ArduinoInterface and with the previous decoder, that walked the payload
+byte by byte, checking that both return the same reads.
+
+Usage: python report_decoding_benchmark.py [read count] [repetitions]
+"""
+
+import os
+import random
+import struct
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+import numpy as np
+
+from MLC.arduino import boards
+from MLC.arduino.connection import MockConnection
+from MLC.arduino.protocol import ArduinoInterface, REPORT_MODES
+
+ANALOG_INPUTS = [54, 55, 56, 57, 58]
+DIGITAL_INPUTS = [20, 21]
+
+
+def make_report(reads):
+    payload = ""
+    for pin in ANALOG_INPUTS:
+        payload += chr(pin) + "".join(struct.pack(">H", random.randint(0, 4095)) for i in xrange(reads))
+    for pin in DIGITAL_INPUTS:
+        payload += chr(pin) + "".join(chr(random.randint(0, 255)) for i in xrange((reads + 7) / 8))
+    return "\xF1" + struct.pack(">I", len(payload)) + payload
+
+
+def legacy_decode(data, read_count, analog_offset, average=False):
+    # Decoding loop used before the report plan was introduced
+    length = len(data)
+    pos = 0
+    results = dict([("D%d" % x, []) for x in DIGITAL_INPUTS] +
+                   [("A%d" % (x - analog_offset), []) for x in ANALOG_INPUTS])
+    while pos < length:
+        pin = ord(data[pos])
+        if pin in ANALOG_INPUTS:
+            for i in range(0, read_count + 1):
+                results["A%d" % (pin - analog_offset)].append(
+                    (ord(data[pos + 1]) << 8) + ord(data[pos + 2]))
+                pos = pos + 2
+            pos = pos + 1
+        else:
+            for i in range(0, read_count + 1):
+                results["D%d" % (pin)].append(bool(ord(data[pos + 1 + i / 8]) & (0x01 << (i % 8))))
+            pos = pos + 1 + read_count / 8 + 1
+    if average:
+        for key, values in results.iteritems():
+            if key.startswith("A"):
+                results[key] = [sum(values) / (read_count + 1)]
+            else:
+                results[key] = [(sum(values) * 2) > (read_count + 1)]
+    return results
+
+
+def value_kind(values):
+    # Integer, boolean or float, no matter the signedness of the integers
+    return "i" if values.dtype.kind in "iu" else values.dtype.kind
+
+
+def main():
+    read_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    report = make_report(read_count)
+    interface = ArduinoInterface(MockConnection(report), boards.Due)
+    for pin in ANALOG_INPUTS + DIGITAL_INPUTS:
+        interface.add_input(pin)
+
+    # Both decoders must return the same reads, with the same types
+    for mode in (REPORT_MODES.AVERAGE, REPORT_MODES.BULK):
+        interface.set_report_mode(mode, read_count=read_count)
+        new_results = interface.actuate([])
+        old_results = legacy_decode(report[5:], read_count - 1, len(boards.Due["DIGITAL_PINS"]),
+                                    average=mode == REPORT_MODES.AVERAGE)
+        for key, values in old_results.iteritems():
+            assert np.array_equal(new_results[key], values), key
+            assert value_kind(new_results[key]) == value_kind(np.asarray(values)), key
+
+    start = time.time()
+    for i in xrange(repetitions):
+        legacy_decode(report[5:], read_count - 1, len(boards.Due["DIGITAL_PINS"]))
+    legacy_time = time.time() - start
+
+    start = time.time()
+    for i in xrange(repetitions):
+        interface.actuate([])
+    new_time = time.time() - start
+
+    print "%s reports of %s reads of %s pins" % (repetitions, read_count, len(ANALOG_INPUTS + DIGITAL_INPUTS))
+    print "Byte by byte: %.3fs (%.1f reports/s)" % (legacy_time, repetitions / legacy_time)
+    print "Report plan:  %.3fs (%.1f reports/s)" % (new_time, repetitions / new_time)
+
+
+if __name__ == "__main__":
+    main()